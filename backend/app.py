@@ -19,14 +19,18 @@ from models.helpers import get_time
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from features.game_service import GameService
 from features.auth_middleware import AuthMiddleware
+from features.question_bank_replenisher import create_question_bank_replenisher
+from features.flagged_questions import get_flagged_questions
 from utils.database.factory import get_database_service
 from utils.database.pgdb import PgDatabaseService
 from utils.logger import setup_logger
 from utils.game_session_cleaner import clean_game_sessions
 from utils.auth_session_cleaner import clean_auth_sessions
 from utils.queue_manager import get_global_queue_manager, shutdown_queue_manager
+from utils.config import config
 from AI_text_recognition.main import TextRecognitionService
 from AI_text_recognition.utils_m.database.factory import (
     get_database_service as get_text_recognition_database_service,
@@ -77,11 +81,44 @@ async def lifespan(app: FastAPI):
         "Dont use vscode debugger to stop the app, it will not stop the db properly."
     )
 
+    # ------ Keep the flagged question set in sync ------
+    flagged_questions = get_flagged_questions()
+    try:
+        await flagged_questions.start(get_database_service())
+    except Exception as e:
+        # Loaded on first use instead
+        logger.error(f"Failed to load flagged questions: {e}")
+    scheduler.add_job(
+        flagged_questions.load,
+        IntervalTrigger(
+            minutes=config.get("QuestionGenerator.FlaggedQuestions.ReloadMinutes", 30)
+        ),
+        args=[get_database_service()],
+        id="reload_flagged_questions",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
     # ------ Initialize the LLM queue manager ------
     llm_request_manager = LLMRequestManager()
     llm_request_manager._create_processors()
     app.state.llm_request_manager = llm_request_manager
 
+    # ------ Keep the question bank stocked in the background ------
+    if config.get("QuestionGenerator.Replenish.Enabled", True):
+        replenisher = create_question_bank_replenisher(llm_request_manager)
+        scheduler.add_job(
+            replenisher.replenish,
+            IntervalTrigger(
+                minutes=config.get("QuestionGenerator.Replenish.IntervalMinutes", 15)
+            ),
+            id="replenish_question_bank",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
     # ------ Initialize the text recognition service ------
     text_recognition_service = TextRecognitionService(
         llm_batch_size=10,  # TODO: move to config file
@@ -110,6 +147,8 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down scheduler...")
     scheduler.shutdown()
 
+    await flagged_questions.stop()
+
     # Now prepare databases for shutdown
     logger.info("Preparing databases for shutdown...")
     db = get_database_service()
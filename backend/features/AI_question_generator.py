@@ -12,6 +12,7 @@ import json
 from typing import Optional, List, Dict, Type, Callable, TypedDict, Any, Union
 from enum import Enum
 from utils.LLMService import LLMService
+from utils.llm_cache import LLMResultCache
 from models.LLM import (
     LLMModels,
     AIQuestionType,
@@ -401,11 +402,21 @@ class FillInRadicalList(BaseModel):
 
 
 class AIQuestionGenerator:
-    def __init__(self, client: LLMService = LLMService()) -> None:
+    def __init__(
+        self,
+        client: LLMService = LLMService(),
+        cache: Optional[LLMResultCache] = (
+            LLMResultCache()
+            if config.get("QuestionGenerator.Cache.Enabled", True)
+            else None
+        ),
+    ) -> None:
         """
         Initialize the AIQuestionGenerator with a client for generating questions.
+        With a cache, only characters without a cached item are sent to the LLM.
         """
         self.client = client
+        self.cache = cache
 
     def _extract_questions(
         self, response: Union[Dict[str, Any], List[Dict[str, Any]], None]
@@ -421,12 +432,91 @@ class AIQuestionGenerator:
             # Return an empty list if the response is not as expected
             return []
 
+    @staticmethod
+    def _adapt(adapt: Callable[[Any], Any], item: BaseModel) -> Optional[Any]:
+        """
+        Build a question from a structured item, None if the item is unusable.
+        Adaptor mutates the item (e.g. appends to similar_characters), so it gets a copy.
+        """
+        try:
+            return adapt(item.model_copy(deep=True))
+        except Exception as e:
+            logger.warning(f"Skipping malformed {type(item).__name__} {item}: {e}")
+            return None
+
+    async def _generate(
+        self,
+        chars: List[ChineseChar],
+        question_type: AIQuestionType,
+        system_prompt: str,
+        make_user_prompt: Callable[[List[ChineseChar]], str],
+        response_model: Type[BaseModel],
+        format_model: Type[BaseModel],
+        char_field: str,
+        adapt: Callable[[Any], Any],
+        max_tokens: int,
+        model: LLMModels,
+        use_cache: bool = True,
+    ) -> List[Any]:
+        """
+        Build one question per character, from cached items where possible and the LLM
+        for the rest. Malformed items are skipped, their character gets no result and is
+        retried by the batch processor. With use_cache=False every character goes to the
+        LLM, the new items still refresh the cache.
+        """
+        chars = chars if isinstance(chars, list) else [chars]
+        items: Dict[ChineseChar, BaseModel] = {}
+        if self.cache is not None and use_cache:
+            items = await self.cache.get_many(
+                chars, question_type, model, system_prompt, format_model
+            )
+        misses = [char for char in dict.fromkeys(chars) if char not in items]
+
+        generated: Dict[ChineseChar, BaseModel] = {}
+        if misses:
+            response_dict = await self.client.generate_text_with_structured_outputs(
+                system_prompt=system_prompt,
+                user_prompt=make_user_prompt(misses),
+                response_model=response_model,
+                max_tokens=max_tokens,
+                model=model,
+            )
+            logger.debug(f"Response from LLM: {response_dict}")
+            for q in self._extract_questions(response_dict):
+                try:
+                    item = format_model.model_validate(q)
+                except Exception as e:
+                    logger.warning(
+                        f"Skipping malformed {format_model.__name__} {q}: {e}"
+                    )
+                    continue
+                generated.setdefault(getattr(item, char_field), item)
+
+        questions = []
+        usable: Dict[ChineseChar, BaseModel] = {}
+        # Items for characters we didn't ask about (e.g. a variant form) are dropped,
+        # the batch processor would not match them to any caller
+        for char in chars:
+            item = items.get(char) or generated.get(char)
+            if item is None:
+                continue
+            question = self._adapt(adapt, item)
+            if question is not None:
+                questions.append(question)
+                if char in generated:
+                    usable[char] = item
+
+        if self.cache is not None:
+            await self.cache.put_many(usable, question_type, model, system_prompt)
+        return questions
+
     # Clearly define the return type for the methods
     async def batch_genq_fill_in_vocab(
         self,
         chars: List[ChineseChar],
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[FillInVocabQuestion]:
         """
         Generate a batch of fill-in-the-blank vocabulary questions based on a list of Chinese characters.
@@ -434,31 +524,29 @@ class AIQuestionGenerator:
         :param chars: List of Chinese characters to generate questions from.
         :param max_tokens: Maximum number of tokens for the response.
         :param model: The LLM model to use for generation.
+        :param use_cache: Reuse cached items, False to have the LLM write every question.
         :return: List of FillInVocabFormat questions.
         """
-        user_prompt = ", ".join(chars) if isinstance(chars, list) else chars
-
-        questions: List[Dict[str, Any]] = []
-        response_dict = await self.client.generate_text_with_structured_outputs(
+        return await self._generate(
+            chars,
+            question_type=AIQuestionType.FILL_IN_VOCAB,
             system_prompt=PROMPT_FILL_VOCAB,
-            user_prompt=user_prompt,
+            make_user_prompt=", ".join,
             response_model=FillInvocabList,
+            format_model=FillInVocabFormat,
+            char_field="given_char",
+            adapt=Adaptor.fill_in_vocab,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
-        logger.debug(f"Response from LLM: {response_dict}")
-
-        questions = self._extract_questions(response_dict)
-        return [
-            Adaptor.fill_in_vocab(FillInVocabFormat.model_validate(q))
-            for q in questions
-        ]
 
     async def batch_genq_fill_in_sentence(
         self,
         chars: List[ChineseChar],
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[FillInSentenceQuestion]:
         """
         Generate a batch of fill-in-the-blank sentence questions based on a list of Chinese characters.
@@ -466,32 +554,29 @@ class AIQuestionGenerator:
         :param chars: List of Chinese characters to generate questions from.
         :param max_tokens: Maximum number of tokens for the response.
         :param model: The LLM model to use for generation.
+        :param use_cache: Reuse cached items, False to have the LLM write every question.
         :return: List of FillInSentenceFormat questions.
         """
-        user_prompt = ", ".join(chars) if isinstance(chars, list) else chars
-
-        questions: List[Dict[str, Any]] = []
-        response_dict = await self.client.generate_text_with_structured_outputs(
+        return await self._generate(
+            chars,
+            question_type=AIQuestionType.FILL_IN_SENTENCE,
             system_prompt=PROMPT_FILL_SENTENCE,
-            user_prompt=user_prompt,
+            make_user_prompt=", ".join,
             response_model=FillInSentenceList,
+            format_model=FillInSentenceFormat,
+            char_field="given_char",
+            adapt=Adaptor.fill_in_sentence,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
 
-        logger.debug(f"Response from LLM: {response_dict}")
-        questions = self._extract_questions(response_dict)
-
-        return [
-            Adaptor.fill_in_sentence(FillInSentenceFormat.model_validate(q))
-            for q in questions
-        ]
-
     async def batch_genq_pairing_cards(
         self,
         chars: List[ChineseChar],
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[PairingCardsQuestion]:
         """
         Generate a batch of pairing cards questions based on a list of Chinese characters.
@@ -499,25 +584,25 @@ class AIQuestionGenerator:
         :param chars: List of Chinese characters to generate questions from.
         :param max_tokens: Maximum number of tokens for the response.
         :param model: The LLM model to use for generation.
+        :param use_cache: Reuse cached items, False to have the LLM write every question.
         :return: List of PairingCardsFormat questions.
         """
-        user_prompt = ", ".join(f"({char}, n=2, k=4)" for char in chars)
-        questions: List[Dict[str, Any]] = []
-        response_dict = await self.client.generate_text_with_structured_outputs(
+        return await self._generate(
+            chars,
+            question_type=AIQuestionType.PAIRING_CARDS,
             system_prompt=PROMPT_PAIRING_CARDS,
-            user_prompt=user_prompt,
+            make_user_prompt=lambda chars: ", ".join(
+                f"({char}, n=2, k=4)" for char in chars
+            ),
             response_model=PairingCardsList,
+            format_model=PairingCardsFormat,
+            char_field="target_char",
+            adapt=Adaptor.pairing_cards,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
 
-        questions = self._extract_questions(response_dict)
-
-        return [
-            Adaptor.pairing_cards(PairingCardsFormat.model_validate(q))
-            for q in questions
-        ]
-
     async def batch_genq_fill_in_radical(
         self,
         chars: list[ChineseChar],
@@ -14,8 +14,10 @@ if __name__ == "__main__":
 
 import asyncio
 import random
-from typing import List, Dict, Any
-from utils.queue_manager import QueueManager, get_global_queue_manager
+from uuid import uuid4
+from typing import List, Dict, Any, Optional
+from utils.queue_manager import QueueManager, Priority, get_global_queue_manager
+from utils.batch_tuner import BatchTuner
 from utils.LLMService import LLMService
 from models.LLM import (
     AIQuestionType,
@@ -38,13 +40,25 @@ class LLMRequestManager:
     max_wait: float = 10.0
     generator = AIQuestionGenerator()
 
-    def __init__(self, batch_size: int = 5, max_wait: float = 6):
+    def __init__(
+        self,
+        batch_size: int = 5,
+        max_wait: float = 6,
+        max_concurrent_batches: int = config.get(
+            "QuestionGenerator.Batch.MaxConcurrentBatches", 3
+        ),
+        adaptive: bool = config.get("QuestionGenerator.Batch.Adaptive.Enabled", True),
+    ):
         logger.info("init LLMRequestManager")
         self.batch_size = batch_size
         # self.queue_manager = get_queue_manager()
         self.batch_size = batch_size
         ### in seconds
         self.max_wait = max_wait
+        # Full batches dispatch right away while earlier ones are still waiting on the LLM
+        self.max_concurrent_batches = max_concurrent_batches
+        # batch_size and max_wait become the starting point and upper wait limit
+        self.adaptive = adaptive
         self.tasks: Dict[str, list] = {}
         # Create processors for each question type
         self.lock = asyncio.Lock()  # Lock to ensure thread-safe access to shared state
@@ -54,6 +68,41 @@ class LLMRequestManager:
     def __del__(self):
         logger.info("LLMRequestManager is being deleted")
 
+    def _make_tuner(self) -> BatchTuner | None:
+        """A fresh tuner per processor, each question type has its own traffic and latency."""
+        if not self.adaptive:
+            return None
+        return BatchTuner(
+            min_batch_size=config.get(
+                "QuestionGenerator.Batch.Adaptive.MinBatchSize", 1
+            ),
+            max_batch_size=config.get(
+                "QuestionGenerator.Batch.Adaptive.MaxBatchSize", 10
+            ),
+            min_wait=config.get("QuestionGenerator.Batch.Adaptive.MinWait", 0.2),
+            max_wait=self.max_wait,
+            alpha=config.get("QuestionGenerator.Batch.Adaptive.Alpha", 0.3),
+        )
+
+    @staticmethod
+    def _isolation_options() -> Dict[str, Any]:
+        """
+        Keep one bad character from failing the rest of its batch: results are matched
+        by target word, characters the LLM skipped are re-queued, and failing batches
+        are bisected down to the character that breaks them.
+        """
+        return {
+            "result_key": lambda question: question.target_word,
+            "bisect_on_error": config.get(
+                "QuestionGenerator.Batch.BisectOnError", True
+            ),
+            "max_retries": config.get("QuestionGenerator.Batch.MaxRetries", 1),
+            "max_queue_size": config.get("QuestionGenerator.Batch.MaxQueueSize", 50),
+            "max_low_queue_size": config.get(
+                "QuestionGenerator.Batch.MaxLowQueueSize", 20
+            ),
+        }
+
     def _create_processors(self):
         """Create batch processors for each AI question type."""
         logger.info("Creating processors for AI question types")
@@ -64,6 +113,11 @@ class LLMRequestManager:
                 batch_function=self._batch_process_fill_in_vocab,
                 batch_size=self.batch_size,
                 max_wait=self.max_wait,
+                max_concurrent_batches=self.max_concurrent_batches,
+                # Several users revising the same character share one LLM slot
+                dedup=True,
+                tuner=self._make_tuner(),
+                **self._isolation_options(),
             )
             self.tasks[AIQuestionType.FILL_IN_VOCAB.value] = []
 
@@ -74,6 +128,11 @@ class LLMRequestManager:
                 batch_function=self._batch_process_fill_in_sentence,
                 batch_size=self.batch_size,
                 max_wait=self.max_wait,
+                max_concurrent_batches=self.max_concurrent_batches,
+                # Several users revising the same character share one LLM slot
+                dedup=True,
+                tuner=self._make_tuner(),
+                **self._isolation_options(),
             )
             self.tasks[AIQuestionType.FILL_IN_SENTENCE.value] = []
 
@@ -84,6 +143,11 @@ class LLMRequestManager:
                 batch_function=self._batch_process_pairing_cards,
                 batch_size=self.batch_size,
                 max_wait=self.max_wait,
+                max_concurrent_batches=self.max_concurrent_batches,
+                # Several users revising the same character share one LLM slot
+                dedup=True,
+                tuner=self._make_tuner(),
+                **self._isolation_options(),
             )
             self.tasks[AIQuestionType.PAIRING_CARDS.value] = []
 
@@ -95,11 +159,13 @@ class LLMRequestManager:
         chars: List[ChineseChar],
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[FillInVocabQuestion]:
         return await self.generator.batch_genq_fill_in_vocab(
             chars=chars,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
 
     async def _batch_process_fill_in_sentence(
@@ -107,11 +173,13 @@ class LLMRequestManager:
         chars: List[ChineseChar],
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[FillInSentenceQuestion]:
         return await self.generator.batch_genq_fill_in_sentence(
             chars=chars,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
 
     async def _batch_process_pairing_cards(
@@ -120,12 +188,14 @@ class LLMRequestManager:
         n: int = 2,
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        use_cache: bool = True,
     ) -> List[PairingCardsQuestion]:
 
         return await self.generator.batch_genq_pairing_cards(
             chars=chars,
             max_tokens=max_tokens,
             model=model,
+            use_cache=use_cache,
         )
 
     async def enqueue_questions(
@@ -134,10 +204,19 @@ class LLMRequestManager:
         char: ChineseChar,
         max_tokens: int = config.get("QuestionGenerator.Batch.MaxTokens", 300),
         model: LLMModels = LLMModels.DEEPSEEK_V3,
+        timeout: float | None = config.get(
+            "QuestionGenerator.Batch.EnqueueTimeout", 30
+        ),
+        priority: Priority = Priority.HIGH,
+        use_cache: bool = True,
     ) -> Any:
         """
         Enqueue questions for processing.
-        The args of first input will be used for all remaining questions in the queue
+        Requests with different max_tokens/model/use_cache are batched separately.
+        use_cache=False skips the LLM result cache, for questions that must be new.
+        Raises QueueFullError when the question type's queue is full and TimeoutError
+        when no question arrives within timeout, callers fall back to non-AI questions.
+        Background work should pass Priority.LOW so it only fills leftover batch slots.
         """
 
         async with self.lock:  # Acquire the lock
@@ -158,6 +237,9 @@ class LLMRequestManager:
                 item=char,
                 max_tokens=max_tokens,
                 model=model,
+                timeout=timeout,
+                priority=priority,
+                use_cache=use_cache,
             )  # This task should return the result of the batch processing
             self.tasks[question_type.value].append(task)
             # logger.debug(f"task dict: {self.tasks}")
@@ -166,13 +248,35 @@ class LLMRequestManager:
         # Wait for the task to complete and return the result
         # logger.debug(f"Enqueued {char} for {question_type}, waiting for task to complete")
         # logger.debug(f"task: {task}")
-        result = await task
+        try:
+            result = await task
+        finally:
+            # Shed and timed out requests raise, don't leave them in the task list
+            async with self.lock:  # Acquire the lock again to safely modify shared state
+                self.tasks[question_type.value].remove(
+                    task
+                )  # Remove the completed task
         # logger.debug(f"Task for {question_type} completed with result: {result}")
 
-        async with self.lock:  # Acquire the lock again to safely modify shared state
-            self.tasks[question_type.value].remove(task)  # Remove the completed task
+        # Coalesced requests receive the same object, give each caller its own question
+        if result is not None:
+            result = result.model_copy(deep=True, update={"question_id": uuid4()})
         return result
 
+    def free_capacity(
+        self, question_type: AIQuestionType, priority: Priority = Priority.HIGH
+    ) -> Optional[int]:
+        """How many more `priority` requests the question type's queue accepts, None when unbounded."""
+        processor = self.queue_manager.get_processor(question_type.value)
+        return None if processor is None else processor.free_capacity(priority)
+
+    def is_saturated(
+        self, question_type: AIQuestionType, priority: Priority = Priority.HIGH
+    ) -> bool:
+        """True when the question type's queue is full for `priority` and new requests would be shed."""
+        processor = self.queue_manager.get_processor(question_type.value)
+        return processor is not None and processor.is_saturated(priority)
+
     async def flush_queue(self, question_type: AIQuestionType) -> List[Any]:
         """Flush the queue for a specific question type."""
         if question_type not in self.tasks:
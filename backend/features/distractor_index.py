@@ -0,0 +1,319 @@
+"""
+Offline index of similar characters, used as multiple-choice distractors.
+
+The index is built ahead of time from the words table (`python -m features.distractor_index`).
+The build scrapes each word's radical, stroke count, Cangjie code and Cantonese jyutping
+(WordInfo) and ranks the other characters for every character by how alike they are:
+
+- same radical
+- same jyutping syllable, whatever the tone (near-homophones)
+- similar shape: the Cangjie codes spell out a character's components in writing order,
+  so characters sharing components (清, 請 and 晴 all end in 青's QMB) have similar codes
+- similar stroke count, as a tie-breaker
+
+The stroke order itself isn't compared, the scraped WordInfo only has its animation.
+
+The ranked lists are written to a JSON file (QuestionGenerator.Distractors.Path). At run
+time they are loaded into memory, so a lookup is one dict access and a short scan. Characters
+added since the last build are missing from it, and callers fall back to their default
+choices. Rebuilding only scrapes the words not yet in the file.
+
+The build also keeps each word's phrases (WordInfoScraper.get_word_phrase), from which
+QuestionGenerator builds FILL_IN_VOCAB questions without the LLM.
+"""
+
+import asyncio
+import json
+import os
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from pydantic import BaseModel
+
+from models.helpers import APIResponse, ChineseChar
+from models.word_info import WordInfo
+from utils.config import config
+from utils.database.base import DatabaseService
+from utils.logger import setup_logger
+from utils.word_info_scraper import WordInfoScraper
+
+logger = setup_logger(__name__)
+
+DISTRACTOR_INDEX_PATH = config.get(
+    "QuestionGenerator.Distractors.Path", "data/distractor_index.json"
+)
+MAX_CANDIDATES = config.get("QuestionGenerator.Distractors.MaxCandidates", 20)
+
+# Stroke counts further apart than this add nothing to the similarity
+STROKE_SCALE = 5
+# Weight of identical Cangjie codes, partly alike codes score a fraction of it
+SHAPE_WEIGHT = 1.5
+
+
+class WordFeatures(BaseModel):
+    """What the similarity of two characters is judged on."""
+
+    radical: str
+    stroke: int
+    jyutping: List[str]  # Cantonese codes, e.g. "ngo5"
+    cangjie: str = ""  # e.g. "EQMB" for 清, empty in indexes built before it was kept
+
+    @classmethod
+    def from_word_info(cls, word_info: WordInfo) -> "WordFeatures":
+        return cls(
+            radical=word_info.radical,
+            stroke=word_info.stroke,
+            jyutping=[entry.code for entry in word_info.pingyin.cantonese],
+            cangjie=word_info.cj_code.upper(),
+        )
+
+    def sounds(self) -> FrozenSet[str]:
+        """Jyutping syllables with their tone, e.g. "ngo5"."""
+        return frozenset(
+            match.group(0)
+            for code in self.jyutping
+            if (match := re.match(r"[a-zA-Z]+[0-9]", code))
+        )
+
+    def syllables(self) -> FrozenSet[str]:
+        """Jyutping syllables without their tone, e.g. "ngo"."""
+        return frozenset(sound.rstrip("0123456789") for sound in self.sounds())
+
+    def shape_parts(self) -> FrozenSet[str]:
+        """
+        Keys of the leading and trailing components, characters sharing one are worth
+        comparing by shape. The first code is the head, the last two mostly the tail.
+        """
+        if not self.cangjie:
+            return frozenset()
+        return frozenset({f"^{self.cangjie[0]}", f"{self.cangjie[-2:]}$"})
+
+
+def rank_similar(
+    features: Dict[ChineseChar, WordFeatures], max_candidates: int = MAX_CANDIDATES
+) -> Dict[ChineseChar, List[ChineseChar]]:
+    """The `max_candidates` characters most alike each character, most alike first."""
+    by_radical: Dict[str, Set[ChineseChar]] = defaultdict(set)
+    by_syllable: Dict[str, Set[ChineseChar]] = defaultdict(set)
+    by_stroke: Dict[int, Set[ChineseChar]] = defaultdict(set)
+    by_shape: Dict[str, Set[ChineseChar]] = defaultdict(set)
+    syllables: Dict[ChineseChar, FrozenSet[str]] = {}
+    for char, word in features.items():
+        syllables[char] = word.syllables()
+        by_radical[word.radical].add(char)
+        for syllable in syllables[char]:
+            by_syllable[syllable].add(char)
+        by_stroke[word.stroke].add(char)
+        for part in word.shape_parts():
+            by_shape[part].add(char)
+
+    def similarity(char: ChineseChar, other: ChineseChar) -> float:
+        a, b = features[char], features[other]
+        score = 0.0
+        if a.radical == b.radical:
+            score += 2.0
+        if syllables[char] & syllables[other]:
+            score += 2.0
+        if a.cangjie and b.cangjie:
+            shape = SequenceMatcher(None, a.cangjie, b.cangjie, autojunk=False)
+            score += SHAPE_WEIGHT * shape.ratio()
+        return score + max(0.0, 1.0 - abs(a.stroke - b.stroke) / STROKE_SCALE)
+
+    ranked: Dict[ChineseChar, List[ChineseChar]] = {}
+    for char, word in features.items():
+        # Anything scoring well above the stroke term shares a radical, a syllable or
+        # a leading or trailing component
+        candidates = set(by_radical[word.radical])
+        for syllable in syllables[char]:
+            candidates |= by_syllable[syllable]
+        for part in word.shape_parts():
+            candidates |= by_shape[part]
+        for stroke in range(word.stroke - 2, word.stroke + 3):
+            candidates |= by_stroke.get(stroke, set())
+        candidates.discard(char)
+
+        ranked[char] = sorted(
+            candidates,
+            key=lambda other: (
+                -similarity(char, other),
+                abs(word.stroke - features[other].stroke),
+                other,
+            ),
+        )[:max_candidates]
+    return ranked
+
+
+class DistractorIndex:
+    """In-memory lookup of the characters most alike a character."""
+
+    def __init__(
+        self,
+        similar: Optional[Dict[ChineseChar, List[ChineseChar]]] = None,
+        features: Optional[Dict[ChineseChar, WordFeatures]] = None,
+        phrases: Optional[Dict[ChineseChar, List[str]]] = None,
+    ):
+        self._similar = similar or {}
+        self._sounds: Dict[ChineseChar, FrozenSet[str]] = {
+            char: word.sounds() for char, word in (features or {}).items()
+        }
+        self._phrases = phrases or {}
+        self._known_phrases: Set[str] = {
+            phrase for word_phrases in self._phrases.values() for phrase in word_phrases
+        }
+
+    @classmethod
+    def load(cls, path: str = DISTRACTOR_INDEX_PATH) -> "DistractorIndex":
+        """The index stored at `path`, empty if it hasn't been built."""
+        if not os.path.exists(path):
+            logger.warning(
+                f"No distractor index at {path}, build it with python -m features.distractor_index"
+            )
+            return cls()
+        features, similar, phrases = read_index_file(path)
+        logger.info(f"Loaded distractor index of {len(similar)} characters")
+        return cls(similar, features, phrases)
+
+    def __len__(self) -> int:
+        return len(self._similar)
+
+    def __contains__(self, char: ChineseChar) -> bool:
+        return char in self._similar
+
+    def similar(
+        self,
+        char: ChineseChar,
+        k: int = 3,
+        exclude: Iterable[str] = (),
+        distinct_sound: bool = False,
+    ) -> List[ChineseChar]:
+        """
+        Up to `k` characters most alike `char`, none if it isn't indexed.
+
+        Args:
+            exclude: Characters not to return
+            distinct_sound: Leave out exact homophones of `char`, for questions that
+                are answered by ear
+        """
+        excluded = set(exclude)
+        sounds = self._sounds.get(char, frozenset()) if distinct_sound else frozenset()
+        similar: List[ChineseChar] = []
+        for other in self._similar.get(char, []):
+            if other in excluded or sounds & self._sounds.get(other, frozenset()):
+                continue
+            similar.append(other)
+            if len(similar) >= k:
+                break
+        return similar
+
+    def phrases(self, char: ChineseChar) -> List[str]:
+        """The scraped phrases of `char`."""
+        return self._phrases.get(char, [])
+
+    def is_phrase(self, text: str) -> bool:
+        """Whether `text` is a phrase of any indexed character."""
+        return text in self._known_phrases
+
+
+def read_index_file(path: str) -> tuple[
+    Dict[ChineseChar, WordFeatures],
+    Dict[ChineseChar, List[ChineseChar]],
+    Dict[ChineseChar, List[str]],
+]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    features = {
+        char: WordFeatures.model_validate(word)
+        for char, word in data.get("words", {}).items()
+    }
+    return features, data.get("similar", {}), data.get("phrases", {})
+
+
+def write_index_file(
+    path: str,
+    features: Dict[ChineseChar, WordFeatures],
+    similar: Dict[ChineseChar, List[ChineseChar]],
+    phrases: Dict[ChineseChar, List[str]],
+):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        "words": {char: word.model_dump() for char, word in features.items()},
+        "similar": similar,
+        "phrases": phrases,
+    }
+    # Replaced in one step, workers loading it never see a partial file
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+async def build_distractor_index(
+    db: DatabaseService,
+    scraper: WordInfoScraper,
+    path: str = DISTRACTOR_INDEX_PATH,
+    max_candidates: int = MAX_CANDIDATES,
+) -> DistractorIndex:
+    """Scrape the words not in the index file yet, re-rank every word and save it."""
+    features: Dict[ChineseChar, WordFeatures] = {}
+    phrases: Dict[ChineseChar, List[str]] = {}
+    if os.path.exists(path):
+        features, _, phrases = read_index_file(path)
+
+    response: APIResponse = await db.execute_complex_query(  # type: ignore
+        "SELECT word FROM words", return_type=dict, fetch_mode="all"
+    )
+    words = [row["word"] for row in response.data or []]
+    # Words saved without a Cangjie code are scraped again to pick it up
+    new_words = [
+        word
+        for word in words
+        if word not in features or word not in phrases or not features[word].cangjie
+    ]
+    logger.info(f"Scraping {len(new_words)} of {len(words)} words for the index")
+
+    for word in new_words:
+        try:
+            word_info = await asyncio.to_thread(scraper.get_word_info, word)
+            features[word] = WordFeatures.from_word_info(word_info)
+        except Exception as e:
+            logger.error(f"Skipping {word}, could not scrape its word info: {e}")
+            continue
+        try:
+            phrase_list = await asyncio.to_thread(scraper.get_word_phrase, word_info)
+            phrases[word] = [phrase_info.phrase for phrase_info in phrase_list.phrases]
+        except Exception as e:
+            # Left empty, the next build doesn't retry it
+            logger.warning(f"Could not scrape the phrases of {word}: {e}")
+            phrases[word] = []
+
+    similar = rank_similar(features, max_candidates)
+    write_index_file(path, features, similar, phrases)
+    logger.info(f"Saved distractor index of {len(similar)} characters to {path}")
+    return DistractorIndex(similar, features, phrases)
+
+
+_distractor_index: Optional[DistractorIndex] = None
+
+
+def get_distractor_index() -> DistractorIndex:
+    """The process-wide distractor index, loaded on first use."""
+    global _distractor_index
+    if _distractor_index is None:
+        _distractor_index = DistractorIndex.load()
+    return _distractor_index
+
+
+if __name__ == "__main__":
+    from utils.database.factory import get_database_service
+    from utils.database.pgdb import PgDatabaseService
+
+    async def main():
+        db = get_database_service()
+        if isinstance(db, PgDatabaseService):
+            await db.kickstart()
+        await build_distractor_index(db, WordInfoScraper())
+
+    asyncio.run(main())
@@ -22,7 +22,15 @@ from utils.config import config
 from utils.storage_service import StorageController
 from utils.rpc_service import RPCService
 from features.LLM_request_manager import LLMRequestManager
+from utils.queue_manager import Priority
 from features.question_generator import QuestionGenerator
+from features.flagged_questions import get_flagged_questions
+from features.question_queries import (
+    CANDIDATE_QUESTIONS_QUERY,
+    QUESTIONS_BY_ID_QUERY,
+    FALLBACK_QUESTIONS_QUERY,
+)
+from utils.task_graph import TaskGraph
 
 # Import models
 from models.QnA import *
@@ -36,7 +44,13 @@ from models.helpers import (
     UUIDStr,
     APIResponse,
 )
-from models.db.db import SupabaseRPC, SupabaseTable, QuestionEntry
+from models.db.db import (
+    SupabaseRPC,
+    SupabaseTable,
+    QuestionEntry,
+    QuestionSummary,
+    Word,
+)
 
 # Import necessary services
 from utils.database.base import DatabaseService
@@ -50,7 +64,7 @@ logger = setup_logger(__name__, level="DEBUG")
 class ScoredQuestion:
     """Represents a question with its quality score."""
 
-    question_entry: QuestionEntry
+    question_entry: QuestionSummary  # Full row is loaded only once it's chosen
     score: float
     word_id: int
 
@@ -61,7 +75,7 @@ class WordQuestionBatch:
 
     word_id: int
     word: ChineseChar
-    questions: List[QuestionEntry]
+    questions: List[QuestionSummary]
     scored_questions: List[ScoredQuestion]
     good_questions: List[ScoredQuestion]
     not_good_questions: List[ScoredQuestion]
@@ -92,6 +106,7 @@ class EnhancedQuestionService:
         self.llm_request_manager = llm_request_manager
         self.storage_service = storage_service
         self.question_statistics_service = question_statistics_service
+        self.flagged_questions = get_flagged_questions()
 
         # Configuration
         self.time_weight = config.get("QuestionGenerator.Weighting.Time", 1.0)
@@ -118,6 +133,18 @@ class EnhancedQuestionService:
         self.max_never_outdated_questions = config.get(
             "QuestionGenerator.MaxNeverOutdatedQuestions", 3
         )
+        # divert: don't queue for the LLM while its queue is full, use fallbacks right away
+        self.divert_when_saturated = (
+            config.get("QuestionGenerator.Batch.ShedPolicy", "divert") == "divert"
+        )
+        # Try the template-based FILL_IN_VOCAB generator before queueing for the LLM
+        self.local_fill_in_vocab = config.get(
+            "QuestionGenerator.FillInVocab.Local", True
+        )
+        # Seconds before a deadline at which the AI is given up on for cheap fallbacks
+        self.deadline_reserve = config.get("QuestionGenerator.Deadline.Reserve", 0.5)
+        # AI generations a request stopped waiting for, still saved when they finish
+        self._late_generations: Set["asyncio.Task[Any]"] = set()
 
         # Available question types
         self.available_question_types = [
@@ -135,12 +162,21 @@ class EnhancedQuestionService:
         )
 
     async def get_revision_words(
-        self, user_id: UUIDStr, max_words: Optional[int] = None
+        self,
+        user_id: UUIDStr,
+        max_words: Optional[int] = None,
+        wrong_words: Optional[List[UserWrongChar]] = None,
+        random_words: Optional[Awaitable[List[Word]]] = None,
     ) -> List[UserWrongChar]:
         """
         Step 1: Fetch revision words using probability-based selection.
         Uses priorities as weights for more sophisticated word selection.
         Returns at most N words back.
+
+        Args:
+            wrong_words: The user's wrong words if already fetched
+            random_words: Random words fetched speculatively (at least 2 * max_words),
+                used instead of fetching them here when topping up is needed
         """
         if max_words is None:
             max_words = self.max_words
@@ -152,15 +188,22 @@ class EnhancedQuestionService:
             f"Fetching revision words for user {user_id}, max_words: {max_words}"
         )
 
+        async def get_random_words(count: int) -> List[Word]:
+            if random_words is None:
+                return await self.word_service.get_random_words(count=count)
+            return (await random_words)[:count]
+
         # Get user's wrong words
-        wrong_word_dict = await self.user_service.get_user_wrong_words(user_id=user_id)
+        if wrong_words is None:
+            wrong_words = await self.user_service.get_user_wrong_words(user_id=user_id)
+        wrong_word_dict = wrong_words
 
         if not wrong_word_dict:
             logger.warning(
                 f"No wrong words found for user {user_id}, falling back to random words"
             )
             # If no wrong words, get random words
-            random_words = await self.word_service.get_random_words(count=max_words)
+            fill_words = await get_random_words(max_words)
             return [
                 UserWrongChar(
                     word=word.word,
@@ -169,7 +212,7 @@ class EnhancedQuestionService:
                     last_wrong_at=get_time(),
                     priority=0.0,
                 )
-                for word in random_words
+                for word in fill_words
             ]
 
         # Calculate revision candidates using existing logic
@@ -184,11 +227,11 @@ class EnhancedQuestionService:
                 remaining_count = max_words - len(selected_candidates)
                 existing_word_ids = {char.word_id for char in selected_candidates}
 
-                random_words = await self.word_service.get_random_words(
-                    count=remaining_count * 2
+                fill_words = await get_random_words(
+                    remaining_count * 2
                 )  # Get extra in case of overlap
 
-                for word in random_words:
+                for word in fill_words:
                     if (
                         word.word_id not in existing_word_ids
                         and len(selected_candidates) < max_words
@@ -259,6 +302,7 @@ class EnhancedQuestionService:
         """
         Step 2: Using a single database call, fetch all unflagged questions for those words.
         Only the first 50 questions of each word should be returned using lateral join.
+        Only the columns needed for scoring are fetched, see _load_questions.
         """
         if not words:
             return []
@@ -266,36 +310,14 @@ class EnhancedQuestionService:
         word_ids = [word.word_id for word in words]
         logger.debug(f"Fetching questions for {len(word_ids)} words")
 
-        # Build the lateral join query to get at most max_questions_per_word questions per word
-        query = f"""
-        SELECT t_limited.*
-        FROM (
-            SELECT DISTINCT target_word_id
-            FROM questions q
-            WHERE q.target_word_id = ANY($word_ids)
-            AND q.question_id NOT IN (
-                SELECT DISTINCT fq.question_id 
-                FROM flagged_questions fq
-            )
-        ) t_groups
-        JOIN LATERAL (
-            SELECT *
-            FROM questions q_all
-            WHERE q_all.target_word_id = t_groups.target_word_id
-            AND q_all.question_id NOT IN (
-                SELECT DISTINCT fq.question_id 
-                FROM flagged_questions fq
-            )
-            ORDER BY q_all.created_at DESC
-            LIMIT {self.max_questions_per_word}
-        ) t_limited ON true
-        ORDER BY t_limited.target_word_id, t_limited.created_at DESC
-        """
-
         try:
+            await self.flagged_questions.ensure_loaded(self.db)
             questions_response = await self.db.execute_complex_query(
-                query=query,
-                params={"word_ids": word_ids},
+                query=CANDIDATE_QUESTIONS_QUERY,
+                params={
+                    "word_ids": word_ids,
+                    "per_word": self.max_questions_per_word,
+                },
                 return_type=dict,
                 fetch_mode="all",
             )
@@ -307,11 +329,13 @@ class EnhancedQuestionService:
                 logger.warning("No unflagged questions found for any of the words")
                 return []
 
-            # Group questions by word_id
-            word_questions: Dict[int, List[QuestionEntry]] = {}
-            for question_data in response.data:
+            # Group unflagged questions by word_id
+            word_questions: Dict[int, List[QuestionSummary]] = {}
+            for question_data in self.flagged_questions.filter(
+                response.data, lambda row: row["question_id"]
+            ):
                 try:
-                    question = QuestionEntry.model_validate(question_data)
+                    question = QuestionSummary.model_validate(question_data)
                     word_id = question.target_word_id
                     if word_id not in word_questions:
                         word_questions[word_id] = []
@@ -344,10 +368,11 @@ class EnhancedQuestionService:
             logger.error(f"Error fetching questions for words: {e}")
             return []
 
-    def score_question(self, question: QuestionEntry) -> float:
+    def score_question(self, question: QuestionSummary) -> float:
         """
         Score a question based on its "goodness".
         Current scoring is based on age and random factor.
+        Only reads the summary columns, a full QuestionEntry scores the same.
         Returns a score between 0 and 1, where higher is better.
         """
 
@@ -387,64 +412,138 @@ class EnhancedQuestionService:
 
         return min(max(score, 0.0), 1.0)  # Clamp to [0, 1]
 
+    def score_questions(
+        self,
+        questions: List[QuestionSummary],
+        rng: np.random.Generator,
+        now: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Vectorised score_question for many questions at once: the same factors and
+        weights, computed on columns pulled out of the entries once.
+        Returns an array of scores between 0 and 1, in the order of `questions`.
+        """
+        now = get_time() if now is None else now
+        created_at = np.fromiter(
+            (q.created_at for q in questions), dtype=np.float64, count=len(questions)
+        )
+        use_count = np.fromiter(
+            (q.use_count for q in questions), dtype=np.float64, count=len(questions)
+        )
+        is_never_outdated = np.fromiter(
+            (q.question_type in NEVER_OUTDATED_QUESTION_TYPES for q in questions),
+            dtype=bool,
+            count=len(questions),
+        )
+
+        # Never outdated questions get the median age factor, see score_question
+        age_hours = (now - created_at) / 3600
+        age_factor = np.where(
+            is_never_outdated, math.exp(-0.5), np.exp(-age_hours / self.age_decay_hours)
+        )
+        random_factor = rng.random(len(questions))
+        usage_factor = 1.0 - np.minimum(use_count / 100.0, 1.0)
+        # Accuracy factor disabled, until we actually record the use and correct counts
+        accuracy_factor = 1.0
+
+        score = (
+            age_factor * 0.3
+            + random_factor * 0.2
+            + usage_factor * 0.3
+            + accuracy_factor * 0.2
+        )
+        return np.clip(score, 0.0, 1.0)
+
     def classify_questions_by_goodness(
-        self, batches: List[WordQuestionBatch]
+        self,
+        batches: List[WordQuestionBatch],
+        rng: Optional[np.random.Generator] = None,
     ) -> List[WordQuestionBatch]:
         """
         Step 3: Score and classify questions based on their "goodness".
         Uses probability-based classification where higher scores have higher probability of being classified as good.
+
+        All questions of all batches are scored and classified together in a few array
+        operations, drawing from a single generator (pass a seeded `rng` for repeatable
+        results).
         """
-        rng = np.random.default_rng()
+        rng = rng or np.random.default_rng()
 
         # First, randomize the order of batches to prevent bias
-        random.shuffle(batches)
-
-        for batch in batches:
-            # Score all questions
-            for question in batch.questions:
-                score = self.score_question(question)
-                scored_question = ScoredQuestion(
-                    question_entry=question, score=score, word_id=batch.word_id
-                )
-                batch.scored_questions.append(scored_question)
-
-            # Sort by score (highest first)
-            batch.scored_questions.sort(key=lambda x: x.score, reverse=True)
-
-            # Probability-based classification
-            # Transform score to probability using sigmoid-like function centered around threshold
-            for scored_question in batch.scored_questions:
-                # Convert score to probability of being "good"
-                # Using sigmoid function: P(good) = 1 / (1 + exp(-k * (score - threshold)))
-                # where k (SigmoidSteepness in config.yaml) controls the steepness of the transition
-                prob_good = 1 / (
-                    1
-                    + np.exp(
-                        -self.question_classify_sigmoid_steepness
-                        * (scored_question.score - self.question_goodness_threshold)
-                    )
-                )
+        batches[:] = [batches[i] for i in rng.permutation(len(batches))]
 
-                # Generate random number and classify based on probability
-                if rng.random() < prob_good:
-                    batch.good_questions.append(scored_question)
-                else:
-                    batch.not_good_questions.append(scored_question)
+        questions = [q for batch in batches for q in batch.questions]
+        if not questions:
+            return batches
+        group = np.repeat(
+            np.arange(len(batches)), [len(batch.questions) for batch in batches]
+        )
+        scores = self.score_questions(questions, rng)
+
+        # Highest score first within each batch, ties keep their fetched order
+        order = np.lexsort((-scores, group))
+
+        # Transform score to probability using sigmoid-like function centered around threshold
+        # P(good) = 1 / (1 + exp(-k * (score - threshold)))
+        # where k (SigmoidSteepness in config.yaml) controls the steepness of the transition
+        prob_good = 1 / (
+            1
+            + np.exp(
+                -self.question_classify_sigmoid_steepness
+                * (scores[order] - self.question_goodness_threshold)
+            )
+        )
+        is_good = rng.random(len(order)) < prob_good
+
+        for index, good in zip(order.tolist(), is_good.tolist()):
+            batch = batches[group[index]]
+            scored_question = ScoredQuestion(
+                question_entry=questions[index],
+                score=float(scores[index]),
+                word_id=batch.word_id,
+            )
+            batch.scored_questions.append(scored_question)
+            if good:
+                batch.good_questions.append(scored_question)
+            else:
+                batch.not_good_questions.append(scored_question)
 
+        for batch in batches:
             logger.debug(
                 f"Word {batch.word}: {len(batch.good_questions)} good, {len(batch.not_good_questions)} not good questions (probability-based)"
             )
 
         return batches
 
+    def _should_divert(
+        self, question_type: AIQuestionType, priority: Priority = Priority.HIGH
+    ) -> bool:
+        """Whether to skip the LLM for this question type because its queue is full for `priority`."""
+        return self.divert_when_saturated and self.llm_request_manager.is_saturated(
+            question_type, priority
+        )
+
+    def llm_saturated(self, priority: Priority = Priority.HIGH) -> bool:
+        """Whether any AI question type's queue is full for `priority`."""
+        return any(
+            self.llm_request_manager.is_saturated(AIQuestionType(qtype.value), priority)
+            for qtype in self.available_question_types
+            if qtype.value in {t.value for t in AIQuestionType}
+        )
+
     async def generate_ai_questions_for_words(
         self,
         words_needing_questions: List[Tuple[ChineseChar, QuestionType]],
         user_id: UUIDStr,
+        priority: Priority = Priority.HIGH,
+        fresh: bool = False,
     ) -> Dict[Tuple[ChineseChar, QuestionType], Optional[QuestionBase]]:
         """
         Step 4: Use AI to generate questions for words that don't have good enough questions.
         Returns a mapping of (word, question_type) to generated questions.
+        `priority` is the LLM queue lane, retries and background work use Priority.LOW.
+        `fresh` skips the LLM result cache and the local templates, for questions that are
+        saved to the bank and should not repeat the ones already there.
         """
         if not words_needing_questions:
             return {}
@@ -465,6 +564,7 @@ class EnhancedQuestionService:
         # Create futures for ALL question generation tasks simultaneously
         all_futures = []
         future_mappings = []  # List of (word, qtype) tuples corresponding to futures
+        listening_words: List[ChineseChar] = []
 
         # Process each question type
         for qtype, words in type_groups.items():
@@ -490,30 +590,64 @@ class EnhancedQuestionService:
                             )
                             results[(word, qtype)] = None
                     else:  # LISTENING
-                        # LISTENING is async, so create a future
-                        future = asyncio.ensure_future(
-                            self.question_generator.create_listening_question(
-                                char=word,
-                                db=self.db,
-                            )
-                        )
-                        all_futures.append(future)
-                        future_mappings.append((word, qtype))
+                        # Generated together below, with one pronunciation lookup
+                        listening_words.append(word)
             else:
                 # AI-generated questions (create futures for all)
                 ai_question_types = {qtype.value: qtype for qtype in AIQuestionType}
+                if (
+                    qtype == QuestionType.FILL_IN_VOCAB
+                    and self.local_fill_in_vocab
+                    and not fresh
+                ):
+                    # Built from the offline distractor index in microseconds, only
+                    # the words it can't cover are queued for the LLM
+                    for word in words:
+                        question = (
+                            self.question_generator.create_local_fill_in_vocab_question(
+                                word
+                            )
+                        )
+                        if question is not None:
+                            results[(word, qtype)] = question
+                    words = [word for word in words if (word, qtype) not in results]
+                    logger.debug(
+                        f"Built {len(type_groups[qtype]) - len(words)} {qtype.value} questions locally"
+                    )
+                    if not words:
+                        continue
                 if qtype.value in ai_question_types:
+                    if self._should_divert(ai_question_types[qtype.value], priority):
+                        logger.warning(
+                            f"{qtype.value} queue is full, diverting {len(words)} words to fallbacks"
+                        )
+                        for word in words:
+                            results[(word, qtype)] = None
+                        continue
                     for word in words:
                         future = asyncio.ensure_future(
                             self.question_generator.create_ai_question(
                                 char=word,
                                 question_type=qtype,
                                 llm_request_manager=self.llm_request_manager,
+                                priority=priority,
+                                use_cache=not fresh,
                             )
                         )
                         all_futures.append(future)
                         future_mappings.append((word, qtype))
 
+        # One pronunciation lookup for all the listening words, alongside the AI
+        listening_future = (
+            asyncio.ensure_future(
+                self.question_generator.create_listening_questions(
+                    listening_words, db=self.db
+                )
+            )
+            if listening_words
+            else None
+        )
+
         # Wait for ALL futures to complete simultaneously
         if all_futures:
             logger.debug(
@@ -534,6 +668,15 @@ class EnhancedQuestionService:
                     # result should be a QuestionBase object
                     results[(word, qtype)] = result  # type: ignore
 
+        if listening_future is not None:
+            try:
+                listening_questions = await listening_future
+            except Exception as e:
+                logger.error(f"Error generating listening questions: {e}")
+                listening_questions = {}
+            for word in listening_words:
+                results[(word, QuestionType.LISTENING)] = listening_questions.get(word)
+
         # Validate generated questions match target words
         validated_results = {}
         for (word, qtype), question in results.items():
@@ -596,39 +739,46 @@ class EnhancedQuestionService:
             return saved_questions
 
         try:
-            # Perform batch insert - single database call
+            # Perform batch insert - single database call (COPY for large batches)
             logger.debug(f"Batch inserting {len(batch_data)} questions")
             insert_results = await self.db.insert_data(
                 SupabaseTable.QUESTIONS,
                 batch_data,
             )
 
-            # Process results and update question_ids
-            if insert_results and len(insert_results) == len(question_mapping):
-                for i, result in enumerate(insert_results):
-                    (word, qtype), question = question_mapping[i]
+            # Match results by question_id (generated in QuestionEntry), the order
+            # rows come back in is not guaranteed
+            pending = {
+                str(row["question_id"]): mapping
+                for row, mapping in zip(batch_data, question_mapping)
+            }
+            for result in insert_results or []:
+                if not isinstance(result, dict) or "question_id" not in result:
+                    logger.error(
+                        f"Invalid result format for inserted question: {result}"
+                    )
+                    continue
+                mapping = pending.pop(str(result["question_id"]), None)
+                if mapping is None:
+                    logger.error(
+                        f"Unexpected inserted question {result['question_id']}"
+                    )
+                    continue
+                (word, qtype), question = mapping
+                # Update the question_id with the database-assigned ID
+                question.question_id = result["question_id"]
+                saved_questions[(word, qtype)] = question
 
-                    # Update the question_id with the database-assigned ID
-                    # Type-safe access to dictionary result
-                    if isinstance(result, dict) and "question_id" in result:
-                        question.question_id = result["question_id"]
-                        saved_questions[(word, qtype)] = question
+                logger.debug(
+                    f"Saved {qtype.value} question for {word} with ID: {question.question_id}"
+                )
 
-                        logger.debug(
-                            f"Saved {qtype.value} question for {word} with ID: {question.question_id}"
-                        )
-                    else:
-                        logger.error(
-                            f"Invalid result format for {qtype.value} question for {word}"
-                        )
-                        saved_questions[(word, qtype)] = None
-            else:
+            if pending:
                 logger.error(
-                    f"Batch insert result count mismatch: expected {len(question_mapping)}, got {len(insert_results) if insert_results else 0}"
+                    f"Batch insert result count mismatch: expected {len(question_mapping)}, got {len(question_mapping) - len(pending)}"
                 )
-                # Fall back to marking all as failed
-                for (word, qtype), question in question_mapping:
-                    saved_questions[(word, qtype)] = None
+            for (word, qtype), question in pending.values():
+                saved_questions[(word, qtype)] = None
 
         except Exception as e:
             logger.error(f"Error in batch insert operation: {e}")
@@ -641,6 +791,69 @@ class EnhancedQuestionService:
         )
         return saved_questions
 
+    async def _generate_and_save(
+        self,
+        words_needing_questions: List[Tuple[ChineseChar, QuestionType]],
+        user_id: UUIDStr,
+        priority: Priority = Priority.HIGH,
+    ) -> Dict[Tuple[ChineseChar, QuestionType], Optional[QuestionBase]]:
+        """
+        generate_ai_questions_for_words then save_generated_questions. If the caller
+        stops waiting (its deadline passed) the work carries on, so the questions are
+        still saved for later games.
+        """
+
+        async def generate_and_save():
+            return await self.save_generated_questions(
+                await self.generate_ai_questions_for_words(
+                    words_needing_questions, user_id, priority=priority
+                )
+            )
+
+        generation = asyncio.ensure_future(generate_and_save())
+        self._late_generations.add(generation)
+        generation.add_done_callback(self._on_generation_done)
+        return await asyncio.shield(generation)
+
+    def _on_generation_done(self, generation: "asyncio.Task[Any]"):
+        self._late_generations.discard(generation)
+        if not generation.cancelled() and generation.exception() is not None:
+            logger.error(f"Error generating questions: {generation.exception()}")
+
+    async def _create_copy_stroke_questions(
+        self,
+        words: List[ChineseChar],
+        user_id: UUIDStr,
+        timeout: Optional[float] = None,
+    ) -> List[QuestionBase]:
+        """
+        COPY_STROKE questions for `words`, built locally without the LLM and saved.
+        The cheapest new questions there are, used when a deadline is running out.
+        If saving takes longer than `timeout` the built questions are returned and the
+        save carries on in the background (their question_ids are generated locally).
+        """
+        generated: Dict[Tuple[ChineseChar, QuestionType], Optional[QuestionBase]] = {}
+        for word in words:
+            try:
+                generated[(word, QuestionType.COPY_STROKE)] = (
+                    self.question_generator.create_copy_stroke_question(
+                        char=word,
+                        user_id=user_id,
+                        storage_service=self.storage_service,
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Error generating copy_stroke question for {word}: {e}")
+        save = asyncio.ensure_future(self.save_generated_questions(dict(generated)))
+        self._late_generations.add(save)
+        save.add_done_callback(self._on_generation_done)
+        try:
+            saved = await asyncio.wait_for(asyncio.shield(save), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Saving {len(generated)} copy_stroke questions is slow")
+            saved = generated
+        return [question for question in saved.values() if question is not None]
+
     def _calculate_revision_words(
         self, wrong_chars: List[UserWrongChar]
     ) -> List[UserWrongChar]:
@@ -686,21 +899,15 @@ class EnhancedQuestionService:
             f"Using fallback questions for {len(word_ids)} words, need {needed_count} questions"
         )
 
-        query = """
-        SELECT * FROM questions q
-        WHERE q.target_word_id = ANY($word_ids)
-        AND q.question_id NOT IN (
-            SELECT DISTINCT fq.question_id 
-            FROM flagged_questions fq
-        )
-        ORDER BY q.created_at DESC
-        LIMIT $needed_count
-        """
-
         try:
+            await self.flagged_questions.ensure_loaded(self.db)
             questions_response = await self.db.execute_complex_query(
-                query=query,
-                params={"word_ids": word_ids, "needed_count": needed_count},
+                query=FALLBACK_QUESTIONS_QUERY,
+                params={
+                    "word_ids": word_ids,
+                    "flagged_ids": self.flagged_questions.ids(),
+                    "limit": needed_count,
+                },
                 return_type=dict,
                 fetch_mode="all",
             )
@@ -743,19 +950,55 @@ class EnhancedQuestionService:
             logger.error(f"Error converting question entry to QuestionBase: {e}")
             return None
 
-    def _collect_good_existing_questions(
+    async def _load_questions(
+        self, chosen: List[ScoredQuestion], user_id: UUIDStr
+    ) -> List[Optional[QuestionBase]]:
+        """
+        Second phase of the candidate fetch: load the full rows of the chosen questions
+        in one query and convert them. Returns one entry per chosen question, None where
+        the row is gone or could not be converted.
+        """
+        if not chosen:
+            return []
+        try:
+            response: APIResponse = await self.db.execute_complex_query(  # type: ignore
+                query=QUESTIONS_BY_ID_QUERY,
+                params={"question_ids": [q.question_entry.question_id for q in chosen]},
+                return_type=dict,
+                fetch_mode="all",
+            )
+        except Exception as e:
+            logger.error(f"Error loading chosen questions: {e}")
+            return [None] * len(chosen)
+
+        entries: Dict[str, QuestionEntry] = {}
+        for question_data in response.data or []:
+            try:
+                entry = QuestionEntry.model_validate(question_data)
+                entries[str(entry.question_id)] = entry
+            except Exception as e:
+                logger.error(f"Error validating question entry: {e}")
+
+        loaded: List[Optional[QuestionBase]] = []
+        for scored in chosen:
+            entry = entries.get(str(scored.question_entry.question_id))
+            loaded.append(
+                self._convert_question_to_base(entry, user_id) if entry else None
+            )
+        return loaded
+
+    async def _collect_good_existing_questions(
         self, word_batches: List[WordQuestionBatch], user_id: UUIDStr, count: int
     ) -> Tuple[List[QuestionBase], List[WordQuestionBatch]]:
         """
         Collect good existing questions with limits on never outdated questions.
         Returns (collected_questions, remaining_batches).
         """
-        final_questions: List[QuestionBase] = []
-        used_batches: Set[int] = set()
+        chosen: List[Tuple[WordQuestionBatch, ScoredQuestion]] = []
         never_outdated_count = 0
 
         for batch in word_batches:
-            if len(final_questions) >= count:
+            if len(chosen) >= count:
                 break
 
             if batch.good_questions:
@@ -776,18 +1019,18 @@ class EnhancedQuestionService:
                     )
                     continue
 
-                question_base = self._convert_question_to_base(
-                    best_question.question_entry, user_id
-                )
-
-                if question_base:
-                    final_questions.append(question_base)
-                    used_batches.add(batch.word_id)
+                chosen.append((batch, best_question))
+                if is_never_outdated:
+                    never_outdated_count += 1
 
-                    if is_never_outdated:
-                        never_outdated_count += 1
-
-                    logger.debug(f"Using good existing question for word {batch.word}")
+        final_questions: List[QuestionBase] = []
+        used_batches: Set[int] = set()
+        loaded = await self._load_questions([q for _, q in chosen], user_id)
+        for (batch, _), question_base in zip(chosen, loaded):
+            if question_base:
+                final_questions.append(question_base)
+                used_batches.add(batch.word_id)
+                logger.debug(f"Using good existing question for word {batch.word}")
 
         # Return remaining batches that weren't used
         remaining_batches = [
@@ -842,7 +1085,7 @@ class EnhancedQuestionService:
 
         return collected_questions, failed_words
 
-    def _collect_recycled_questions(
+    async def _collect_recycled_questions(
         self,
         word_batches: List[WordQuestionBatch],
         failed_words: List[Tuple[ChineseChar, QuestionType]],
@@ -852,22 +1095,22 @@ class EnhancedQuestionService:
         """
         Collect recycled questions from not-good questions for words where AI failed.
         """
-        collected_questions: List[QuestionBase] = []
         failed_word_set = {word for word, _ in failed_words}
+        chosen: List[Tuple[WordQuestionBatch, ScoredQuestion]] = []
 
         for batch in word_batches:
-            if len(collected_questions) >= needed_count:
+            if len(chosen) >= needed_count:
                 break
 
             if batch.word in failed_word_set and batch.not_good_questions:
-                best_not_good = batch.not_good_questions[0]
-                question_base = self._convert_question_to_base(
-                    best_not_good.question_entry, user_id
-                )
+                chosen.append((batch, batch.not_good_questions[0]))
 
-                if question_base:
-                    collected_questions.append(question_base)
-                    logger.debug(f"Using recycled question for word {batch.word}")
+        collected_questions: List[QuestionBase] = []
+        loaded = await self._load_questions([q for _, q in chosen], user_id)
+        for (batch, _), question_base in zip(chosen, loaded):
+            if question_base:
+                collected_questions.append(question_base)
+                logger.debug(f"Using recycled question for word {batch.word}")
 
         return collected_questions
 
@@ -894,9 +1137,11 @@ class EnhancedQuestionService:
         failed_words: List[Tuple[ChineseChar, QuestionType]],
         user_id: UUIDStr,
         needed_count: int,
+        allow_ai: bool = True,
     ) -> List[QuestionBase]:
         """
         Handle fallback strategy: randomly choose between AI generation and recycling.
+        Only recycles when `allow_ai` is False, e.g. when a deadline is close.
         """
         collected_questions: List[QuestionBase] = []
 
@@ -904,15 +1149,22 @@ class EnhancedQuestionService:
             return collected_questions
 
         # Randomly choose strategy: True for AI retry, False for recycling
-        use_ai_retry = random.choice([True, False])
+        use_ai_retry = allow_ai and random.choice([True, False])
+        ai_question_types = {qtype.value: qtype for qtype in AIQuestionType}
+        if use_ai_retry and any(
+            self._should_divert(ai_question_types[qtype.value], Priority.LOW)
+            for _, qtype in failed_words
+            if qtype.value in ai_question_types
+        ):
+            # Retrying would only be shed again
+            use_ai_retry = False
 
         if use_ai_retry:
             logger.info("Attempting AI retry for failed questions")
-            # Try AI generation again for failed words
-            ai_questions = await self.generate_ai_questions_for_words(
-                failed_words, user_id
+            # Try AI generation again for failed words, behind first attempts in the queue
+            saved_ai_questions = await self._generate_and_save(
+                failed_words, user_id, priority=Priority.LOW
             )
-            saved_ai_questions = await self.save_generated_questions(ai_questions)
 
             ai_collected, still_failed = self._collect_ai_generated_questions(
                 saved_ai_questions, needed_count
@@ -922,7 +1174,7 @@ class EnhancedQuestionService:
             # If AI retry still fails, fall back to recycling
             if len(collected_questions) < needed_count and still_failed:
                 logger.info("AI retry failed, falling back to recycling")
-                recycled = self._collect_recycled_questions(
+                recycled = await self._collect_recycled_questions(
                     word_batches,
                     still_failed,
                     user_id,
@@ -932,19 +1184,18 @@ class EnhancedQuestionService:
         else:
             logger.info("Using recycled questions for failed words")
             # Try recycling first
-            recycled = self._collect_recycled_questions(
+            recycled = await self._collect_recycled_questions(
                 word_batches, failed_words, user_id, needed_count
             )
             collected_questions.extend(recycled)
 
             # If recycling doesn't provide enough, try AI generation
-            if len(collected_questions) < needed_count:
+            if len(collected_questions) < needed_count and allow_ai:
                 logger.info("Recycling insufficient, attempting AI generation")
                 remaining_failed = failed_words[len(collected_questions) :]
-                ai_questions = await self.generate_ai_questions_for_words(
-                    remaining_failed, user_id
+                saved_ai_questions = await self._generate_and_save(
+                    remaining_failed, user_id, priority=Priority.LOW
                 )
-                saved_ai_questions = await self.save_generated_questions(ai_questions)
 
                 ai_collected, _ = self._collect_ai_generated_questions(
                     saved_ai_questions, needed_count - len(collected_questions)
@@ -953,16 +1204,85 @@ class EnhancedQuestionService:
 
         return collected_questions
 
+    async def revalidate_questions(
+        self,
+        user_id: UUIDStr,
+        questions: List[QuestionBase],
+        wrong_words: List[ChineseChar],
+    ) -> List[QuestionBase]:
+        """
+        Cheap refresh of a question set built before `wrong_words` were recorded.
+        Words the set doesn't cover yet get their best stored question swapped in for
+        the last questions of the set, so the size stays the same. No AI generation.
+        """
+        covered = {q.target_word for q in questions}
+        new_words = [word for word in dict.fromkeys(wrong_words) if word not in covered]
+        if not new_words:
+            return questions
+
+        now = get_time()
+        word_batches = self.classify_questions_by_goodness(
+            await self.fetch_questions_for_words(
+                [
+                    UserWrongChar(
+                        word=word,
+                        word_id=to_unicodeInt_from_char(word),
+                        wrong_count=1,
+                        last_wrong_at=now,
+                    )
+                    for word in new_words
+                ]
+            )
+        )
+        replacements, _ = await self._collect_good_existing_questions(
+            word_batches, user_id, len(new_words)
+        )
+
+        # Replace from the end, never a question for a word that was just got wrong
+        revalidated = list(questions)
+        slot = len(revalidated) - 1
+        for replacement in replacements:
+            while slot >= 0 and revalidated[slot].target_word in wrong_words:
+                slot -= 1
+            if slot < 0:
+                break
+            revalidated[slot] = replacement
+            slot -= 1
+
+        logger.info(
+            f"Revalidated prefetched questions for user {user_id}: "
+            f"{len(replacements)} swapped in for {len(new_words)} new wrong words"
+        )
+        return revalidated
+
     async def generate_questions_for_user(
         self,
         user_id: UUIDStr,
         count: int = 10,
         max_words: Optional[int] = None,
+        deadline: Optional[float] = None,
+        priority: Priority = Priority.HIGH,
     ) -> List[QuestionBase]:
         """
         Main method implementing the 6-step question generation logic.
-        Now refactored into smaller, focused methods.
+
+        The steps run as a TaskGraph, each one starting as soon as its inputs are ready:
+        the random-word fill is fetched alongside the user's wrong words, and the final
+        database fallback is queried alongside AI generation. The per-step timing is
+        logged at the end.
+
+        Args:
+            deadline: Seconds the caller can wait. Once fewer than deadline_reserve are
+                left, the step being waited for (a database query or the AI) is given
+                up on, and the set is completed with recycled not-good questions, the
+                database fallback and new COPY_STROKE questions, each bounded by the
+                time left. AI questions arriving later are still saved.
+            priority: LLM queue lane of the AI step, Priority.LOW for background work
+                such as the next game's prefetch
         """
+        loop = asyncio.get_running_loop()
+        deadline_at = None if deadline is None else loop.time() + deadline
+        graph = TaskGraph(f"generate_questions_for_user({user_id})")
         try:
             logger.info(
                 f"Starting question generation for user {user_id}, count: {count}"
@@ -970,76 +1290,214 @@ class EnhancedQuestionService:
 
             # Step 1: Fetch revision words
             max_words_to_fetch = min(max_words or self.max_words, count * 2)
-            revision_words = await self.get_revision_words(user_id, max_words_to_fetch)
-
-            if not revision_words:
-                logger.error(f"No revision words available for user {user_id}")
-                raise ValueError("No words available for question generation")
-
-            logger.debug(f"Got {len(revision_words)} revision words")
+            graph.add(
+                "wrong_words",
+                lambda: self.user_service.get_user_wrong_words(user_id=user_id),
+            )
+            # Speculative, only used if the wrong words don't fill max_words_to_fetch
+            graph.add(
+                "random_words",
+                lambda: self.word_service.get_random_words(
+                    count=max_words_to_fetch * 2
+                ),
+            )
 
-            # Step 2: Fetch questions
-            word_batches = await self.fetch_questions_for_words(revision_words)
+            async def revision_words_step(wrong_words):
+                revision_words = await self.get_revision_words(
+                    user_id,
+                    max_words_to_fetch,
+                    wrong_words=wrong_words,
+                    random_words=graph.task("random_words"),
+                )
+                if not revision_words:
+                    logger.error(f"No revision words available for user {user_id}")
+                    raise ValueError("No words available for question generation")
+                logger.debug(f"Got {len(revision_words)} revision words")
+                return revision_words
+
+            graph.add("revision_words", revision_words_step, after=["wrong_words"])
+
+            # Steps 2 and 3: Fetch questions, score and classify
+            async def batches_step(revision_words):
+                return self.classify_questions_by_goodness(
+                    await self.fetch_questions_for_words(revision_words)
+                )
 
-            # Step 3: Score and classify
-            word_batches = self.classify_questions_by_goodness(word_batches)
+            graph.add("batches", batches_step, after=["revision_words"])
 
             # Step 4: Collect good existing questions (with limits)
-            final_questions, remaining_batches = self._collect_good_existing_questions(
-                word_batches, user_id, count
+            graph.add(
+                "existing",
+                lambda word_batches: self._collect_good_existing_questions(
+                    word_batches, user_id, count
+                ),
+                after=["batches"],
             )
 
-            # Step 5: Generate AI questions if needed
-            if len(final_questions) < count:
+            def budget(reserve: float = 0.0) -> Optional[float]:
+                """Seconds left until `reserve` before the deadline, None without one."""
+                if deadline_at is None:
+                    return None
+                return max(0.0, deadline_at - reserve - loop.time())
+
+            # Every database step is bounded by the deadline, keeping deadline_reserve
+            # for the degraded path: the database fallback and COPY_STROKE questions.
+            # Shielded, so a late step doesn't cancel the random words others may use.
+            revision_words: List[UserWrongChar] = []
+            word_batches: List[WordQuestionBatch] = []
+            final_questions: List[QuestionBase] = []
+            remaining_batches: List[WordQuestionBatch] = []
+            out_of_time = False
+            try:
+                revision_words = await asyncio.wait_for(
+                    asyncio.shield(graph.task("revision_words")),
+                    budget(self.deadline_reserve),
+                )
+                word_batches = await asyncio.wait_for(
+                    asyncio.shield(graph.task("batches")), budget(self.deadline_reserve)
+                )
+                final_questions, remaining_batches = await asyncio.wait_for(
+                    asyncio.shield(graph.task("existing")),
+                    budget(self.deadline_reserve),
+                )
+            except asyncio.TimeoutError:
+                out_of_time = True
+                logger.warning(
+                    f"Deadline of {deadline}s close for user {user_id} while fetching "
+                    "existing questions, using fallback and copy_stroke questions"
+                )
+
+            if len(final_questions) < count and not out_of_time:
                 needed_count = count - len(final_questions)
+
+                # Final database fallback, queried while the AI generates in case it
+                # falls short
+                all_word_ids = [batch.word_id for batch in word_batches]
+                graph.add(
+                    "fallback",
+                    lambda: self.get_fallback_questions(all_word_ids, needed_count),
+                )
+
+                # Steps 5 and 6: Generate AI questions, with the fallback strategy for
+                # failed AI generations
                 words_needing_questions = self._identify_words_needing_questions(
                     remaining_batches, needed_count
                 )
 
-                if words_needing_questions:
+                async def ai_step():
+                    if not words_needing_questions:
+                        return []
+
                     logger.info(
                         f"Generating AI questions for {len(words_needing_questions)} words"
                     )
-                    ai_questions = await self.generate_ai_questions_for_words(
-                        words_needing_questions, user_id
-                    )
-                    saved_ai_questions = await self.save_generated_questions(
-                        ai_questions
+                    saved_ai_questions = await self._generate_and_save(
+                        words_needing_questions, user_id, priority=priority
                     )
 
-                    ai_collected, failed_words = self._collect_ai_generated_questions(
+                    collected, failed_words = self._collect_ai_generated_questions(
                         saved_ai_questions, needed_count
                     )
-                    final_questions.extend(ai_collected)
-
-                    # Step 6: Handle fallback strategy for failed AI generations
-                    if len(final_questions) < count and failed_words:
-                        fallback_questions = await self._handle_fallback_strategy(
-                            word_batches,
-                            failed_words,
-                            user_id,
-                            count - len(final_questions),
+                    if len(collected) < needed_count and failed_words:
+                        collected.extend(
+                            await self._handle_fallback_strategy(
+                                word_batches,
+                                failed_words,
+                                user_id,
+                                needed_count - len(collected),
+                                # An AI retry would likely run past the deadline
+                                allow_ai=deadline_at is None
+                                or deadline_at - loop.time()
+                                > 2 * self.deadline_reserve,
+                            )
                         )
-                        final_questions.extend(fallback_questions)
+                    return collected
+
+                ai_task = graph.add("ai", ai_step)
+                await asyncio.wait([ai_task], timeout=budget(self.deadline_reserve))
+                if ai_task.done():
+                    final_questions.extend(ai_task.result())
+                else:
+                    # Cancelling the step at the end leaves the generation running,
+                    # it's saved for later games
+                    out_of_time = True
+                    logger.warning(
+                        f"Deadline of {deadline}s close for user {user_id}, "
+                        f"using recycled questions instead of waiting for the AI"
+                    )
+                    try:
+                        final_questions.extend(
+                            await asyncio.wait_for(
+                                self._collect_recycled_questions(
+                                    word_batches,
+                                    words_needing_questions,
+                                    user_id,
+                                    count - len(final_questions),
+                                ),
+                                budget(self.deadline_reserve / 2),
+                            )
+                        )
+                    except asyncio.TimeoutError:
+                        logger.warning(
+                            f"No time left to recycle questions for {user_id}"
+                        )
+
+            # Words to complete the set from, the random words if even the revision
+            # words weren't ready in time
+            candidate_words = [batch.word for batch in word_batches] or [
+                word.word for word in revision_words
+            ]
+            random_words = graph.task("random_words")
+            if not candidate_words and random_words.done():
+                if not random_words.cancelled() and random_words.exception() is None:
+                    candidate_words = [word.word for word in random_words.result()]
 
             # Final database fallback if still needed
-            if len(final_questions) < count:
+            if len(final_questions) < count and "fallback" not in graph and out_of_time:
+                fallback_word_ids = [
+                    to_unicodeInt_from_char(w) for w in candidate_words
+                ]
                 needed_count = count - len(final_questions)
-                all_word_ids = [batch.word_id for batch in word_batches]
-
-                fallback_questions = await self.get_fallback_questions(
-                    all_word_ids, needed_count
+                graph.add(
+                    "fallback",
+                    lambda: self.get_fallback_questions(
+                        fallback_word_ids, needed_count
+                    ),
                 )
-
+            if len(final_questions) < count and "fallback" in graph:
+                try:
+                    fallback_questions = await asyncio.wait_for(
+                        graph.get("fallback"), budget(self.deadline_reserve / 2)
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"No time left for fallback questions for {user_id}")
+                    fallback_questions = []
+                chosen_ids = {str(q.question_id) for q in final_questions}
                 for question_entry in fallback_questions:
                     if len(final_questions) >= count:
                         break
+                    if str(question_entry.question_id) in chosen_ids:
+                        continue
 
                     question_base = self._convert_question_to_base(
                         question_entry, user_id
                     )
                     if question_base:
                         final_questions.append(question_base)
+                        chosen_ids.add(str(question_base.question_id))
+
+            # Past the deadline there's no time for the AI, but stroke copying needs none
+            if len(final_questions) < count and out_of_time:
+                covered_words = {q.target_word for q in final_questions}
+                final_questions.extend(
+                    await self._create_copy_stroke_questions(
+                        [word for word in candidate_words if word not in covered_words][
+                            : count - len(final_questions)
+                        ],
+                        user_id,
+                        timeout=budget(),
+                    )
+                )
 
             # Final validation
             if not final_questions:
@@ -1060,3 +1518,8 @@ class EnhancedQuestionService:
         except Exception as e:
             logger.error(f"Error in question generation for user {user_id}: {e}")
             raise
+
+        finally:
+            # Cancels the steps whose result wasn't needed, e.g. an unused fallback
+            await graph.close()
+            logger.info(graph.summary())
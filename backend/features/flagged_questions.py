@@ -0,0 +1,147 @@
+"""
+In-process set of flagged question ids.
+
+Flagged questions are few and change rarely, so instead of every candidate query
+anti-joining flagged_questions, each process keeps their ids in memory and filters the
+fetched rows in Python (a set lookup per row).
+
+- The set is loaded from the database at startup (or on first use) and reloaded
+  periodically by the app's scheduler, which also picks up flags removed in review.
+- GameService.flag_question adds the id locally and sends a Postgres NOTIFY on
+  FLAGGED_QUESTIONS_CHANNEL; every worker LISTENs there and adds the id to its own set,
+  and reloads the set if its listening connection had to be reopened.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, TypeVar
+from uuid import UUID
+
+from models.helpers import APIResponse, UUIDStr
+from utils.database.base import DatabaseService
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FLAGGED_QUESTIONS_CHANNEL = "flagged_questions"
+
+T = TypeVar("T")
+
+
+def _normalize(question_id: UUIDStr | str) -> str:
+    return str(question_id if isinstance(question_id, UUID) else UUID(question_id))
+
+
+class FlaggedQuestionSet:
+    """Ids of flagged questions, kept in sync across workers with LISTEN/NOTIFY."""
+
+    def __init__(self):
+        self._ids: Set[str] = set()
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+        # Ids added while a load is running, merged into the set it loads
+        self._added_while_loading: Optional[Set[str]] = None
+        self._stop_listening: Optional[Callable[[], Awaitable[None]]] = None
+
+    def __contains__(self, question_id: UUIDStr | str) -> bool:
+        return _normalize(question_id) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> List[str]:
+        """The flagged ids, e.g. to exclude them in SQL with `<> ALL($ids::uuid[])`."""
+        return list(self._ids)
+
+    def add(self, question_id: UUIDStr | str):
+        try:
+            normalized = _normalize(question_id)
+        except ValueError:
+            logger.warning(f"Ignoring invalid flagged question id: {question_id!r}")
+            return
+        self._ids.add(normalized)
+        if self._added_while_loading is not None:
+            self._added_while_loading.add(normalized)
+
+    def filter(
+        self, items: Iterable[T], question_id: Callable[[T], UUIDStr | str]
+    ) -> List[T]:
+        """The items whose question is not flagged."""
+        return [item for item in items if question_id(item) not in self]
+
+    async def load(self, db: DatabaseService):
+        """
+        Replace the set with the flagged ids currently in the database. Ids added
+        while the query runs (e.g. by a NOTIFY) are kept, the query may not see them.
+        """
+        async with self._load_lock:
+            await self._load(db)
+
+    async def _load(self, db: DatabaseService):
+        added = self._added_while_loading = set()
+        try:
+            response: APIResponse = await db.execute_complex_query(  # type: ignore
+                "SELECT DISTINCT question_id FROM flagged_questions",
+                return_type=dict,
+                fetch_mode="all",
+            )
+        finally:
+            self._added_while_loading = None
+        self._ids = {
+            _normalize(row["question_id"]) for row in response.data or []
+        } | added
+        self.loaded = True
+        logger.info(f"Loaded {len(self._ids)} flagged questions")
+
+    async def ensure_loaded(self, db: DatabaseService):
+        """Load the set unless it has been loaded already."""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if not self.loaded:
+                await self._load(db)
+
+    async def publish(self, db: DatabaseService, question_id: UUIDStr):
+        """Add a newly flagged question here and tell the other workers about it."""
+        self.add(question_id)
+        try:
+            await db.execute_complex_query(
+                "SELECT pg_notify($channel, $question_id)",
+                params={
+                    "channel": FLAGGED_QUESTIONS_CHANNEL,
+                    "question_id": str(question_id),
+                },
+                fetch_mode="none",
+            )
+        except Exception as e:
+            # The other workers pick it up on their next periodic reload
+            logger.warning(f"Could not notify workers of flagged question: {e}")
+
+    async def start(self, db: DatabaseService):
+        """Listen for flags from other workers, then load the current set."""
+        # Listen first, so a flag made while loading is not missed. Flags sent while
+        # the listening connection was down are picked up by reloading.
+        try:
+            self._stop_listening = await db.listen(
+                FLAGGED_QUESTIONS_CHANNEL, self.add, on_reconnect=lambda: self.load(db)
+            )
+        except NotImplementedError:
+            logger.warning(
+                "Database has no LISTEN/NOTIFY, flags from other workers arrive on reload"
+            )
+        await self.load(db)
+
+    async def stop(self):
+        if self._stop_listening is not None:
+            await self._stop_listening()
+            self._stop_listening = None
+
+
+_flagged_questions: Optional[FlaggedQuestionSet] = None
+
+
+def get_flagged_questions() -> FlaggedQuestionSet:
+    """The process-wide flagged question set."""
+    global _flagged_questions
+    if _flagged_questions is None:
+        _flagged_questions = FlaggedQuestionSet()
+    return _flagged_questions
@@ -0,0 +1,177 @@
+"""
+Per-user prefetch of the next game's questions.
+
+When a game is started or submitted the next question set for that user is generated in
+the background, with the same pipeline /game/start uses, and parked here for a short
+time. If the user asks for a new game while it is still fresh it is served right away.
+
+Wrong words recorded after a prefetch started are noted on the entry instead of dropping
+it. When the entry is served, only those words are checked: any of them the set doesn't
+already cover get one of their stored questions swapped in (see
+EnhancedQuestionService.revalidate_questions), which costs one query, not a regeneration.
+
+Entries live in process memory, so a request served by another worker simply misses and
+generates as before.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from models.QnA import QuestionBase
+from models.helpers import ChineseChar, UUIDStr
+from utils.config import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Generate = Callable[[], Awaitable[List[QuestionBase]]]
+Revalidate = Callable[
+    [List[QuestionBase], List[ChineseChar]], Awaitable[List[QuestionBase]]
+]
+
+
+@dataclass
+class _Prefetch:
+    count: int
+    task: "asyncio.Task[List[QuestionBase]]"
+    created_at: float  # Loop time the prefetch started
+    wrong_words: List[ChineseChar] = field(default_factory=list)
+
+
+class NextGamePrefetcher:
+    """Short-lived per-user cache of the next game's questions, filled in the background."""
+
+    def __init__(
+        self,
+        ttl: float = config.get("QuestionGenerator.Prefetch.TTLSeconds", 300),
+    ):
+        """
+        Args:
+            ttl: Seconds a prefetched question set stays servable
+        """
+        self.ttl = ttl
+        self._entries: Dict[str, _Prefetch] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def prefetch(
+        self, user_id: UUIDStr, count: int, generate: Generate, replace: bool = True
+    ):
+        """
+        Start generating the user's next `count` questions in the background.
+
+        Args:
+            replace: Cancel an earlier prefetch for the user and start over. When False a
+                fresh earlier prefetch of at least `count` questions is kept, wrong words
+                recorded since then are revalidated when it's served
+        """
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if not replace and entry is not None and self._usable(entry, count):
+            return
+        self.discard(key)
+        task = asyncio.create_task(generate())
+        entry = _Prefetch(
+            count=count, task=task, created_at=asyncio.get_running_loop().time()
+        )
+        self._entries[key] = entry
+        task.add_done_callback(lambda done: self._on_done(key, entry, done))
+        logger.debug(f"Prefetching {count} questions for user {key}")
+
+    def _on_done(
+        self, key: str, entry: _Prefetch, task: "asyncio.Task[List[QuestionBase]]"
+    ):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None or not task.result():
+            logger.warning(f"Question prefetch for user {key} failed: {error}")
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def discard(self, user_id: UUIDStr):
+        """Drop the user's prefetch, cancelling it if it's still running."""
+        entry = self._entries.pop(str(user_id), None)
+        if entry is not None and not entry.task.done():
+            entry.task.cancel()
+
+    def note_wrong_words(self, user_id: UUIDStr, words: List[ChineseChar]):
+        """Record wrong words so the user's prefetched set is revalidated before use."""
+        entry = self._entries.get(str(user_id))
+        if entry is not None:
+            entry.wrong_words.extend(words)
+
+    def _usable(self, entry: _Prefetch, count: int) -> bool:
+        age = asyncio.get_running_loop().time() - entry.created_at
+        return age <= self.ttl and entry.count >= count
+
+    async def take(
+        self,
+        user_id: UUIDStr,
+        count: int,
+        revalidate: Revalidate,
+        timeout: Optional[float] = None,
+    ) -> Optional[List[QuestionBase]]:
+        """
+        Hand over the user's prefetched questions, or None if there is no usable set.
+        A prefetch still running is awaited, it started earlier than a new generation would.
+
+        Args:
+            timeout: Seconds to wait for a running prefetch. If it takes longer it's left
+                running for a later game and None is returned
+        """
+        key = str(user_id)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if not self._usable(entry, count):
+            if not entry.task.done():
+                entry.task.cancel()
+            self.misses += 1
+            return None
+
+        try:
+            questions = await asyncio.wait_for(asyncio.shield(entry.task), timeout)
+        except asyncio.TimeoutError:
+            self._entries.setdefault(key, entry)
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding failed question prefetch for user {key}: {e}")
+            self.misses += 1
+            return None
+        if len(questions) < count:
+            self.misses += 1
+            return None
+
+        questions = questions[:count]
+        if entry.wrong_words:
+            questions = await revalidate(
+                questions, list(dict.fromkeys(entry.wrong_words))
+            )
+            self.revalidated += 1
+        self.hits += 1
+        return questions
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+        }
+
+
+_prefetcher: Optional[NextGamePrefetcher] = None
+
+
+def get_game_prefetcher() -> NextGamePrefetcher:
+    """The process-wide prefetcher shared by every request."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = NextGamePrefetcher()
+    return _prefetcher
@@ -9,6 +9,7 @@ from models.helpers import to_unicodeInt_from_char
 from models.db.db import FlaggedQuestionStatus
 from pydantic import BaseModel
 from features.word_service import WordService
+from features.flagged_questions import get_flagged_questions
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -302,21 +303,11 @@ class GameService:
         """
         Submits the game answers and processes the results.
         This includes checking answers, updating game session, saving game history and updating user experience.
+        The database writes run in a single unit of work, so a failed submit leaves no partial game behind.
         """
         # Check answers
         marked_result: MarkingResult = await self._check_answers(questions)
 
-        # End game session
-        game_session: GameSession = await self._end_game_session(game_id)
-
-        # Update question stats and game db
-        game_data: GameData = await self._save_game_history(marked_result, game_session)
-
-        # Update user experience
-        await self.user_service.update_experience(
-            game_session.user_id, gained_exp=game_data.earned_exp
-        )
-
         # Update user wrong words dictionary
         # Some words might not be past wrong words
         # Excluded words that are just not answered instead of wrong
@@ -327,7 +318,27 @@ class GameService:
             and question.target_word
             and question.submitted_answer
         ]
-        await self.user_service.add_wrong_words(game_session.user_id, wrong_words)
+        # New words are scraped, which must not hold the transaction open
+        await self.user_service.ensure_words_exist(wrong_words)
+
+        # All writes share one connection and commit together
+        async with self.db.unit_of_work():
+            # End game session
+            game_session: GameSession = await self._end_game_session(game_id)
+
+            # Update question stats and game db
+            game_data: GameData = await self._save_game_history(
+                marked_result, game_session
+            )
+
+            # Update user experience
+            await self.user_service.update_experience(
+                game_session.user_id, gained_exp=game_data.earned_exp
+            )
+
+            await self.user_service.add_wrong_words(
+                game_session.user_id, wrong_words, create_words=False
+            )
 
         return game_data
 
@@ -357,9 +368,13 @@ class GameService:
                 result = result.get("data", [])
             if not result or "flag_id" not in result[0]:
                 raise Exception("Failed to flag question, no flag_id returned")
-            return FlaggedQuestion.model_validate(
+            flag = FlaggedQuestion.model_validate(
                 result[0]
             )  # Return the first result, which should be the inserted flag
         except Exception as e:
             logger.error(f"Error flagging question: {e}")
             raise Exception(f"Error flagging question: {str(e)}")
+
+        # Stop serving it from this worker right away, and tell the others
+        await get_flagged_questions().publish(self.db, question_id)
+        return flag
@@ -0,0 +1,103 @@
+"""
+Process-wide cache of the words' pronunciation URLs.
+
+A word's audio URL is set when the word is added and never changes afterwards, so once
+looked up it is kept in memory for the life of the process. Misses are fetched together
+with one `word_id = ANY(...)` query. Words without a URL are not cached, they may still
+get one.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from models.helpers import APIResponse, ChineseChar, to_unicodeInt_from_char
+from utils.config import config
+from utils.database.base import DatabaseService
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PRONUNCIATION_URLS_QUERY = """
+SELECT word_id, pronunciation_url FROM words
+WHERE word_id = ANY($word_ids::bigint[])
+"""
+
+
+class PronunciationCache:
+    """In-memory LRU of word_id -> pronunciation_url, filled in batches."""
+
+    def __init__(
+        self,
+        max_entries: int = config.get(
+            "QuestionGenerator.Pronunciation.MaxEntries", 20000
+        ),
+    ):
+        """
+        Args:
+            max_entries: Most URLs kept before the least recently used are evicted
+        """
+        self.max_entries = max_entries
+        # word_id -> pronunciation_url, most recently used last
+        self._urls: "OrderedDict[int, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _put(self, word_id: int, url: str):
+        self._urls[word_id] = url
+        self._urls.move_to_end(word_id)
+        while len(self._urls) > self.max_entries:
+            self._urls.popitem(last=False)
+
+    async def get_many(
+        self, db: DatabaseService, chars: Iterable[ChineseChar]
+    ) -> Dict[ChineseChar, str]:
+        """
+        Pronunciation URLs of `chars`, fetching the uncached ones with a single query.
+        Characters without a URL are left out of the result.
+        """
+        urls: Dict[ChineseChar, str] = {}
+        missing: Dict[int, ChineseChar] = {}
+        for char in dict.fromkeys(chars):
+            word_id = to_unicodeInt_from_char(char)
+            url = self._urls.get(word_id)
+            if url is None:
+                missing[word_id] = char
+            else:
+                self._urls.move_to_end(word_id)
+                urls[char] = url
+        self.hits += len(urls)
+        self.misses += len(missing)
+
+        if missing:
+            response: APIResponse = await db.execute_complex_query(  # type: ignore
+                PRONUNCIATION_URLS_QUERY,
+                params={"word_ids": list(missing)},
+                return_type=dict,
+                fetch_mode="all",
+            )
+            found = 0
+            for row in response.data or []:
+                url = row.get("pronunciation_url")
+                char = missing.get(row["word_id"])
+                if url and char is not None:
+                    self._put(row["word_id"], url)
+                    urls[char] = url
+                    found += 1
+            logger.debug(
+                f"Fetched pronunciation URLs of {found} out of {len(missing)} uncached words"
+            )
+        return urls
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"entries": len(self._urls), "hits": self.hits, "misses": self.misses}
+
+
+_pronunciation_cache: Optional[PronunciationCache] = None
+
+
+def get_pronunciation_cache() -> PronunciationCache:
+    """The process-wide pronunciation URL cache."""
+    global _pronunciation_cache
+    if _pronunciation_cache is None:
+        _pronunciation_cache = PronunciationCache()
+    return _pronunciation_cache
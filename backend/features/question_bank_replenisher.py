@@ -0,0 +1,224 @@
+"""
+Background question bank replenisher.
+
+Runs on the app's scheduler. It looks at the words players have recently got wrong (the
+words /game/start will revise), scores and classifies their stored questions the same
+way a game does, and generates AI questions for the words whose supply of "good"
+questions is low. Generation goes through the low priority LLM lane, so it only fills
+the batch slots interactive requests leave free, and the questions are saved to the
+question bank for later games to pick up without waiting on the LLM.
+
+Every worker schedules the job, a Postgres advisory lock lets one of them run it at a time.
+Replenishing asks the LLM for new questions rather than reusing cached ones, which would
+only save near-duplicates of questions already in the bank.
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+
+from features.enhanced_question_service import (
+    EnhancedQuestionService,
+    WordQuestionBatch,
+)
+from features.LLM_request_manager import LLMRequestManager
+from features.user_service import UserService
+from features.word_service import WordService
+from models.LLM import AIQuestionType
+from models.QnA import QuestionType
+from models.helpers import APIResponse, ChineseChar, get_time
+from models.services import UserWrongChar
+from utils.config import config
+from utils.database.base import DatabaseService
+from utils.database.factory import get_database_service
+from utils.logger import setup_logger
+from utils.queue_manager import Priority
+from utils.rpc_service import RPCService
+from utils.storage_service import StorageController
+from utils.word_info_scraper import WordInfoScraper
+
+logger = setup_logger(__name__)
+
+# Only AI question types are generated here, and those don't use the user id
+REPLENISHER_USER_ID = "00000000-0000-0000-0000-000000000000"
+# pg_try_advisory_lock key, shared by the workers running the job
+REPLENISH_LOCK_KEY = 0x5245504C  # "REPL"
+
+
+class QuestionBankReplenisher:
+    """Tops up the question bank for words in demand whose good questions run low."""
+
+    def __init__(
+        self,
+        question_service: EnhancedQuestionService,
+        max_words: int = config.get("QuestionGenerator.Replenish.MaxWords", 50),
+        min_good_questions: int = config.get(
+            "QuestionGenerator.Replenish.MinGoodQuestions", 3
+        ),
+        lookback_hours: float = config.get(
+            "QuestionGenerator.Replenish.LookbackHours", 168
+        ),
+        chunk_size: int = config.get("QuestionGenerator.Replenish.ChunkSize", 20),
+    ):
+        """
+        Args:
+            question_service: Used for its scoring, classification, generation and saving
+            max_words: Most in-demand words checked per run
+            min_good_questions: A word with fewer good questions than this gets new ones
+            lookback_hours: Only words someone got wrong within this window count as in demand
+            chunk_size: (word, question type) pairs queued at once, keeps the LLM queues
+                below their capacity
+        """
+        self.question_service = question_service
+        self.max_words = max_words
+        self.min_good_questions = min_good_questions
+        self.lookback_hours = lookback_hours
+        self.chunk_size = chunk_size
+        self._lock = asyncio.Lock()
+        self.ai_question_types = [
+            qtype
+            for qtype in question_service.available_question_types
+            if qtype.value in {t.value for t in AIQuestionType}
+        ]
+
+    async def get_words_in_demand(self) -> List[UserWrongChar]:
+        """Words most players got wrong recently, most wanted first."""
+        query = """
+        SELECT w.word, pww.word_id,
+            SUM(pww.wrong_count)::bigint AS wrong_count,
+            MAX(pww.last_wrong_at) AS last_wrong_at
+        FROM past_wrong_words pww
+        JOIN words w ON w.word_id = pww.word_id
+        WHERE pww.last_wrong_at >= $since
+        GROUP BY pww.word_id, w.word
+        ORDER BY COUNT(*) DESC, MAX(pww.last_wrong_at) DESC
+        LIMIT $limit
+        """
+        words_response = await self.question_service.db.execute_complex_query(
+            query=query,
+            params={
+                "since": get_time() - int(self.lookback_hours * 3600),
+                "limit": self.max_words,
+            },
+            return_type=UserWrongChar,
+            fetch_mode="all",
+        )
+        response: APIResponse = words_response  # type: ignore
+        return response.data or []
+
+    def find_low_supply(
+        self, batches: List[WordQuestionBatch]
+    ) -> List[Tuple[ChineseChar, QuestionType]]:
+        """
+        (word, question type) pairs to generate for classified batches short of good
+        questions. The types a word has fewest stored questions of come first.
+        """
+        wanted: List[Tuple[ChineseChar, QuestionType]] = []
+        for batch in batches:
+            deficit = self.min_good_questions - len(batch.good_questions)
+            if deficit <= 0:
+                continue
+            existing = [q.question_type for q in batch.questions]
+            types = sorted(self.ai_question_types, key=existing.count)
+            wanted.extend((batch.word, qtype) for qtype in types[:deficit])
+        return wanted
+
+    async def replenish(self) -> int:
+        """One replenishing pass. Returns the number of questions saved."""
+        if self._lock.locked():
+            logger.info("Question bank replenish still running, skipping this run")
+            return 0
+        async with self._lock:
+            try:
+                async with self.question_service.db.try_advisory_lock(
+                    REPLENISH_LOCK_KEY
+                ) as acquired:
+                    if not acquired:
+                        logger.info(
+                            "Another worker is replenishing the question bank, skipping this run"
+                        )
+                        return 0
+                    return await self._replenish()
+            except Exception as e:
+                logger.error(f"Error replenishing question bank: {e}")
+                return 0
+
+    def admit(
+        self, chunk: List[Tuple[ChineseChar, QuestionType]]
+    ) -> List[Tuple[ChineseChar, QuestionType]]:
+        """
+        The leading pairs of `chunk` the low priority LLM queues have room for, checked
+        pair by pair since a chunk may queue several of the same type.
+        """
+        manager = self.question_service.llm_request_manager
+        room = {
+            qtype: manager.free_capacity(AIQuestionType(qtype.value), Priority.LOW)
+            for _, qtype in chunk
+        }
+        admitted = []
+        for word, qtype in chunk:
+            free = room[qtype]
+            if free is not None:
+                if free <= 0:
+                    break
+                room[qtype] = free - 1
+            admitted.append((word, qtype))
+        return admitted
+
+    async def _replenish(self) -> int:
+        service = self.question_service
+        words = await self.get_words_in_demand()
+        if not words:
+            return 0
+
+        # Same scoring and classification a game applies, so "good" means the same thing
+        batches = service.classify_questions_by_goodness(
+            await service.fetch_questions_for_words(words)
+        )
+        wanted = self.find_low_supply(batches)
+
+        if not wanted:
+            logger.debug("Question bank is stocked, nothing to replenish")
+            return 0
+        logger.info(
+            f"Replenishing {len(wanted)} questions for "
+            f"{len({word for word, _ in wanted})} words"
+        )
+
+        saved_count = 0
+        for start in range(0, len(wanted), self.chunk_size):
+            chunk = wanted[start : start + self.chunk_size]
+            admitted = self.admit(chunk)
+            if admitted:
+                generated = await service.generate_ai_questions_for_words(
+                    admitted, REPLENISHER_USER_ID, priority=Priority.LOW, fresh=True
+                )
+                saved = await service.save_generated_questions(generated)
+                saved_count += sum(1 for q in saved.values() if q is not None)
+            if len(admitted) < len(chunk):
+                # The queue is busy with other background work, try again next run
+                logger.info("LLM queue is full, stopping this replenish run")
+                break
+
+        logger.info(f"Replenished question bank with {saved_count} questions")
+        return saved_count
+
+
+def create_question_bank_replenisher(
+    llm_request_manager: LLMRequestManager,
+    db: Optional[DatabaseService] = None,
+) -> QuestionBankReplenisher:
+    """Build the replenisher and the services it needs, like the router dependencies do."""
+    db = db or get_database_service()
+    word_service = WordService(db=db, scraper=WordInfoScraper())
+    rpc_service = RPCService(db=db)
+    question_service = EnhancedQuestionService(
+        db=db,
+        word_service=word_service,
+        user_service=UserService(
+            db=db, word_service=word_service, rpc_service=rpc_service
+        ),
+        llm_request_manager=llm_request_manager,
+        storage_service=StorageController(),
+        question_statistics_service=rpc_service,
+    )
+    return QuestionBankReplenisher(question_service)
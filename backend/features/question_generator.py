@@ -10,9 +10,9 @@ import math
 
 # Import models
 from models.QnA import *
-from models.QnA_builder import QuestionBuilder
+from models.QnA_builder import QuestionBuilder, Adaptor
 from models.services import *
-from models.LLM import AIQuestionType
+from models.LLM import AIQuestionType, FillInVocabFormat
 from models.helpers import ChineseChar, get_time, to_unicodeInt_from_char
 from models.db.db import SupabaseRPC, SupabaseTable, QuestionEntry
 
@@ -20,9 +20,20 @@ from models.db.db import SupabaseRPC, SupabaseTable, QuestionEntry
 from utils.LLMService import LLMService
 from utils.database.base import DatabaseService
 from features.LLM_request_manager import LLMRequestManager
+from features.flagged_questions import get_flagged_questions
+from features.pronunciation_cache import get_pronunciation_cache
+from features.distractor_index import MAX_CANDIDATES, get_distractor_index
+from utils.queue_manager import Priority
 
 logger = setup_logger(__name__, level="DEBUG")
 
+# Listening choices for characters the distractor index doesn't know yet
+DEFAULT_LISTENING_DISTRACTORS = [
+    ChineseChar("的"),
+    ChineseChar("是"),
+    ChineseChar("草"),
+]
+
 
 class QuestionGenerator:
     """
@@ -39,6 +50,7 @@ class QuestionGenerator:
         self.db = db
         self.llm_request_manager = llm_request_manager
         self.storage_service = storage_service
+        self.flagged_questions = get_flagged_questions()
 
     @classmethod
     def create_copy_stroke_question(
@@ -70,18 +82,46 @@ class QuestionGenerator:
         db: DatabaseService,
     ) -> MultiChoiceQuestion:
         """Generate a listening question for the given character."""
-        pronunciation = await db.filter_data(
-            SupabaseTable.WORDS,
-            {"word_id": to_unicodeInt_from_char(char)},
-            columns=["word_id", "pronunciation_url"],
-        )
-
-        if not pronunciation or not pronunciation.data:
-            raise ValueError(f"No pronunciation found for character {char}")
-
-        pronunciation_url = pronunciation.data[0].get("pronunciation_url")
-        if not pronunciation_url:
+        question = (await cls.create_listening_questions([char], db))[char]
+        if question is None:
             raise ValueError(f"No pronunciation URL found for character {char}")
+        return question
+
+    @classmethod
+    async def create_listening_questions(
+        cls,
+        chars: List[ChineseChar],
+        db: DatabaseService,
+    ) -> Dict[ChineseChar, Optional[MultiChoiceQuestion]]:
+        """
+        Generate listening questions for several characters, looking up their
+        pronunciations with one query behind the process-wide cache.
+        Characters without a pronunciation URL map to None.
+        """
+        pronunciation_urls = await get_pronunciation_cache().get_many(db, chars)
+
+        questions: Dict[ChineseChar, Optional[MultiChoiceQuestion]] = {}
+        for char in chars:
+            pronunciation_url = pronunciation_urls.get(char)
+            if not pronunciation_url:
+                logger.warning(f"No pronunciation URL found for character {char}")
+                questions[char] = None
+                continue
+            questions[char] = cls._build_listening_question(char, pronunciation_url)
+        return questions
+
+    @staticmethod
+    def _build_listening_question(
+        char: ChineseChar, pronunciation_url: str
+    ) -> MultiChoiceQuestion:
+        # Similar looking or sounding characters from the offline index, never one that
+        # sounds the same as the answer
+        distractors = get_distractor_index().similar(char, k=3, distinct_sound=True)
+        for default in DEFAULT_LISTENING_DISTRACTORS:
+            if len(distractors) >= 3:
+                break
+            if default != char and default not in distractors:
+                distractors.append(default)
 
         builder = (
             QuestionBuilder()
@@ -89,30 +129,69 @@ class QuestionGenerator:
             .set_target_word(char)
             .add_given_sound(sound_url=pronunciation_url)
             .add_choices(
-                choices=[
-                    char,
-                    ChineseChar("的"),
-                    ChineseChar("是"),
-                    ChineseChar("草"),
-                ],  # Example choices
-                is_answers=[
-                    True,
-                    False,
-                    False,
-                    False,
-                ],  # Assuming the first choice is the correct one
+                choices=[char, *distractors],
+                is_answers=[True] + [False] * len(distractors),
             )
+            .set_randomize(True)
         )
         return builder.build()
 
+    @classmethod
+    def create_local_fill_in_vocab_question(
+        cls, char: ChineseChar
+    ) -> Optional[FillInVocabQuestion]:
+        """
+        Build a FILL_IN_VOCAB question from the offline distractor index, without the
+        LLM: one of the character's scraped phrases with it blanked out, and three
+        similar characters that don't form another known phrase in its place.
+        Returns None if the index can't supply both.
+        """
+        index = get_distractor_index()
+        vocabularies = [
+            phrase
+            for phrase in index.phrases(char)
+            if char in phrase and len(phrase) > 1
+        ]
+        if not vocabularies:
+            return None
+
+        # Adaptor.fill_in_vocab blanks the first occurrence of the character
+        distractors = [
+            other
+            for other in index.similar(char, k=MAX_CANDIDATES)
+            if not any(
+                index.is_phrase(vocabulary.replace(char, other, 1))
+                for vocabulary in vocabularies
+            )
+        ][:3]
+        if len(distractors) < 3:
+            return None
+
+        try:
+            return Adaptor.fill_in_vocab(
+                FillInVocabFormat(
+                    given_char=char,
+                    vocabularies=vocabularies,
+                    similar_characters=distractors,
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error building local fill_in_vocab question for {char}: {e}")
+            return None
+
     @classmethod
     async def create_ai_question(
         cls,
         char: ChineseChar,
         question_type: QuestionType,
         llm_request_manager: LLMRequestManager,
+        priority: Priority = Priority.HIGH,
+        use_cache: bool = True,
     ) -> QuestionBase:
-        """Generate an AI-powered question for the given character and type."""
+        """
+        Generate an AI-powered question for the given character and type.
+        use_cache=False has the LLM write it even if a cached one exists.
+        """
         ai_question_types = {qtype.value: qtype for qtype in AIQuestionType}
 
         if question_type.value not in ai_question_types:
@@ -124,6 +203,8 @@ class QuestionGenerator:
         result = await llm_request_manager.enqueue_questions(
             question_type=ai_question_types[question_type.value],
             char=char,
+            priority=priority,
+            use_cache=use_cache,
         )
         logger.debug(f"Returned question for {char}, type: {question_type}")
         return result
@@ -221,15 +302,11 @@ class QuestionGenerator:
             f"Fetching question bank for word: {word} and type: {question_type}"
         )
 
-        # Build the complex query to fetch questions and exclude flagged ones
+        # Build the complex query to fetch questions, flagged ones are filtered out below
         base_query = """
             SELECT q.* 
             FROM questions q 
             WHERE q.target_word_id = $word_id
-            AND q.question_id NOT IN (
-                SELECT DISTINCT fq.question_id 
-                FROM flagged_questions fq
-            )
         """
 
         params: dict[str, Any] = {"word_id": to_unicodeInt_from_char(word)}
@@ -240,12 +317,17 @@ class QuestionGenerator:
             params["question_type"] = question_type.value
 
         try:
+            await self.flagged_questions.ensure_loaded(self.db)
             questions_response = await self.db.execute_complex_query(
                 query=base_query, params=params, return_type=dict, fetch_mode="all"
             )
             from models.helpers import APIResponse
 
             questions: APIResponse = questions_response  # type: ignore
+            questions.data = self.flagged_questions.filter(
+                questions.data or [], lambda row: row["question_id"]
+            )
+            questions.count = len(questions.data)
             logger.debug(
                 f"Fetched {questions.count} unflagged questions for word: {word} and type: {question_type}"
             )
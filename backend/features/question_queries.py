@@ -0,0 +1,41 @@
+"""
+SQL of the question candidate queries in EnhancedQuestionService.
+
+Kept apart from the service, which needs the LLM settings to import, so the query
+plan tests (tests/test_question_query_plans.py) can run against a bare database.
+"""
+
+# Scoring columns of the newest questions of each word, at most $per_word each. Full
+# rows are loaded only for the chosen questions, with QUESTIONS_BY_ID_QUERY. Flagged
+# questions are filtered out in Python with the in-process set (see
+# features/flagged_questions.py). The view and index it relies on are in
+# models/supabase/question_summaries.sql and questions_candidate_indexes.sql.
+CANDIDATE_QUESTIONS_QUERY = """
+SELECT t_limited.*
+FROM (
+    SELECT DISTINCT unnest($word_ids::bigint[]) AS target_word_id
+) t_groups
+JOIN LATERAL (
+    SELECT *
+    FROM question_summaries q
+    WHERE q.target_word_id = t_groups.target_word_id
+    ORDER BY q.created_at DESC
+    LIMIT $per_word
+) t_limited ON true
+ORDER BY t_limited.target_word_id, t_limited.created_at DESC
+"""
+
+QUESTIONS_BY_ID_QUERY = """
+SELECT * FROM questions q
+WHERE q.question_id = ANY($question_ids::uuid[])
+"""
+
+# Any unflagged questions of the words, newest first. The fallback is rare and needs
+# exact rows, so the flagged ids (from the in-process set) are excluded in SQL.
+FALLBACK_QUESTIONS_QUERY = """
+SELECT * FROM questions q
+WHERE q.target_word_id = ANY($word_ids::bigint[])
+  AND q.question_id <> ALL($flagged_ids::uuid[])
+ORDER BY q.created_at DESC
+LIMIT $limit
+"""
@@ -36,6 +36,7 @@ from features.user_service import UserService
 from features.LLM_request_manager import LLMRequestManager
 from features.question_generator import QuestionGenerator
 from features.enhanced_question_service import EnhancedQuestionService
+from utils.queue_manager import Priority
 
 logger = setup_logger(__name__, level="DEBUG")
 
@@ -202,10 +203,14 @@ class QuestionService:
         priority_function: Optional[
             Callable[[list[UserWrongChar]], list[UserWrongChar]]
         ] = None,
+        deadline: Optional[float] = None,
+        priority: Priority = Priority.HIGH,
     ) -> List[QuestionBase]:
         """
         Main method to generate questions by user ID.
         Now uses the enhanced question service with comprehensive 6-step logic.
+        `deadline` is the seconds the caller can wait and `priority` the LLM queue lane,
+        see EnhancedQuestionService.generate_questions_for_user.
         """
         logger.info(
             f"QuestionService.generate_by_user_id called for user {user_id}, count: {count}"
@@ -217,6 +222,8 @@ class QuestionService:
                 user_id=user_id,
                 count=count,
                 max_words=None,  # Use default from enhanced service
+                deadline=deadline,
+                priority=priority,
             )
 
             logger.info(
@@ -6,6 +6,7 @@ from utils.config import config
 from utils.logger import setup_logger
 from models.services import *
 from features.word_service import WordService
+from features.game_prefetch import get_game_prefetcher
 from math import floor
 from utils.rpc_service import RPCService
 import asyncio
@@ -235,23 +236,21 @@ class UserService:
         logger.info(f"Added wrong word: {word} for user {user_id}.")
         return new_wrong_word
 
-    async def add_wrong_words(self, user_id: UUIDStr, words: list[ChineseChar]) -> None:
+    async def ensure_words_exist(self, words: list[ChineseChar]) -> None:
         """
-        Adds a wrong word to the user's wrong word dictionary.
-        If the word does not exist, it will be created.
-        If the word already exists for the user, it will update the wrong count and last wrong time.
-        Same as add_wrong_word, but for multiple words.
+        Creates the words entries missing for `words`.
+        Creating a word scrapes its info, so callers with a transaction open should
+        run this before it and pass create_words=False to add_wrong_words.
         """
-        ## Prepare all existing words and new words
         word_ids = [to_unicodeInt_from_char(word) for word in words]
         logger.debug(f"Word IDs to process: {word_ids}")
         existing_words = await self.word_service.get_existing_words(word_ids)
         logger.debug(f"Existing words: {existing_words}")
+        existing_word_ids = {existing_word.word_id for existing_word in existing_words}
         not_existing_words = [
             word
-            for word in words
-            if to_unicodeInt_from_char(word)
-            not in [existing_word.word_id for existing_word in existing_words]
+            for word in dict.fromkeys(words)
+            if to_unicodeInt_from_char(word) not in existing_word_ids
         ]
         logger.debug(f"Not existing words: {not_existing_words}")
         add_word_tasks = [
@@ -259,55 +258,42 @@ class UserService:
             for word in not_existing_words
         ]
         await asyncio.gather(*add_word_tasks)
-        logger.info(f"Added {len(not_existing_words)} new words for user {user_id}.")
+        logger.info(f"Added {len(not_existing_words)} new words.")
 
-        ## Seperate existing and new wrong word items
-        try:
-            existing_wrong_word_ids_response = await self.db.rpc_query(
-                SupabaseRPC.GET_EXISTING_WRONG_WORD_IDS,
-                GetExistingWrongWordIdsRPC(
-                    p_user_id=user_id, word_ids=word_ids
-                ).model_dump(),
-                return_type=PastWrongWord,
-            )
-        except Exception as e:
-            logger.error(f"Error fetching existing wrong word IDs: {e}")
-            raise
-        existing_wrong_words = existing_wrong_word_ids_response.data
-        existing_wrong_word_ids = [
-            wrong_word.word_id for wrong_word in existing_wrong_words
-        ]
-        logger.debug(f"Existing wrong word IDs: {existing_wrong_word_ids}")
-
-        await self.db.rpc_query(
-            SupabaseRPC.INCREMENT_WRONG_COUNT_FOR_USER,
-            IncrementWrongCountForUserRPC(
-                p_user_id=user_id, p_word_ids=existing_wrong_word_ids  # type: ignore
-            ).model_dump(),
-        )
+    async def add_wrong_words(
+        self, user_id: UUIDStr, words: list[ChineseChar], create_words: bool = True
+    ) -> None:
+        """
+        Adds a wrong word to the user's wrong word dictionary.
+        If the word does not exist, it will be created, unless create_words is False
+        (the caller already ran ensure_words_exist).
+        If the word already exists for the user, it will update the wrong count and last wrong time.
+        Same as add_wrong_word, but for multiple words.
+        """
+        word_ids = [to_unicodeInt_from_char(word) for word in words]
+        if create_words:
+            await self.ensure_words_exist(words)
 
-        ## Create new wrong word entries for the new words
-        non_existing_wrong_words = [
+        ## Insert new wrong words and bump existing ones in a single upsert
+        curr_time = get_time()
+        # Deduplicated, since ON CONFLICT can't touch the same row twice
+        wrong_word_rows = [
             PastWrongWord(
-                word_id=to_unicodeInt_from_char(word),
+                word_id=word_id,
                 user_id=user_id,
                 wrong_count=1,  # Initialize wrong count to 1
-                last_wrong_at=get_time(),  # Set the current time as last wrong time
-            )
-            for word in words
-            if to_unicodeInt_from_char(word) not in existing_wrong_word_ids
+                last_wrong_at=curr_time,  # Set the current time as last wrong time
+            ).model_dump()
+            for word_id in dict.fromkeys(word_ids)
         ]
-        insert_tasks = [
-            self.db.insert_data(
-                SupabaseTable.PAST_WRONG_WORDS,
-                data=wrong_word.model_dump(),
-            )
-            for wrong_word in non_existing_wrong_words
-        ]
-        await asyncio.gather(*insert_tasks)
-        logger.info(
-            f"Added {len(non_existing_wrong_words)} wrong words for user {user_id}."
-        )
+        try:
+            result = await self.db.increment_wrong_words(wrong_word_rows)
+        except Exception as e:
+            logger.error(f"Error recording wrong words for user {user_id}: {e}")
+            raise
+        logger.info(f"Recorded {result.count} wrong words for user {user_id}.")
+        # A next game prefetched before these mistakes should revise them too
+        get_game_prefetcher().note_wrong_words(user_id, words)
         return
 
     async def batch_add_wrong_words_raw(
@@ -352,72 +338,26 @@ class UserService:
                 f"Created {len(not_existing_words)} new words for user {user_id}."
             )
 
-            # Fetch existing wrong word entries for the user
-            existing_wrong_word_ids_response = await self.db.rpc_query(
-                SupabaseRPC.GET_EXISTING_WRONG_WORD_IDS,
-                GetExistingWrongWordIdsRPC(
-                    p_user_id=user_id, word_ids=word_ids
-                ).model_dump(),
-                return_type=PastWrongWord,
-            )
-            existing_wrong_words = existing_wrong_word_ids_response.data
-            existing_wrong_word_ids = [
-                wrong_word.word_id for wrong_word in existing_wrong_words
-            ]
-            logger.debug(f"Existing wrong word IDs: {existing_wrong_word_ids}")
-
-            # Update wrong count and last wrong time for existing wrong words
-            update_tasks = [
-                self.db.update_data(
-                    SupabaseTable.PAST_WRONG_WORDS,
-                    condition={
-                        "user_id": user_id,
-                        "word_id": wrong_word.word_id,
-                    },
-                    data={
-                        "wrong_count": wrong_word.wrong_count + 1,
-                        "last_wrong_at": get_time(),
-                        # FIXME: now is overwriting the old image url, need to delete the old image url?
-                        "wrong_image_url": wrong_word.wrong_image_url,
-                    },
-                    return_type=PastWrongWord,
-                )
-                for wrong_word in wrong_words
-                if wrong_word.word_id in existing_wrong_word_ids
-            ]
-            responses = await asyncio.gather(*update_tasks)
-            updated_past_wrong_words = [
-                responses.data[0] for responses in responses if responses.data
-            ]
-
-            logger.info(
-                f"Updated {len(updated_past_wrong_words)} existing wrong words for user {user_id}."
-            )
-
-            # Insert new wrong word entries for non-existing wrong words
-            non_existing_wrong_words = [
-                wrong_word
-                for wrong_word in wrong_words
-                if wrong_word.word_id not in existing_wrong_word_ids
-            ]
-            ## ensure correct data for input
-            for wrong_word in non_existing_wrong_words:
+            # Insert new wrong words and bump existing ones in a single upsert
+            curr_time = get_time()
+            rows_by_word_id = {}
+            for wrong_word in wrong_words:
                 wrong_word.user_id = user_id
                 wrong_word.wrong_count = 1  # Initialize wrong count to 1
-                wrong_word.last_wrong_at = (
-                    get_time()
-                )  # Set the current time as last wrong time
-
-            insert_tasks = [
-                self.db.insert_data(
-                    SupabaseTable.PAST_WRONG_WORDS,
-                    data=wrong_word.model_dump(),
-                )
-                for wrong_word in non_existing_wrong_words
-            ]
-            await asyncio.gather(*insert_tasks)
-            logger.info(
-                f"Inserted {len(non_existing_wrong_words)} new wrong words for user {user_id}."
+                wrong_word.last_wrong_at = curr_time
+                # ON CONFLICT can't touch a row twice, the last image wins
+                rows_by_word_id[wrong_word.word_id] = wrong_word.model_dump()
+
+            result = await self.db.increment_wrong_words(
+                list(rows_by_word_id.values()),
+                # FIXME: now is overwriting the old image url, need to delete the old image url?
+                overwrite_image=True,
+                return_type=PastWrongWord,
+            )
+            logger.info(f"Upserted {result.count} wrong words for user {user_id}.")
+            get_game_prefetcher().note_wrong_words(
+                user_id,
+                [to_char_from_unicode(word_id) for word_id in rows_by_word_id],
             )
         except Exception as e:
             logger.error(
@@ -425,7 +365,7 @@ class UserService:
             )
             raise
 
-        return non_existing_wrong_words + updated_past_wrong_words
+        return result.data
 
     async def get_user_wrong_word_count(self, user_id: UUIDStr) -> int:
         """
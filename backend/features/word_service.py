@@ -5,16 +5,26 @@ from utils.word_info_scraper import WordInfoScraper, language
 from utils.database.base import DatabaseService
 from models.db.db import SupabaseTable, SupabaseRPC, GetRandomWordsRPC, GetExistingWordsRPC
 from models.helpers import ChineseChar, UUIDStr, UnicodeInt
+from utils.single_flight import SingleFlight
 
 logger = setup_logger(__name__)
 
 
 class WordService:
+    # Shared across instances (one per request), so concurrent scans of the same
+    # new character scrape and insert it once
+    _new_word_flight: SingleFlight[Word] = SingleFlight()
+
     def __init__(self, db: DatabaseService, scraper: WordInfoScraper):
         self.db = db
         self.scraper = scraper
 
     async def create_new_word_db_entry(self, word: ChineseChar) -> Word:
+        return await self._new_word_flight.do(
+            word, lambda: self._create_new_word_db_entry(word)
+        )
+
+    async def _create_new_word_db_entry(self, word: ChineseChar) -> Word:
         # Use the injected scraper instead of creating a new one
         logger.info(f"Scraping definition for word: {word}")
         try:
@@ -55,6 +55,7 @@ class SupabaseRPC(str, Enum):
     GET_RANDOM_WORDS = "get_random_words"
     GET_EXISTING_WORDS = "get_existing_words"
     GET_EXISTING_WRONG_WORD_IDS = "get_existing_wrong_word_ids"
+    INCREMENT_WRONG_WORDS = "increment_wrong_words"
 
 
 # Class to hold only the necessary fields for a user's answer
@@ -453,6 +454,16 @@ class QuestionEntry(BaseModel):
         return question_base
 
 
+class QuestionSummary(BaseModel):
+    # The columns of a QuestionEntry needed to score it, see question_summaries.sql
+    question_id: UUIDStr
+    target_word_id: UnicodeInt
+    question_type: QuestionType
+    created_at: UnixTimestamp
+    use_count: int = 0
+    correct_count: int = 0
+
+
 # ------ RPC Models -------------------------
 class GetPastWrongWordsByUserRPC(BaseModel):
     p_user_id: UUIDStr  # User ID to fetch past wrong words for
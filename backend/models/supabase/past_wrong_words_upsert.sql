@@ -0,0 +1,55 @@
+-- Unique (user_id, word_id) on past_wrong_words, required by the
+-- INSERT ... ON CONFLICT upsert behind DatabaseService.increment_wrong_words.
+
+-- Merge duplicate rows left by the old check-then-insert code path,
+-- keeping the most recent row and summing the wrong counts into it.
+with ranked as (
+  select
+    item_id,
+    row_number() over (
+      partition by user_id, word_id
+      order by last_wrong_at desc nulls last, created_at desc nulls last
+    ) as rn,
+    sum(coalesce(wrong_count, 0)) over (partition by user_id, word_id) as total_count
+  from public.past_wrong_words
+),
+merged as (
+  update public.past_wrong_words p
+  set wrong_count = r.total_count
+  from ranked r
+  where p.item_id = r.item_id and r.rn = 1
+)
+delete from public.past_wrong_words p
+using ranked r
+where p.item_id = r.item_id and r.rn > 1;
+
+create unique index if not exists past_wrong_words_user_word_key
+  on public.past_wrong_words using btree (user_id, word_id) TABLESPACE pg_default;
+
+-- SupabaseService.increment_wrong_words: the same upsert PgDatabaseService runs,
+-- for the REST API, which can't express wrong_count + 1 in its own upserts.
+create or replace function public.increment_wrong_words(
+    p_rows jsonb,                       -- past_wrong_words rows, as JSON objects
+    p_overwrite_image boolean default false
+)
+returns setof public.past_wrong_words as $$
+    insert into public.past_wrong_words
+        (item_id, user_id, word_id, wrong_count, wrong_image_url, last_wrong_at)
+    select r.item_id, r.user_id, r.word_id, r.wrong_count, r.wrong_image_url, r.last_wrong_at
+    from jsonb_to_recordset(p_rows) as r(
+        item_id uuid,
+        user_id uuid,
+        word_id bigint,
+        wrong_count bigint,
+        wrong_image_url text,
+        last_wrong_at bigint
+    )
+    on conflict (user_id, word_id) do update set
+        wrong_count = coalesce(past_wrong_words.wrong_count, 0) + 1,
+        last_wrong_at = excluded.last_wrong_at,
+        wrong_image_url = case
+            when p_overwrite_image then excluded.wrong_image_url
+            else past_wrong_words.wrong_image_url
+        end
+    returning *;
+$$ language sql;
@@ -0,0 +1,20 @@
+-- Slim view of the questions table for scoring candidates.
+--
+-- EnhancedQuestionService.fetch_questions_for_words scores up to 50 questions
+-- per word but only ever uses one or two of them. It reads these columns for
+-- all candidates, then loads full rows (with their JSON arrays) only for the
+-- chosen question_ids. A plain view needs no triggers: use_count and
+-- correct_count are the ones update_question_stats writes to questions.
+--
+-- Reads are index-only scans of questions_target_word_created_at_idx
+-- (questions_candidate_indexes.sql), which carries every column below. Keep
+-- the two in sync: a column missing from the index sends every read to the heap.
+create or replace view public.question_summaries as
+select
+  question_id,
+  target_word_id,
+  question_type,
+  created_at,
+  coalesce(use_count, 0) as use_count,
+  coalesce(correct_count, 0) as correct_count
+from public.questions;
@@ -0,0 +1,29 @@
+-- Indexes for the question candidate queries in EnhancedQuestionService
+-- (fetch_questions_for_words, get_fallback_questions, SQL in
+-- features/question_queries.py) and QuestionGenerator.get_question_from_bank.
+--
+-- Those queries read the newest questions of each target word. Flagged
+-- questions are filtered out in the app (features/flagged_questions.py), whose
+-- set is loaded from flagged_questions at startup and on a schedule. Without
+-- these indexes both reads scan their whole table, and questions grows with
+-- every generated question.
+--
+-- On a large live table, run each statement on its own with
+-- CREATE INDEX CONCURRENTLY instead, to avoid blocking writes while it builds.
+
+-- Newest questions per word, an ordered range scan that stops at the LIMIT.
+-- Covering: with the keys, the included columns are every column of the
+-- question_summaries view (question_summaries.sql), so the candidate query is
+-- an index-only scan and never visits the heap for all-visible pages. Partial:
+-- questions without a target word are never candidates.
+create index if not exists questions_target_word_created_at_idx
+  on public.questions using btree (target_word_id, created_at desc)
+  include (question_id, question_type, use_count, correct_count)
+  where target_word_id is not null;
+
+-- Loading the flagged question ids reads only this index.
+create index if not exists flagged_questions_question_id_idx
+  on public.flagged_questions using btree (question_id);
+
+analyze public.questions;
+analyze public.flagged_questions;
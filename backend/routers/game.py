@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from routers.dependencies import *
 from features.question_service import QuestionService
@@ -5,9 +6,13 @@ from uuid import uuid4
 from models.helpers import get_time, UUIDStr
 from models.api_response import GameObject
 from features.game_service import GameService
+from features.game_prefetch import get_game_prefetcher
+from utils.queue_manager import Priority
+from utils.config import config
 from models.db.db import GameData, FlaggedQuestionStatus
 from utils.logger import setup_logger
 from typing import Optional
+from functools import partial
 from pydantic import BaseModel
 from AI_text_recognition.main import TextRecognitionService
 from AI_text_recognition.wrong_word_batching import WrongWordEntry
@@ -16,11 +21,41 @@ logger = setup_logger(__name__, level="DEBUG")
 
 router = APIRouter(prefix="/game", tags=["Game"])
 
+PREFETCH_ENABLED = config.get("QuestionGenerator.Prefetch.Enabled", True)
+PREFETCH_WAIT_SHARE = config.get("QuestionGenerator.Deadline.PrefetchWaitShare", 0.5)
+
+
+def prefetch_next_game(
+    question_generator: QuestionService,
+    user_id: UUIDStr,
+    count: int,
+    replace: bool = True,
+):
+    """
+    Start building the user's next game in the background, see features/game_prefetch.py.
+    It queues for the LLM behind interactive requests, and is skipped while the LLM
+    queues are already full.
+    """
+    if not PREFETCH_ENABLED:
+        return
+    if question_generator.enhanced_service.llm_saturated(Priority.LOW):
+        logger.info(f"LLM queues are full, not prefetching for user {user_id}")
+        return
+    get_game_prefetcher().prefetch(
+        user_id,
+        count,
+        lambda: question_generator.generate_by_user_id(
+            user_id, count, priority=Priority.LOW
+        ),
+        replace=replace,
+    )
+
 
 @router.get("/start/{userId}", response_model=GameObject)
 async def start_game(
     userId: UUIDStr,
     qCount: int = 1,
+    deadline: Optional[float] = None,
     question_generator: QuestionService = Depends(get_question_generator),
     game_service: GameService = Depends(get_game_service),
 ):
@@ -30,6 +65,8 @@ async def start_game(
     Args:
         userId (UUIDStr): The unique identifier of the user.
         qCount (int, optional): The number of questions to generate for the game. Defaults to 1.
+        deadline (float, optional): Seconds the client can wait for the questions. Close to
+            it, questions that need no AI are used instead. Defaults to no deadline.
         question_generator (QuestionService): Dependency injection for the question generator service.
         game_service (GameService): Dependency injection for the game service.
 
@@ -45,10 +82,32 @@ async def start_game(
             status_code=400,
             detail="qCount must be an integer between 1 and 20",
         )
+    if deadline is not None and deadline <= 0:
+        raise HTTPException(status_code=400, detail="deadline must be positive")
+
+    loop = asyncio.get_running_loop()
+    deadline_at = None if deadline is None else loop.time() + deadline
 
-    # Get the questions first
+    # Get the questions first, a fresh prefetched set is served right away
     try:
-        questions = await question_generator.generate_by_user_id(userId, qCount)
+        questions = None
+        if PREFETCH_ENABLED:
+            questions = await get_game_prefetcher().take(
+                userId,
+                qCount,
+                partial(
+                    question_generator.enhanced_service.revalidate_questions, userId
+                ),
+                timeout=None if deadline is None else deadline * PREFETCH_WAIT_SHARE,
+            )
+        if questions is None:
+            questions = await question_generator.generate_by_user_id(
+                userId,
+                qCount,
+                deadline=(
+                    None if deadline_at is None else max(0.0, deadline_at - loop.time())
+                ),
+            )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error generating question: {str(e)}"
@@ -72,6 +131,9 @@ async def start_game(
         logger.error("Failed to create game session: No game_id returned")
         raise HTTPException(status_code=500, detail="Failed to create game session")
 
+    # The next game is usually requested right after this one is submitted
+    prefetch_next_game(question_generator, userId, qCount)
+
     # Prepare the game object to return
     game_object = GameObject(questions=questions, user_id=userId, game_id=game_id)
     # logger.debug(game_object)
@@ -81,10 +143,12 @@ async def start_game(
 @router.post("/submit-result", response_model=GameData)
 async def submit_result(
     result: GameObject,
+    question_generator: QuestionService = Depends(get_question_generator),
     game_service: GameService = Depends(get_game_service),
 ):
     """
-    Submits the game results for the specified user and game.
+    Submits the game results for the specified user and game, then starts prefetching
+    the user's next game with the same number of questions.
     """
     try:
         # exp_gain = 0
@@ -96,6 +160,11 @@ async def submit_result(
             result.questions, game_id=result.game_id
         )
         logger.debug(f"Game result submitted: {out}")
+        # Keeps the set prefetched at game start, the wrong words just recorded get
+        # revalidated when it's served instead of regenerating it
+        prefetch_next_game(
+            question_generator, out.user_id, len(result.questions), replace=False
+        )
         return out
     except Exception as e:
         raise HTTPException(
@@ -27,6 +27,7 @@ class DatabaseHealthResponse(BaseModel):
     pool_size: int | None = None
     idle_connections: int | None = None
     active_connections: int | None = None
+    prepared_statements: dict[str, int] | None = None
 
 
 @router.get("/database", response_model=DatabaseHealthResponse)
@@ -45,6 +46,7 @@ async def check_database_health(db=Depends(get_database_service)):
             "pool_size": pool_size,
             "idle_connections": idle_size,
             "active_connections": pool_size - idle_size,
+            "prepared_statements": db.statements.get_stats(),
         }
     except Exception as e:
         raise HTTPException(
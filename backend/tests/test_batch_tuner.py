@@ -0,0 +1,61 @@
+import pytest
+from utils.batch_tuner import BatchTuner
+
+
+class TestBatchTuner:
+    """Test cases for adaptive batch size and wait selection."""
+
+    @pytest.fixture
+    def tuner(self):
+        return BatchTuner(
+            min_batch_size=1, max_batch_size=8, min_wait=0.1, max_wait=6.0, alpha=0.5
+        )
+
+    def test_no_traffic_sends_immediately(self, tuner):
+        """Test that the first item is not held for the full wait."""
+        tuner.observe_arrival(0.0)
+        assert tuner.tune(0.0, batch_size=5) == (1, 0.1)
+
+    def test_sparse_traffic_uses_min_wait(self, tuner):
+        """Test that items arriving further apart than max_wait are not held."""
+        for now in (0.0, 10.0, 20.0):
+            tuner.observe_arrival(now)
+        tuner.observe_batch(1, 2.0)
+        assert tuner.tune(20.0, batch_size=1) == (1, 0.1)
+
+    def test_batches_grow_under_load(self, tuner):
+        """Test that batch size follows arrival rate times batch latency."""
+        for i in range(10):
+            tuner.observe_arrival(i * 0.5)
+        tuner.observe_batch(1, 2.0)
+
+        size, wait = tuner.tune(4.5, batch_size=1)
+        assert size == 4  # 2 items/s * 2s
+        assert wait == pytest.approx(1.5)
+        # Spread over concurrent slots
+        assert tuner.tune(4.5, batch_size=1, concurrency=2)[0] == 2
+
+    def test_limits_are_respected(self, tuner):
+        """Test that the chosen settings stay within the configured limits."""
+        for i in range(10):
+            tuner.observe_arrival(i * 0.01)
+        tuner.observe_batch(5, 3.0)
+
+        size, wait = tuner.tune(0.09, batch_size=5)
+        assert size == 8
+        assert 0.1 <= wait <= 6.0
+
+    def test_silence_decays_rate(self, tuner):
+        """Test that a long pause after busy traffic shrinks the batch again."""
+        for i in range(10):
+            tuner.observe_arrival(i * 0.1)
+        tuner.observe_batch(8, 2.0)
+        assert tuner.tune(0.9, batch_size=8)[0] == 8
+        assert tuner.tune(30.0, batch_size=8) == (1, 0.1)
+
+    def test_invalid_limits(self):
+        """Test that inverted limits are rejected."""
+        with pytest.raises(ValueError):
+            BatchTuner(min_batch_size=5, max_batch_size=2)
+        with pytest.raises(ValueError):
+            BatchTuner(min_wait=2, max_wait=1)
@@ -0,0 +1,147 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from features.distractor_index import (
+    DistractorIndex,
+    WordFeatures,
+    build_distractor_index,
+    rank_similar,
+)
+from models.helpers import APIResponse
+
+FEATURES = {
+    "清": WordFeatures(radical="水", stroke=11, jyutping=["cing1"]),
+    "情": WordFeatures(radical="心", stroke=11, jyutping=["cing4"]),
+    "請": WordFeatures(radical="言", stroke=15, jyutping=["cing2"]),
+    "青": WordFeatures(radical="青", stroke=8, jyutping=["cing1"]),
+    "河": WordFeatures(radical="水", stroke=8, jyutping=["ho4"]),
+    "一": WordFeatures(radical="一", stroke=1, jyutping=["jat1"]),
+}
+CANGJIE = {"清": "eqmb", "情": "pqmb", "請": "yrqmb", "青": "qmb", "河": "emnr"}
+
+
+class TestDistractorIndex:
+    """Test cases for ranking and looking up similar characters."""
+
+    def test_rank_by_radical_sound_and_strokes(self):
+        """Test that shared radicals and syllables rank above stroke counts alone."""
+        similar = rank_similar(FEATURES, max_candidates=3)
+
+        # 河 shares the radical, 情 the syllable and the stroke count
+        assert similar["清"] == ["情", "河", "青"]
+        assert similar["一"] == []
+        assert all(len(chars) <= 3 for chars in similar.values())
+
+    def test_rank_by_shape(self):
+        """Test that characters sharing components rank above ones only alike in strokes."""
+        features = {
+            char: word.model_copy(update={"cangjie": CANGJIE.get(char, "").upper()})
+            for char, word in FEATURES.items()
+        }
+        features["晴"] = WordFeatures(
+            radical="日", stroke=12, jyutping=["ceng4"], cangjie="AQMB"
+        )
+        features["唱"] = WordFeatures(
+            radical="口", stroke=11, jyutping=["coeng3"], cangjie="RAA"
+        )
+        similar = rank_similar(features, max_candidates=4)
+
+        # 青 and 請 share the 青 component, they now rank above 河
+        assert similar["清"] == ["情", "青", "請", "河"]
+        # 晴 shares neither radical nor syllable, it's only found through its shape
+        assert "晴" in similar["青"]
+        # Same stroke count, nothing else alike
+        assert "唱" not in similar["清"]
+
+    def test_similar_lookup(self):
+        """Test k, exclusions and leaving out exact homophones."""
+        index = DistractorIndex(rank_similar(FEATURES), FEATURES)
+
+        assert index.similar("清", k=2) == ["情", "河"]
+        assert index.similar("清", k=2, exclude=["情"]) == ["河", "青"]
+        # 青 is cing1 as well, it can't be told apart by ear
+        assert "青" not in index.similar("清", k=5, distinct_sound=True)
+        assert index.similar("未", k=3) == []
+        assert "清" in index and len(index) == len(FEATURES)
+
+    def test_load_missing_file(self, tmp_path):
+        """Test that an index that hasn't been built is empty rather than an error."""
+        index = DistractorIndex.load(str(tmp_path / "missing.json"))
+        assert len(index) == 0
+
+    @pytest.mark.asyncio
+    async def test_build_scrapes_only_new_words(self, tmp_path):
+        """Test that a rebuild reuses the saved features and is loadable."""
+        path = str(tmp_path / "index.json")
+        db = MagicMock()
+        db.execute_complex_query = AsyncMock(
+            return_value=APIResponse(
+                data=[{"word": word} for word in ["清", "情"]], count=2
+            )
+        )
+
+        def word_info(word):
+            info = MagicMock(
+                radical=FEATURES[word].radical, stroke=11, cj_code=CANGJIE[word]
+            )
+            info.pingyin.cantonese = [MagicMock(code=FEATURES[word].jyutping[0])]
+            return info
+
+        scraper = MagicMock()
+        scraper.get_word_info.side_effect = word_info
+        scraper.get_word_phrase.side_effect = lambda info: MagicMock(
+            phrases=[MagicMock(phrase="清楚")]
+        )
+        await build_distractor_index(db, scraper, path=path)
+
+        db.execute_complex_query.return_value = APIResponse(
+            data=[{"word": word} for word in ["清", "情", "請", "Ｘ"]], count=4
+        )
+
+        def word_info_or_missing(word):
+            if word not in FEATURES:
+                raise ValueError("Word not found?")
+            return word_info(word)
+
+        scraper.get_word_info.side_effect = word_info_or_missing
+        index = await build_distractor_index(db, scraper, path=path)
+
+        scraped = [call.args[0] for call in scraper.get_word_info.call_args_list]
+        assert scraped == ["清", "情", "請", "Ｘ"]
+        assert DistractorIndex.load(path).similar("清") == index.similar("清")
+        assert len(index) == 3
+        assert index.phrases("清") == ["清楚"] and index.is_phrase("清楚")
+
+
+class TestLocalFillInVocab:
+    """Test cases for QuestionGenerator.create_local_fill_in_vocab_question."""
+
+    @pytest.fixture
+    def question_generator(self, monkeypatch):
+        if not (os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_PATH")):
+            pytest.skip("Importing the question generator needs the OpenAI settings")
+        import features.question_generator as question_generator
+
+        features = {
+            **FEATURES,
+            "晴": WordFeatures(radical="日", stroke=12, jyutping=["cing4"]),
+        }
+        phrases = {"清": ["清楚", "清"], "青": ["青草"], "情": ["情楚"]}
+        index = DistractorIndex(rank_similar(features), features, phrases)
+        monkeypatch.setattr(question_generator, "get_distractor_index", lambda: index)
+        return question_generator.QuestionGenerator
+
+    def test_builds_question_from_phrases(self, question_generator):
+        """Test that distractors forming another known phrase are skipped."""
+        question = question_generator.create_local_fill_in_vocab_question("清")
+
+        assert question.target_word == "清"
+        assert question.given[0].text == "?楚"
+        choices = {choice.text for choice in question.mcq.choices}
+        # 情 would make 情楚, a phrase of its own
+        assert "情" not in choices and len(choices) == 4 and "清" in choices
+
+    def test_none_without_phrases_or_distractors(self, question_generator):
+        """Test that words the index can't cover are left to the LLM."""
+        assert question_generator.create_local_fill_in_vocab_question("河") is None
+        assert question_generator.create_local_fill_in_vocab_question("一") is None
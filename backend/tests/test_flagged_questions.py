@@ -0,0 +1,105 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+from features.flagged_questions import FLAGGED_QUESTIONS_CHANNEL, FlaggedQuestionSet
+from models.helpers import APIResponse
+
+
+class TestFlaggedQuestionSet:
+    """Test cases for the in-process flagged question set."""
+
+    @pytest.fixture
+    def flagged_id(self):
+        return uuid4()
+
+    @pytest.fixture
+    def db(self, flagged_id):
+        db = MagicMock()
+        db.execute_complex_query = AsyncMock(
+            return_value=APIResponse(data=[{"question_id": flagged_id}], count=1)
+        )
+        db.listen = AsyncMock(return_value=AsyncMock())
+        return db
+
+    @pytest.mark.asyncio
+    async def test_load_and_filter(self, db, flagged_id):
+        """Test that loaded ids are filtered out, whether given as UUID or str."""
+        flagged = FlaggedQuestionSet()
+        await flagged.ensure_loaded(db)
+        await flagged.ensure_loaded(db)
+
+        db.execute_complex_query.assert_awaited_once()
+        kept = uuid4()
+        rows = [{"question_id": str(flagged_id).upper()}, {"question_id": kept}]
+        assert flagged.filter(rows, lambda row: row["question_id"]) == [
+            {"question_id": kept}
+        ]
+        assert flagged_id in flagged and str(flagged_id) in flagged
+
+    @pytest.mark.asyncio
+    async def test_start_listens_before_loading(self, db, flagged_id):
+        """Test that start subscribes first, and notifications add to the set."""
+        flagged = FlaggedQuestionSet()
+        await flagged.start(db)
+
+        channel, callback = db.listen.await_args.args
+        assert channel == FLAGGED_QUESTIONS_CHANNEL
+        assert flagged.loaded and len(flagged) == 1
+
+        # A reopened listening connection reloads the set
+        await db.listen.await_args.kwargs["on_reconnect"]()
+        assert db.execute_complex_query.await_count == 2
+
+        other = uuid4()
+        callback(str(other))
+        callback("not-a-uuid")
+        assert other in flagged and len(flagged) == 2
+
+        await flagged.stop()
+        db.listen.return_value.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_publish_adds_locally_and_notifies(self, db):
+        """Test that a new flag is applied here and sent to the other workers."""
+        flagged = FlaggedQuestionSet()
+        question_id = uuid4()
+
+        await flagged.publish(db, question_id)
+
+        assert question_id in flagged
+        params = db.execute_complex_query.await_args.kwargs["params"]
+        assert params == {
+            "channel": FLAGGED_QUESTIONS_CHANNEL,
+            "question_id": str(question_id),
+        }
+
+    @pytest.mark.asyncio
+    async def test_publish_survives_notify_failure(self, db):
+        """Test that a failed NOTIFY still flags the question in this worker."""
+        db.execute_complex_query.side_effect = RuntimeError("connection lost")
+        flagged = FlaggedQuestionSet()
+        question_id = uuid4()
+
+        await flagged.publish(db, question_id)
+
+        assert question_id in flagged
+
+    @pytest.mark.asyncio
+    async def test_flags_added_during_load_are_kept(self, db, flagged_id):
+        """Test that a NOTIFY arriving while the set loads survives the replacement."""
+        flagged = FlaggedQuestionSet()
+        notified = uuid4()
+
+        async def query(*args, **kwargs):
+            # The SELECT's snapshot predates this flag
+            flagged.add(notified)
+            return APIResponse(data=[{"question_id": flagged_id}], count=1)
+
+        db.execute_complex_query.side_effect = query
+        await flagged.load(db)
+
+        assert notified in flagged and flagged_id in flagged
+        # Only the load it arrived during keeps it, the next one trusts the database
+        db.execute_complex_query.side_effect = None
+        await flagged.load(db)
+        assert notified not in flagged
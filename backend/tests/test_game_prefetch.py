@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from features.game_prefetch import NextGamePrefetcher
+
+USER_ID = "11111111-1111-1111-1111-111111111111"
+
+
+async def no_revalidate(questions, wrong_words):
+    raise AssertionError("revalidate should not be called")
+
+
+class TestNextGamePrefetcher:
+    """Test cases for NextGamePrefetcher."""
+
+    @pytest.mark.asyncio
+    async def test_serves_prefetched_questions_once(self):
+        """Test that a finished prefetch is served and then cleared."""
+        prefetcher = NextGamePrefetcher(ttl=60)
+        generate = AsyncMock(return_value=["q1", "q2", "q3"])
+
+        prefetcher.prefetch(USER_ID, 3, generate)
+        await asyncio.sleep(0)
+
+        assert await prefetcher.take(USER_ID, 2, no_revalidate) == ["q1", "q2"]
+        assert await prefetcher.take(USER_ID, 2, no_revalidate) is None
+        generate.assert_awaited_once()
+        assert prefetcher.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waits_for_running_prefetch(self):
+        """Test that a prefetch still running is awaited instead of regenerated."""
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return ["q1"]
+
+        prefetcher = NextGamePrefetcher(ttl=60)
+        prefetcher.prefetch(USER_ID, 1, generate)
+        take = asyncio.create_task(prefetcher.take(USER_ID, 1, no_revalidate))
+        await asyncio.sleep(0)
+
+        assert not take.done()
+        release.set()
+        assert await take == ["q1"]
+
+    @pytest.mark.asyncio
+    async def test_take_timeout_leaves_prefetch_running(self):
+        """Test that a prefetch slower than the timeout is kept for a later take."""
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return ["q1"]
+
+        prefetcher = NextGamePrefetcher(ttl=60)
+        prefetcher.prefetch(USER_ID, 1, generate)
+
+        assert await prefetcher.take(USER_ID, 1, no_revalidate, timeout=0.01) is None
+        release.set()
+        assert await prefetcher.take(USER_ID, 1, no_revalidate) == ["q1"]
+
+    @pytest.mark.asyncio
+    async def test_stale_or_too_small_sets_miss(self):
+        """Test that expired prefetches and ones with too few questions are not served."""
+        prefetcher = NextGamePrefetcher(ttl=0)
+        prefetcher.prefetch(USER_ID, 2, AsyncMock(return_value=["q1", "q2"]))
+        await asyncio.sleep(0.01)
+        assert await prefetcher.take(USER_ID, 2, no_revalidate) is None
+
+        prefetcher.ttl = 60
+        prefetcher.prefetch(USER_ID, 2, AsyncMock(return_value=["q1", "q2"]))
+        assert await prefetcher.take(USER_ID, 5, no_revalidate) is None
+        assert prefetcher.get_stats()["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_prefetch_is_dropped(self):
+        """Test that a prefetch that raised leaves no entry behind."""
+        prefetcher = NextGamePrefetcher(ttl=60)
+        prefetcher.prefetch(USER_ID, 1, AsyncMock(side_effect=ValueError("no words")))
+        await asyncio.sleep(0.01)
+
+        assert prefetcher.get_stats()["entries"] == 0
+        assert await prefetcher.take(USER_ID, 1, no_revalidate) is None
+
+    @pytest.mark.asyncio
+    async def test_wrong_words_trigger_revalidation(self):
+        """Test that wrong words noted after prefetching are revalidated, not regenerated."""
+        prefetcher = NextGamePrefetcher(ttl=60)
+        generate = AsyncMock(return_value=["q1", "q2"])
+        revalidate = AsyncMock(return_value=["q1", "new"])
+
+        prefetcher.prefetch(USER_ID, 2, generate)
+        prefetcher.note_wrong_words(USER_ID, ["你", "好", "你"])
+        # Submitting keeps the fresh prefetch instead of starting over
+        prefetcher.prefetch(USER_ID, 2, generate, replace=False)
+
+        assert await prefetcher.take(USER_ID, 2, revalidate) == ["q1", "new"]
+        revalidate.assert_awaited_once_with(["q1", "q2"], ["你", "好"])
+        generate.assert_awaited_once()
+        assert prefetcher.get_stats()["revalidated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_replace_cancels_earlier_prefetch(self):
+        """Test that a new prefetch cancels the one it replaces."""
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return ["old"]
+
+        prefetcher = NextGamePrefetcher(ttl=60)
+        prefetcher.prefetch(USER_ID, 1, slow)
+        await asyncio.sleep(0)
+        prefetcher.prefetch(USER_ID, 1, AsyncMock(return_value=["new"]))
+
+        assert await prefetcher.take(USER_ID, 1, no_revalidate) == ["new"]
@@ -0,0 +1,142 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from models.LLM import AIQuestionType, LLMModels, FillInVocabFormat
+from utils.llm_cache import LLMResultCache
+
+
+def vocab_item(char: str) -> dict:
+    return {
+        "given_char": char,
+        "vocabularies": [f"{char}天"],
+        "similar_characters": ["甲", "乙", "丙"],
+    }
+
+
+class TestLLMResultCache:
+    """Test cases for the two-tier LLM result cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return LLMResultCache(
+            path=str(tmp_path / "llm.sqlite3"), ttl=60, max_memory_entries=1
+        )
+
+    async def _put(self, cache, *chars, prompt="prompt"):
+        await cache.put_many(
+            {c: FillInVocabFormat(**vocab_item(c)) for c in chars},
+            AIQuestionType.FILL_IN_VOCAB,
+            LLMModels.DEEPSEEK_V3,
+            prompt,
+        )
+
+    async def _get(self, cache, *chars, prompt="prompt"):
+        return await cache.get_many(
+            chars,
+            AIQuestionType.FILL_IN_VOCAB,
+            LLMModels.DEEPSEEK_V3,
+            prompt,
+            FillInVocabFormat,
+        )
+
+    @pytest.mark.asyncio
+    async def test_hits_survive_memory_eviction(self, cache, tmp_path):
+        """Test that entries evicted from the LRU are still served from SQLite."""
+        await self._put(cache, "晴", "雨")
+
+        found = await self._get(cache, "晴", "雨", "雪")
+
+        assert set(found) == {"晴", "雨"}
+        assert found["晴"].vocabularies == ["晴天"]
+        assert cache.get_stats()["memory_entries"] == 1
+        # A new process sees the same store
+        fresh = LLMResultCache(path=str(tmp_path / "llm.sqlite3"), ttl=60)
+        assert set(await self._get(fresh, "晴")) == {"晴"}
+
+    @pytest.mark.asyncio
+    async def test_prompt_change_misses(self, cache):
+        """Test that items generated with another prompt are not served."""
+        await self._put(cache, "晴", prompt="old prompt")
+        assert await self._get(cache, "晴", prompt="new prompt") == {}
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_dropped(self, tmp_path):
+        """Test that entries older than the TTL miss in both tiers."""
+        cache = LLMResultCache(path=str(tmp_path / "llm.sqlite3"), ttl=-1)
+        await self._put(cache, "晴")
+        assert await self._get(cache, "晴") == {}
+
+    @pytest.mark.asyncio
+    async def test_store_trimmed_to_max_entries(self, tmp_path):
+        """Test that SQLite keeps only the most recently used max_entries."""
+        cache = LLMResultCache(
+            path=str(tmp_path / "llm.sqlite3"), max_memory_entries=0, max_entries=2
+        )
+        for char in "一二三":
+            await self._put(cache, char)
+        assert set(await self._get(cache, "一", "二", "三")) == {"二", "三"}
+
+
+class TestAIQuestionGeneratorCache:
+    """Test cases for the cache in front of AIQuestionGenerator's batch calls."""
+
+    @pytest.fixture(autouse=True)
+    def generator_module(self):
+        if not (os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_PATH")):
+            pytest.skip("Importing AIQuestionGenerator needs the OpenAI settings")
+        import features.AI_question_generator as module
+
+        return module
+
+    @pytest.mark.asyncio
+    async def test_only_misses_go_to_llm(self, generator_module):
+        """Test that cached characters are not sent to the LLM again."""
+        client = MagicMock()
+        client.generate_text_with_structured_outputs = AsyncMock(
+            side_effect=lambda user_prompt, **_: {
+                "questions": [vocab_item(c) for c in user_prompt.split(", ")]
+            }
+        )
+        cache = LLMResultCache(path=None)
+        generator = generator_module.AIQuestionGenerator(client=client, cache=cache)
+
+        first = await generator.batch_genq_fill_in_vocab(["晴", "雨"])
+        second = await generator.batch_genq_fill_in_vocab(["雨", "雪"])
+
+        prompts = [
+            c.kwargs["user_prompt"]
+            for c in client.generate_text_with_structured_outputs.await_args_list
+        ]
+        assert prompts == ["晴, 雨", "雪"]
+        assert [q.target_word for q in first] == ["晴", "雨"]
+        assert [q.target_word for q in second] == ["雨", "雪"]
+        # Adaptor appends the answer to the choices, the cached item must not grow
+        cached = await cache.get_many(
+            ["雨"],
+            AIQuestionType.FILL_IN_VOCAB,
+            LLMModels.DEEPSEEK_V3,
+            generator_module.PROMPT_FILL_VOCAB,
+            FillInVocabFormat,
+        )
+        assert cached["雨"].similar_characters == ["甲", "乙", "丙"]
+
+        # Background replenishing wants new questions, not the cached ones
+        await generator.batch_genq_fill_in_vocab(["晴"], use_cache=False)
+        last_call = client.generate_text_with_structured_outputs.await_args
+        assert last_call.kwargs["user_prompt"] == "晴"
+
+    @pytest.mark.asyncio
+    async def test_unusable_items_not_cached(self, generator_module):
+        """Test that items Adaptor can't build a question from are not cached."""
+        client = MagicMock()
+        bad = dict(vocab_item("晴"), vocabularies=["天氣"])
+        client.generate_text_with_structured_outputs = AsyncMock(
+            return_value={"questions": [bad]}
+        )
+        generator = generator_module.AIQuestionGenerator(
+            client=client, cache=LLMResultCache(path=None)
+        )
+
+        assert await generator.batch_genq_fill_in_vocab(["晴"]) == []
+        assert await generator.batch_genq_fill_in_vocab(["晴"]) == []
+        assert client.generate_text_with_structured_outputs.await_count == 2
@@ -0,0 +1,321 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from models.db.db import SupabaseTable, SupabaseRPC
+from utils.database.pgdb import (
+    PgDatabaseService,
+    _json_decode,
+    _json_encode,
+    _jsonb_decode,
+    _jsonb_encode,
+)
+
+
+class TestPgJsonCodecs:
+    """Test cases for the json/jsonb codecs registered on pool connections."""
+
+    @pytest.fixture
+    def db(self):
+        return PgDatabaseService("postgresql://localhost/test")
+
+    @pytest.mark.asyncio
+    async def test_init_registers_json_and_jsonb(self, db):
+        """Test that both json types get a codec in pg_catalog."""
+        conn = MagicMock()
+        conn.set_type_codec = AsyncMock()
+
+        await db._init_connection(conn)
+
+        registered = [c.args[0] for c in conn.set_type_codec.await_args_list]
+        assert registered == ["json", "jsonb"]
+        for call in conn.set_type_codec.await_args_list:
+            assert call.kwargs["schema"] == "pg_catalog"
+            # COPY only works with binary codecs
+            assert call.kwargs["format"] == "binary"
+
+    def test_encoder_round_trip(self):
+        """Test that objects are encoded and decoded, and non-ASCII text survives."""
+        material = {"word": "草地", "blanks": [0, 1]}
+        assert _json_decode(_json_encode(material)) == material
+        assert _jsonb_decode(_jsonb_encode(material)) == material
+        assert _jsonb_encode(material).startswith(b"\x01")
+
+    def test_encoder_passes_prepared_json_through(self, db):
+        """Test that values already serialized by _prepare_value_for_insert are not double encoded."""
+        prepared = db._prepare_value_for_insert([{"a": 1}, {"b": 2}])
+        assert [_json_encode(v).decode() for v in prepared] == prepared
+        assert [_json_decode(v) for v in prepared] == [{"a": 1}, {"b": 2}]
+
+    def test_decode_leaves_decoded_values(self):
+        """Test that values already decoded by the codec are returned unchanged."""
+        value = {"existing_user": True}
+        assert _json_decode(value) is value
+
+
+class TestPgCopyInsert:
+    """Test cases for the COPY based bulk insert path."""
+
+    @pytest.fixture
+    def db(self):
+        return PgDatabaseService("postgresql://localhost/test")
+
+    @pytest.fixture
+    def mock_conn(self):
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+        conn.copy_records_to_table = AsyncMock()
+        conn.fetch = AsyncMock(return_value=[{"question_id": "q1"}])
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_bulk_insert_uses_copy(self, db, mock_conn):
+        """Test that bulk inserts copy prepared records into a staging table."""
+        rows = [{"question_id": "q1", "given_material": [{"text": "草"}]}]
+
+        result = await db.insert_data(
+            SupabaseTable.QUESTIONS, rows, conn=mock_conn, bulk=True
+        )
+
+        assert result == [{"question_id": "q1"}]
+        copy_call = mock_conn.copy_records_to_table.await_args
+        assert copy_call.args[0] == "_copy_questions"
+        assert copy_call.kwargs["columns"] == ["question_id", "given_material"]
+        ((question_id, material),) = copy_call.kwargs["records"]
+        assert question_id == "q1"
+        assert [_json_decode(m) for m in material] == [{"text": "草"}]
+        insert_sql = mock_conn.fetch.await_args.args[0]
+        assert insert_sql.startswith(
+            "INSERT INTO questions (question_id, given_material)"
+        )
+        assert "FROM _copy_questions" in insert_sql
+
+    @pytest.mark.asyncio
+    async def test_small_batches_use_values(self, db, mock_conn):
+        """Test that small batches stay on the multi-VALUES statement."""
+        db.statements.fetch = AsyncMock(return_value=[])
+
+        await db.insert_data(
+            SupabaseTable.GAME_QA_HISTORY, [{"game_id": "g1"}], conn=mock_conn
+        )
+
+        mock_conn.copy_records_to_table.assert_not_awaited()
+        db.statements.fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_values_batches_split_into_power_of_two_shapes(self, db, mock_conn):
+        """Test that odd batch sizes reuse the 8/4/1 row statements in one transaction."""
+        db.statements.fetch = AsyncMock(
+            side_effect=lambda conn, sql, *values: [
+                {"game_id": value} for value in values
+            ]
+        )
+        rows = [{"game_id": f"g{i}"} for i in range(13)]
+
+        result = await db.insert_data(
+            SupabaseTable.GAME_QA_HISTORY, rows, conn=mock_conn
+        )
+
+        assert result == rows
+        sizes = [
+            call.args[1].count("(") - 1 for call in db.statements.fetch.await_args_list
+        ]
+        assert sizes == [8, 4, 1]
+        mock_conn.transaction.assert_called_once()
+
+
+class TestPgBulkUpdate:
+    """Test cases for the unnest based bulk update."""
+
+    @pytest.fixture
+    def db(self):
+        db = PgDatabaseService("postgresql://localhost/test")
+        db._column_types[SupabaseTable.PAST_WRONG_WORDS.value] = {
+            "user_id": "uuid",
+            "word_id": "bigint",
+            "wrong_count": "bigint",
+            "wrong_image_url": "text",
+        }
+        db.statements.fetch = AsyncMock(return_value=[])
+        return db
+
+    @pytest.mark.asyncio
+    async def test_one_array_per_column(self, db):
+        """Test that rows are pivoted into one array parameter per column, keys first."""
+        rows = [
+            {"wrong_count": 2, "word_id": 1, "user_id": "u"},
+            {"wrong_count": 5, "word_id": 2, "user_id": "u"},
+        ]
+
+        await db.bulk_update(
+            SupabaseTable.PAST_WRONG_WORDS,
+            rows,
+            ["user_id", "word_id"],
+            conn=MagicMock(),
+        )
+
+        _, query, *arrays = db.statements.fetch.await_args.args
+        assert "unnest($1::uuid[], $2::bigint[], $3::bigint[])" in query
+        assert arrays == [["u", "u"], [1, 2], [2, 5]]
+
+    @pytest.mark.asyncio
+    async def test_rejects_rows_without_keys(self, db):
+        """Test that rows missing a key column are rejected before querying."""
+        with pytest.raises(ValueError):
+            await db.bulk_update(
+                SupabaseTable.PAST_WRONG_WORDS,
+                [{"wrong_count": 2}],
+                ["user_id", "word_id"],
+                conn=MagicMock(),
+            )
+        db.statements.fetch.assert_not_awaited()
+
+
+class TestPgUnitOfWork:
+    """Test cases for unit_of_work connection pinning."""
+
+    @pytest.fixture
+    def pinned_conn(self):
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=[])
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        return conn
+
+    @pytest.fixture
+    def db(self, pinned_conn):
+        db = PgDatabaseService("postgresql://localhost/test")
+        acquire_cm = AsyncMock()
+        acquire_cm.__aenter__.return_value = pinned_conn
+        pool = MagicMock()
+        pool.acquire = MagicMock(return_value=acquire_cm)
+        db._get_pool = AsyncMock(return_value=pool)
+        db.statements.fetch = AsyncMock(return_value=[])
+        return db
+
+    @pytest.mark.asyncio
+    async def test_helpers_share_the_pinned_connection(self, db, pinned_conn):
+        """Test that calls inside the block, including gathered ones, run on one connection."""
+        async with db.unit_of_work() as uow:
+            await asyncio.gather(
+                db.update_data(
+                    SupabaseTable.SESSIONS, {"is_active": False}, {"session_id": "s"}
+                ),
+                db.delete_data(SupabaseTable.SESSIONS, {"session_id": "s"}),
+            )
+            await db.rpc_query(SupabaseRPC.GET_RANDOM_WORDS, {"count": 1})
+            # Nested units of work join the outer one
+            async with db.unit_of_work() as inner:
+                assert inner is uow
+
+        db._get_pool.return_value.acquire.assert_called_once()
+        pinned_conn.transaction.assert_called_once()
+        used = [c.args[0] for c in db.statements.fetch.await_args_list]
+        assert used == [pinned_conn, pinned_conn]
+        pinned_conn.fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_transaction_sees_the_exception(self, db, pinned_conn):
+        """Test that an error inside the block reaches the transaction, which rolls back."""
+        with pytest.raises(RuntimeError):
+            async with db.unit_of_work():
+                raise RuntimeError("boom")
+
+        transaction = pinned_conn.transaction.return_value
+        exc_type = transaction.__aexit__.await_args.args[0]
+        assert exc_type is RuntimeError
+
+    @pytest.mark.asyncio
+    async def test_task_outliving_the_block_uses_the_pool(self, db, pinned_conn):
+        """Test that a task started inside the block gets a pooled connection after it."""
+        pooled_conn = MagicMock()
+        pooled_cm = AsyncMock()
+        pooled_cm.__aenter__.return_value = pooled_conn
+        pinned_cm = db._get_pool.return_value.acquire.return_value
+        db._get_pool.return_value.acquire.side_effect = [pinned_cm, pooled_cm]
+        block_done = asyncio.Event()
+
+        async def background():
+            await block_done.wait()
+            async with db._connection() as conn:
+                return conn
+
+        async with db.unit_of_work():
+            task = asyncio.create_task(background())
+        block_done.set()
+
+        assert await task is pooled_conn
+
+    @pytest.mark.asyncio
+    async def test_nested_helper_reuses_the_held_connection(self, db, pinned_conn):
+        """Test that a helper calling another inside the block does not wait on itself."""
+        async with db.unit_of_work():
+            async with db._connection() as outer:
+                async with db._connection() as inner:
+                    assert inner is outer is pinned_conn
+
+
+class TestPgAdvisoryLock:
+    """Test cases for the advisory lock held by background jobs."""
+
+    @pytest.mark.asyncio
+    async def test_lock_held_outside_the_pool(self, monkeypatch):
+        """Test that the lock is taken on its own connection, closed after the block."""
+        conn = MagicMock()
+        conn.fetchval = AsyncMock(return_value=True)
+        conn.execute = AsyncMock()
+        conn.close = AsyncMock()
+        monkeypatch.setattr(
+            "utils.database.pgdb.asyncpg.connect", AsyncMock(return_value=conn)
+        )
+        db = PgDatabaseService("postgresql://localhost/test")
+        db._get_pool = AsyncMock()
+
+        async with db.try_advisory_lock(42) as acquired:
+            assert acquired
+            conn.close.assert_not_awaited()
+
+        db._get_pool.assert_not_awaited()
+        conn.execute.assert_awaited_once_with("SELECT pg_advisory_unlock($1)", 42)
+        conn.close.assert_awaited_once()
+
+
+class TestPgListen:
+    """Test cases for the dedicated LISTEN connection."""
+
+    def make_conn(self):
+        conn = MagicMock()
+        conn.add_listener = AsyncMock()
+        conn.remove_listener = AsyncMock()
+        conn.close = AsyncMock()
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_lost_connection_is_reopened(self, monkeypatch):
+        """Test that a terminated connection is replaced, retried, and then caught up."""
+        lost, replacement = self.make_conn(), self.make_conn()
+        yield_once = asyncio.sleep
+        connect = AsyncMock(side_effect=[lost, OSError("refused"), replacement])
+        monkeypatch.setattr("utils.database.pgdb.asyncpg.connect", connect)
+        monkeypatch.setattr("utils.database.pgdb.asyncio.sleep", AsyncMock())
+        db = PgDatabaseService("postgresql://localhost/test")
+        callback, on_reconnect = MagicMock(), AsyncMock()
+
+        stop = await db.listen("channel", callback, on_reconnect=on_reconnect)
+        on_terminate = lost.add_termination_listener.call_args.args[0]
+        on_terminate(lost)
+        for _ in range(5):
+            await yield_once(0)
+
+        assert connect.await_count == 3
+        channel, on_notify = replacement.add_listener.await_args.args
+        assert channel == "channel"
+        on_notify(replacement, 1, "channel", "payload")
+        callback.assert_called_once_with("payload")
+        on_reconnect.assert_awaited_once()
+
+        await stop()
+        replacement.close.assert_awaited_once()
+        # Closing on stop does not reconnect
+        on_terminate = replacement.add_termination_listener.call_args.args[0]
+        on_terminate(replacement)
+        assert connect.await_count == 3
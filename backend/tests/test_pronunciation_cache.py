@@ -0,0 +1,111 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from features.distractor_index import DistractorIndex
+from features.pronunciation_cache import PronunciationCache
+from models.helpers import APIResponse
+
+
+def url_of(char):
+    return f"https://audio/{ord(char)}.mp3"
+
+
+@pytest.fixture
+def db():
+    async def lookup(query, params, **kwargs):
+        # 草 has no audio yet
+        rows = [
+            {
+                "word_id": word_id,
+                "pronunciation_url": (
+                    None if word_id == ord("草") else url_of(chr(word_id))
+                ),
+            }
+            for word_id in params["word_ids"]
+        ]
+        return APIResponse(data=rows, count=len(rows))
+
+    db = MagicMock()
+    db.execute_complex_query = AsyncMock(side_effect=lookup)
+    return db
+
+
+class TestPronunciationCache:
+    """Test cases for the batched, cached pronunciation URL lookup."""
+
+    @pytest.mark.asyncio
+    async def test_misses_fetched_in_one_query(self, db):
+        """Test that every uncached word is looked up with a single query."""
+        cache = PronunciationCache()
+
+        urls = await cache.get_many(db, ["的", "是", "的", "草"])
+
+        assert urls == {"的": url_of("的"), "是": url_of("是")}
+        db.execute_complex_query.assert_awaited_once()
+        params = db.execute_complex_query.await_args.kwargs["params"]
+        assert params == {"word_ids": [ord("的"), ord("是"), ord("草")]}
+
+    @pytest.mark.asyncio
+    async def test_cached_words_not_fetched_again(self, db):
+        """Test that cached words are served from memory, and words without audio are retried."""
+        cache = PronunciationCache()
+        await cache.get_many(db, ["的", "草"])
+
+        urls = await cache.get_many(db, ["的", "草"])
+
+        assert urls == {"的": url_of("的")}
+        params = db.execute_complex_query.await_args.kwargs["params"]
+        assert params == {"word_ids": [ord("草")]}
+        assert cache.get_stats() == {"entries": 1, "hits": 1, "misses": 3}
+
+        db.execute_complex_query.reset_mock()
+        assert await cache.get_many(db, ["的"]) == {"的": url_of("的")}
+        db.execute_complex_query.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_evicted(self, db):
+        """Test that the cache stays within max_entries."""
+        cache = PronunciationCache(max_entries=2)
+        await cache.get_many(db, ["一", "二"])
+        await cache.get_many(db, ["一"])
+        await cache.get_many(db, ["三"])
+
+        db.execute_complex_query.reset_mock()
+        await cache.get_many(db, ["一", "三"])
+        db.execute_complex_query.assert_not_awaited()
+        await cache.get_many(db, ["二"])
+        db.execute_complex_query.assert_awaited_once()
+
+
+class TestCreateListeningQuestions:
+    """Test cases for QuestionGenerator.create_listening_questions."""
+
+    @pytest.mark.asyncio
+    async def test_builds_questions_from_one_lookup(self, db, monkeypatch):
+        """Test that a batch of listening questions shares one pronunciation query."""
+        if not (os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_PATH")):
+            pytest.skip("Importing the question generator needs the OpenAI settings")
+        import features.question_generator as question_generator
+
+        monkeypatch.setattr(
+            question_generator, "get_pronunciation_cache", lambda: PronunciationCache()
+        )
+        # 的 is indexed with one distractor, the rest come from the defaults
+        monkeypatch.setattr(
+            question_generator,
+            "get_distractor_index",
+            lambda: DistractorIndex({"的": ["約"]}),
+        )
+
+        questions = (
+            await question_generator.QuestionGenerator.create_listening_questions(
+                ["的", "是", "草"], db
+            )
+        )
+
+        db.execute_complex_query.assert_awaited_once()
+        assert questions["草"] is None
+        assert questions["的"].target_word == "的"
+        assert questions["的"].given[0].sound_url == url_of("的")
+        choices = [choice.text for choice in questions["的"].mcq.choices]
+        assert choices == ["的", "約", "是", "草"]
@@ -0,0 +1,148 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from models.QnA import QuestionType
+from models.services import UserWrongChar
+
+
+@pytest.fixture
+def replenisher_module():
+    if not (os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_PATH")):
+        pytest.skip("Importing the question services needs the OpenAI settings")
+    import features.question_bank_replenisher as module
+
+    return module
+
+
+def make_batch(module, word, good, question_types=()):
+    from features.enhanced_question_service import WordQuestionBatch
+
+    return WordQuestionBatch(
+        word_id=ord(word),
+        word=word,
+        questions=[MagicMock(question_type=t) for t in question_types],
+        scored_questions=[],
+        good_questions=[MagicMock()] * good,
+        not_good_questions=[],
+    )
+
+
+class TestQuestionBankReplenisher:
+    """Test cases for the background question bank replenisher."""
+
+    @pytest.fixture
+    def service(self):
+        service = MagicMock()
+        service.available_question_types = [
+            QuestionType.COPY_STROKE,
+            QuestionType.FILL_IN_VOCAB,
+            QuestionType.FILL_IN_SENTENCE,
+        ]
+        service.llm_request_manager.free_capacity.return_value = None
+        service.db.try_advisory_lock.return_value.__aenter__.return_value = True
+        return service
+
+    def test_find_low_supply(self, replenisher_module, service):
+        """Test that only short words get pairs, least stocked AI types first."""
+        replenisher = replenisher_module.QuestionBankReplenisher(
+            service, min_good_questions=2
+        )
+        batches = [
+            make_batch(replenisher_module, "晴", good=2),
+            make_batch(
+                replenisher_module,
+                "雨",
+                good=1,
+                question_types=[QuestionType.FILL_IN_VOCAB],
+            ),
+            make_batch(replenisher_module, "雪", good=0),
+        ]
+
+        assert replenisher.find_low_supply(batches) == [
+            ("雨", QuestionType.FILL_IN_SENTENCE),
+            ("雪", QuestionType.FILL_IN_VOCAB),
+            ("雪", QuestionType.FILL_IN_SENTENCE),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_replenish_generates_low_priority_and_saves(
+        self, replenisher_module, service
+    ):
+        """Test a full pass: classify, generate in the low lane in chunks, save."""
+        from utils.queue_manager import Priority
+
+        words = [
+            UserWrongChar(word=w, word_id=ord(w), wrong_count=1, last_wrong_at=0)
+            for w in "晴雨"
+        ]
+        service.db.execute_complex_query = AsyncMock(return_value=MagicMock(data=words))
+        service.fetch_questions_for_words = AsyncMock(
+            return_value=[make_batch(replenisher_module, w, good=0) for w in "晴雨"]
+        )
+        service.classify_questions_by_goodness.side_effect = lambda batches: batches
+        service.generate_ai_questions_for_words = AsyncMock(
+            side_effect=lambda pairs, *_, **__: {pair: MagicMock() for pair in pairs}
+        )
+        service.save_generated_questions = AsyncMock(side_effect=lambda q: q)
+        replenisher = replenisher_module.QuestionBankReplenisher(
+            service, min_good_questions=1, chunk_size=1
+        )
+
+        assert await replenisher.replenish() == 2
+        service.classify_questions_by_goodness.assert_called_once()
+        calls = service.generate_ai_questions_for_words.await_args_list
+        assert len(calls) == 2
+        assert all(c.kwargs["priority"] == Priority.LOW for c in calls)
+        # Cached items would only repeat questions already in the bank
+        assert all(c.kwargs["fresh"] for c in calls)
+
+    @pytest.mark.asyncio
+    async def test_stops_when_llm_queue_is_full(self, replenisher_module, service):
+        """Test that a saturated LLM queue is left to interactive traffic."""
+        service.db.execute_complex_query = AsyncMock(
+            return_value=MagicMock(
+                data=[
+                    UserWrongChar(word="晴", word_id=1, wrong_count=1, last_wrong_at=0)
+                ]
+            )
+        )
+        service.fetch_questions_for_words = AsyncMock(
+            return_value=[make_batch(replenisher_module, "晴", good=0)]
+        )
+        service.classify_questions_by_goodness.side_effect = lambda batches: batches
+        service.generate_ai_questions_for_words = AsyncMock()
+        service.llm_request_manager.free_capacity.return_value = 0
+        replenisher = replenisher_module.QuestionBankReplenisher(service)
+
+        assert await replenisher.replenish() == 0
+        service.generate_ai_questions_for_words.assert_not_awaited()
+
+    def test_admit_checks_room_per_pair(self, replenisher_module, service):
+        """Test that a chunk is cut at the first pair whose queue has no room left."""
+        room = {"FILL_IN_VOCAB": 1, "FILL_IN_SENTENCE": 5}
+        service.llm_request_manager.free_capacity.side_effect = (
+            lambda qtype, priority: room[qtype.name]
+        )
+        replenisher = replenisher_module.QuestionBankReplenisher(service)
+        chunk = [
+            ("晴", QuestionType.FILL_IN_VOCAB),
+            ("晴", QuestionType.FILL_IN_SENTENCE),
+            ("雨", QuestionType.FILL_IN_VOCAB),
+            ("雨", QuestionType.FILL_IN_SENTENCE),
+        ]
+
+        assert replenisher.admit(chunk) == chunk[:2]
+
+    @pytest.mark.asyncio
+    async def test_skips_while_another_worker_holds_the_lock(
+        self, replenisher_module, service
+    ):
+        """Test that only the worker holding the advisory lock replenishes."""
+        service.db.try_advisory_lock.return_value.__aenter__.return_value = False
+        replenisher = replenisher_module.QuestionBankReplenisher(service)
+
+        assert await replenisher.replenish() == 0
+        service.db.try_advisory_lock.assert_called_once_with(
+            replenisher_module.REPLENISH_LOCK_KEY
+        )
+        service.db.execute_complex_query.assert_not_called()
@@ -0,0 +1,146 @@
+import json
+import os
+import pytest
+import pytest_asyncio
+
+MIGRATIONS = [
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "supabase", name)
+    for name in ["questions_candidate_indexes.sql", "question_summaries.sql"]
+]
+
+WORD_COUNT = 4000
+QUESTION_COUNT = 200_000
+
+
+@pytest.fixture
+def queries():
+    if not os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("Query plan tests need a scratch Postgres in TEST_DATABASE_URL")
+    import features.question_queries as module
+
+    return module
+
+
+@pytest_asyncio.fixture
+async def conn(queries):
+    """
+    A connection with a questions table of realistic size in a scratch schema, dropped
+    afterwards. Not a rolled back transaction: VACUUM can't run in one, and without the
+    visibility map it sets the planner has no reason to prefer index-only scans.
+    """
+    import asyncpg
+
+    conn = await asyncpg.connect(os.environ["TEST_DATABASE_URL"])
+    try:
+        await conn.execute("""
+            DROP SCHEMA IF EXISTS query_plan_test CASCADE;
+            CREATE SCHEMA query_plan_test;
+            SET search_path = query_plan_test;
+            CREATE TABLE questions (
+                question_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+                answer_type text NOT NULL,
+                question_type text NOT NULL,
+                created_at bigint NOT NULL,
+                given_material json[],
+                target_word_id bigint,
+                prompt text,
+                mc_choices json[],
+                mc_answers json[],
+                pairs json[],
+                use_count bigint DEFAULT 0,
+                correct_count bigint DEFAULT 0
+            );
+            CREATE TABLE flagged_questions (
+                flag_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+                question_id uuid NOT NULL REFERENCES questions (question_id)
+            );
+            """)
+        await conn.execute(
+            """
+            INSERT INTO questions (answer_type, question_type, created_at, target_word_id, prompt)
+            SELECT 'mcq', 'fill_in_vocab', i, 19968 + i % $1, 'prompt'
+            FROM generate_series(1, $2) AS i
+            """,
+            WORD_COUNT,
+            QUESTION_COUNT,
+        )
+        await conn.execute("""
+            INSERT INTO flagged_questions (question_id)
+            SELECT question_id FROM questions WHERE created_at % 100 = 0
+            """)
+        for migration in MIGRATIONS:
+            with open(migration, encoding="utf-8") as f:
+                await conn.execute(f.read().replace("public.", ""))
+        await conn.execute("VACUUM ANALYZE questions")
+        yield conn
+    finally:
+        await conn.execute("DROP SCHEMA IF EXISTS query_plan_test CASCADE")
+        await conn.close()
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query, params):
+    # Same named to positional conversion as PgDatabaseService.execute_complex_query
+    for i, name in enumerate(params):
+        query = query.replace(f"${name}", f"${i + 1}")
+    result = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *params.values())
+    if isinstance(result, str):
+        result = json.loads(result)
+    return list(plan_nodes(result[0]["Plan"]))
+
+
+def assert_no_seq_scans(nodes, tables):
+    scanned = [n.get("Relation Name") for n in nodes if n["Node Type"] == "Seq Scan"]
+    assert not set(tables) & set(scanned), scanned
+
+
+def assert_flagged_questions_not_read(nodes):
+    # Flagged ids come from the in-process set, see features/flagged_questions.py
+    assert not any(n.get("Relation Name") == "flagged_questions" for n in nodes)
+
+
+class TestQuestionQueryPlans:
+    """EXPLAIN based regression tests for the question candidate queries."""
+
+    @pytest.mark.asyncio
+    async def test_candidate_query_uses_indexes(self, queries, conn):
+        """Test that the per-word lateral query is an index-only scan through the view."""
+        nodes = await explain(
+            conn,
+            queries.CANDIDATE_QUESTIONS_QUERY,
+            {"word_ids": list(range(19968, 19988)), "per_word": 50},
+        )
+
+        assert_no_seq_scans(nodes, ["questions"])
+        assert_flagged_questions_not_read(nodes)
+        # The index carries every column of question_summaries
+        assert any(
+            n["Node Type"] == "Index Only Scan"
+            and n.get("Index Name") == "questions_target_word_created_at_idx"
+            for n in nodes
+        ), [n["Node Type"] for n in nodes]
+
+    @pytest.mark.asyncio
+    async def test_fallback_query_uses_indexes(self, queries, conn):
+        """Test that the fallback query reads the words through the index, not the whole table."""
+        flagged_ids = await conn.fetch("SELECT question_id FROM flagged_questions")
+        nodes = await explain(
+            conn,
+            queries.FALLBACK_QUESTIONS_QUERY,
+            {
+                "word_ids": list(range(19968, 19988)),
+                "flagged_ids": [row["question_id"] for row in flagged_ids],
+                "limit": 10,
+            },
+        )
+
+        assert_no_seq_scans(nodes, ["questions"])
+        assert_flagged_questions_not_read(nodes)
+        assert any(
+            n.get("Index Name") == "questions_target_word_created_at_idx" for n in nodes
+        )
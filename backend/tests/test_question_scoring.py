@@ -0,0 +1,428 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.QnA import AnswerType, QuestionType
+from models.db.db import QuestionSummary
+from models.helpers import APIResponse, get_time
+from uuid import uuid4
+
+
+@pytest.fixture
+def service():
+    if not (os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_PATH")):
+        pytest.skip("Importing the question services needs the OpenAI settings")
+    from features.enhanced_question_service import EnhancedQuestionService
+
+    return EnhancedQuestionService(
+        db=MagicMock(),
+        word_service=MagicMock(),
+        user_service=MagicMock(),
+        llm_request_manager=MagicMock(),
+        storage_service=MagicMock(),
+        question_statistics_service=MagicMock(),
+    )
+
+
+def make_question(word_id, question_type, age_hours, use_count=0):
+    return QuestionSummary(
+        question_id=uuid4(),
+        question_type=question_type,
+        target_word_id=word_id,
+        created_at=get_time() - int(age_hours * 3600),
+        use_count=use_count,
+    )
+
+
+def make_batches(count):
+    from features.enhanced_question_service import WordQuestionBatch
+
+    batches = []
+    for word_id in range(count):
+        questions = [
+            make_question(word_id, qtype, age_hours=age, use_count=uses)
+            for qtype, age, uses in [
+                (QuestionType.FILL_IN_VOCAB, 1, 0),
+                (QuestionType.COPY_STROKE, 500, 10),
+                (QuestionType.LISTENING, 200, 150),
+                (QuestionType.FILL_IN_SENTENCE, 24 * word_id, 3),
+            ]
+        ]
+        batches.append(
+            WordQuestionBatch(
+                word_id=word_id,
+                word=chr(0x4E00 + word_id),
+                questions=questions,
+                scored_questions=[],
+                good_questions=[],
+                not_good_questions=[],
+            )
+        )
+    return batches
+
+
+class TestQuestionScoring:
+    """Test cases for the vectorised question scoring and classification."""
+
+    def test_scores_match_score_question(self, service):
+        """Test that the batch scores equal the per-question scores for the same random factor."""
+        questions = [q for batch in make_batches(3) for q in batch.questions]
+        rng = MagicMock()
+        rng.random.side_effect = lambda n: np.full(n, 0.25)
+
+        now = get_time()
+        with patch("features.enhanced_question_service.get_time", return_value=now):
+            scores = service.score_questions(questions, rng)
+            with patch("random.random", return_value=0.25):
+                expected = [service.score_question(q) for q in questions]
+
+        np.testing.assert_allclose(scores, expected)
+
+    def test_classification_is_repeatable_with_a_seed(self, service):
+        """Test that one seeded generator gives the same batch order and classification."""
+
+        def classify(seed):
+            batches = service.classify_questions_by_goodness(
+                make_batches(5), rng=np.random.default_rng(seed)
+            )
+            return [
+                (
+                    batch.word_id,
+                    [q.score for q in batch.scored_questions],
+                    [q.question_entry.question_type for q in batch.good_questions],
+                )
+                for batch in batches
+            ]
+
+        assert classify(7) == classify(7)
+
+    def test_batches_are_sorted_and_partitioned(self, service):
+        """Test that each batch is sorted by score and split into good and not good."""
+        batches = service.classify_questions_by_goodness(
+            make_batches(4), rng=np.random.default_rng(1)
+        )
+
+        assert sorted(batch.word_id for batch in batches) == [0, 1, 2, 3]
+        for batch in batches:
+            scores = [q.score for q in batch.scored_questions]
+            assert scores == sorted(scores, reverse=True)
+            assert all(0 <= score <= 1 for score in scores)
+            assert {id(q.question_entry) for q in batch.scored_questions} == {
+                id(q) for q in batch.questions
+            }
+            assert all(q.word_id == batch.word_id for q in batch.scored_questions)
+            good_and_not = batch.good_questions + batch.not_good_questions
+            assert sorted(map(id, good_and_not)) == sorted(
+                map(id, batch.scored_questions)
+            )
+
+    def test_empty_batches(self, service):
+        """Test that words without questions are kept and left unclassified."""
+        batches = make_batches(2)
+        batches[0].questions = []
+
+        batches = service.classify_questions_by_goodness(batches)
+
+        empty = next(batch for batch in batches if batch.word_id == 0)
+        assert empty.scored_questions == []
+        assert service.classify_questions_by_goodness([]) == []
+
+
+class TestTwoPhaseFetch:
+    """Test cases for loading full rows only for the chosen candidates."""
+
+    def full_row(self, summary):
+        return {
+            "question_id": summary.question_id,
+            "question_type": QuestionType.COPY_STROKE.value,
+            "answer_type": AnswerType.WRITING.value,
+            "target_word_id": 0x4E00 + summary.target_word_id,
+            "prompt": "prompt",
+            "handwrite_target": chr(0x4E00 + summary.target_word_id),
+            "created_at": summary.created_at,
+        }
+
+    @pytest.mark.asyncio
+    async def test_loads_only_chosen_rows_in_one_query(self, service):
+        """Test that one query loads the best good question of each used word."""
+        batches = make_batches(4)
+        for batch in batches:
+            batch.good_questions = [
+                MagicMock(question_entry=q) for q in batch.questions[::2]
+            ]
+        chosen = [batch.good_questions[0].question_entry for batch in batches[:2]]
+        service.storage_service.get_submit_url.return_value = "https://upload"
+        service.db.execute_complex_query = MagicMock()
+
+        async def load(query, params, **kwargs):
+            assert params["question_ids"] == [q.question_id for q in chosen]
+            # The second chosen question was deleted in the meantime
+            return APIResponse(data=[self.full_row(chosen[0])], count=1)
+
+        service.db.execute_complex_query.side_effect = load
+
+        questions, remaining = await service._collect_good_existing_questions(
+            batches, "11111111-1111-1111-1111-111111111111", count=2
+        )
+
+        assert service.db.execute_complex_query.call_count == 1
+        assert [q.question_id for q in questions] == [chosen[0].question_id]
+        assert [b.word_id for b in remaining] == [1, 2, 3]
+
+
+class TestFallbackQuestions:
+    """Test cases for the last resort query of any unflagged questions."""
+
+    @pytest.mark.asyncio
+    async def test_flagged_excluded_in_sql(self, service):
+        """Test that flagged ids are passed to the query, which is limited to the count needed."""
+        flagged_id = uuid4()
+        service.flagged_questions = MagicMock()
+        service.flagged_questions.ensure_loaded = AsyncMock()
+        service.flagged_questions.ids.return_value = [str(flagged_id)]
+        service.db.execute_complex_query = AsyncMock(
+            return_value=APIResponse(data=[], count=0)
+        )
+
+        await service.get_fallback_questions([1, 2], needed_count=3)
+
+        params = service.db.execute_complex_query.await_args.kwargs["params"]
+        assert params == {
+            "word_ids": [1, 2],
+            "flagged_ids": [str(flagged_id)],
+            "limit": 3,
+        }
+
+
+class TestGenerationPipeline:
+    """Test cases for the concurrent steps of generate_questions_for_user."""
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_overlap(self, service):
+        """Test that random words and the fallback are fetched alongside their peers."""
+        from models.db.db import Word
+
+        user_id = "11111111-1111-1111-1111-111111111111"
+        events = []
+
+        async def wrong_words(user_id):
+            await asyncio.sleep(0.01)
+            events.append("wrong_words done")
+            return []
+
+        async def random_words(count):
+            events.append("random_words")
+            return [Word(word=chr(0x4E00 + i)) for i in range(count)]
+
+        async def generate(words, user_id, **kwargs):
+            await asyncio.sleep(0.01)
+            events.append("ai done")
+            return {}
+
+        async def fallback(word_ids, needed_count):
+            events.append("fallback")
+            return [MagicMock(question_id=uuid4()) for _ in range(needed_count)]
+
+        service.user_service.get_user_wrong_words = wrong_words
+        service.word_service.get_random_words = random_words
+        service.generate_ai_questions_for_words = generate
+        service.save_generated_questions = AsyncMock(return_value={})
+        service.get_fallback_questions = fallback
+        service._convert_question_to_base = lambda entry, user_id: entry
+        batches = make_batches(3)
+        for batch in batches:
+            batch.questions = []
+        service.fetch_questions_for_words = AsyncMock(return_value=batches)
+
+        questions = await service.generate_questions_for_user(user_id, count=3)
+
+        assert len(questions) == 3
+        # Each speculative fetch runs before the step it overlaps with finishes
+        assert events == ["random_words", "wrong_words done", "fallback", "ai done"]
+
+    @pytest.mark.asyncio
+    async def test_deadline_degrades_and_saves_late_questions(self, service):
+        """Test that a slow AI is given up on at the deadline but its questions are saved."""
+        from models.db.db import Word
+
+        user_id = "11111111-1111-1111-1111-111111111111"
+        release = asyncio.Event()
+        late_question = MagicMock(question_id=uuid4())
+
+        async def generate(words, user_id, **kwargs):
+            await release.wait()
+            return {words[0]: late_question}
+
+        async def save(generated):
+            return generated
+
+        service.user_service.get_user_wrong_words = AsyncMock(return_value=[])
+        service.word_service.get_random_words = AsyncMock(
+            return_value=[Word(word=chr(0x4E00 + i)) for i in range(6)]
+        )
+        batches = make_batches(3)
+        for batch in batches:
+            batch.questions = []
+        service.fetch_questions_for_words = AsyncMock(return_value=batches)
+        service.get_fallback_questions = AsyncMock(return_value=[])
+        service.generate_ai_questions_for_words = generate
+        service.save_generated_questions = AsyncMock(side_effect=save)
+        service.question_generator.create_copy_stroke_question = (
+            lambda char, **kwargs: MagicMock(question_id=uuid4(), target_word=char)
+        )
+        service.deadline_reserve = 0.05
+
+        questions = await asyncio.wait_for(
+            service.generate_questions_for_user(user_id, count=3, deadline=0.1),
+            timeout=1,
+        )
+
+        # Filled with COPY_STROKE questions, built locally and saved in one insert
+        assert [q.target_word for q in questions] == [b.word for b in batches]
+        assert service.save_generated_questions.await_count == 1
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert service.save_generated_questions.await_count == 2
+        assert not service._late_generations
+
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_database_steps(self, service):
+        """Test that a stalled query or save can't hold the set past the deadline."""
+        from models.db.db import Word
+
+        stalled = asyncio.Event()
+
+        async def stall(*args, **kwargs):
+            await stalled.wait()
+
+        service.user_service.get_user_wrong_words = AsyncMock(return_value=[])
+        service.word_service.get_random_words = AsyncMock(
+            return_value=[Word(word=chr(0x4E00 + i)) for i in range(6)]
+        )
+        # e.g. a pool acquire that doesn't come back
+        service.fetch_questions_for_words = stall
+        service.get_fallback_questions = stall
+        service.save_generated_questions = stall
+        service.question_generator.create_copy_stroke_question = (
+            lambda char, **kwargs: MagicMock(question_id=uuid4(), target_word=char)
+        )
+        service.deadline_reserve = 0.05
+
+        questions = await asyncio.wait_for(
+            service.generate_questions_for_user(
+                "11111111-1111-1111-1111-111111111111", count=3, deadline=0.2
+            ),
+            timeout=0.5,
+        )
+
+        # COPY_STROKE questions for revision words, returned while still being saved
+        assert len(questions) == 3
+        assert service._late_generations
+        stalled.set()
+        await asyncio.sleep(0.01)
+        assert not service._late_generations
+
+    @pytest.mark.asyncio
+    async def test_priority_reaches_llm(self, service):
+        """Test that a background caller's priority is used for the AI step's LLM calls."""
+        from models.db.db import Word
+        from utils.queue_manager import Priority
+
+        priorities = []
+
+        async def generate(words, user_id, priority=Priority.HIGH, **kwargs):
+            priorities.append(priority)
+            return {}
+
+        service.user_service.get_user_wrong_words = AsyncMock(return_value=[])
+        service.word_service.get_random_words = AsyncMock(
+            return_value=[Word(word=chr(0x4E00 + i)) for i in range(3)]
+        )
+        batches = make_batches(3)
+        for batch in batches:
+            batch.questions = []
+        service.fetch_questions_for_words = AsyncMock(return_value=batches)
+        service.get_fallback_questions = AsyncMock(
+            return_value=[MagicMock(question_id=uuid4()) for _ in range(3)]
+        )
+        service._convert_question_to_base = lambda entry, user_id: entry
+        service.generate_ai_questions_for_words = generate
+        service.save_generated_questions = AsyncMock(return_value={})
+
+        await service.generate_questions_for_user(
+            "11111111-1111-1111-1111-111111111111", count=3, priority=Priority.LOW
+        )
+
+        assert priorities == [Priority.LOW]
+
+    def test_llm_saturated_checks_lane(self, service):
+        """Test that llm_saturated asks the LLM queues about the given lane."""
+        from utils.queue_manager import Priority
+
+        service.llm_request_manager.is_saturated = lambda qtype, priority: (
+            priority == Priority.LOW
+        )
+
+        assert service.llm_saturated(Priority.LOW)
+        assert not service.llm_saturated(Priority.HIGH)
+
+
+class TestLocalQuestions:
+    """Test cases for trying the local generators before the LLM."""
+
+    @pytest.mark.asyncio
+    async def test_local_fill_in_vocab_skips_llm(self, service):
+        """Test that only the words the local generator can't cover are queued."""
+        local_question = MagicMock(target_word="清")
+        service.question_generator.create_local_fill_in_vocab_question = lambda char: (
+            local_question if char == "清" else None
+        )
+        service.question_generator.create_ai_question = AsyncMock(
+            return_value=MagicMock(target_word="河")
+        )
+        service._should_divert = MagicMock(return_value=False)
+
+        results = await service.generate_ai_questions_for_words(
+            [("清", QuestionType.FILL_IN_VOCAB), ("河", QuestionType.FILL_IN_VOCAB)],
+            "11111111-1111-1111-1111-111111111111",
+        )
+
+        assert results[("清", QuestionType.FILL_IN_VOCAB)] is local_question
+        assert results[("河", QuestionType.FILL_IN_VOCAB)].target_word == "河"
+        service.question_generator.create_ai_question.assert_awaited_once()
+        assert (
+            service.question_generator.create_ai_question.await_args.kwargs["char"]
+            == "河"
+        )
+
+
+class TestSaveGeneratedQuestions:
+    """Test cases for matching inserted rows back to the generated questions."""
+
+    @pytest.mark.asyncio
+    async def test_rows_matched_by_question_id(self, service):
+        """Test that questions get their own row even if RETURNING reorders them."""
+        words = [("一", QuestionType.FILL_IN_VOCAB), ("二", QuestionType.COPY_STROKE)]
+        generated = {key: MagicMock(question_id=uuid4()) for key in words}
+
+        def to_entry(question):
+            return MagicMock(
+                model_dump=lambda **kwargs: {"question_id": question.question_id}
+            )
+
+        async def insert(table, rows):
+            return [dict(row) for row in reversed(rows)][:1]
+
+        service.db.insert_data = insert
+        expected_id = generated[words[1]].question_id
+        with patch(
+            "features.enhanced_question_service.QuestionEntry.from_question_base",
+            side_effect=to_entry,
+        ):
+            saved = await service.save_generated_questions(dict(generated))
+
+        # Only the second question came back, and it keeps its own id
+        assert saved[words[0]] is None
+        assert saved[words[1]].question_id == expected_id
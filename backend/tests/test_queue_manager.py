@@ -0,0 +1,520 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from utils.queue_manager import (
+    BatchProcessor,
+    ItemResult,
+    MissingResultError,
+    Priority,
+    QueueFullError,
+    QueueManager,
+    QueueShutdownError,
+)
+from utils.batch_tuner import BatchTuner
+
+
+async def echo_batch(items, suffix="!"):
+    return [f"{item}{suffix}" for item in items]
+
+
+class TestBatchProcessor:
+    """Test cases for the batching behaviour of BatchProcessor."""
+
+    @pytest.mark.asyncio
+    async def test_idle_processor_has_no_timer(self):
+        """Test that an empty processor does not keep a timer or background task."""
+        processor = BatchProcessor(echo_batch, batch_size=3, max_wait=0.05)
+        assert processor.buckets == {}
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_flushes_at_max_wait(self):
+        """Test that a partial batch is dispatched once the oldest item hits max_wait."""
+        processor = BatchProcessor(echo_batch, batch_size=3, max_wait=0.05)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        result = await processor.add_item("a")
+
+        assert result == "a!"
+        assert 0.05 <= loop.time() - start < 0.15
+        assert all(b.timer is None for b in processor.buckets.values())
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_size_trigger_cancels_timer(self):
+        """Test that a full batch is dispatched immediately and disarms the deadline timer."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(batch_function, batch_size=2, max_wait=10)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(processor.add_item("a"), processor.add_item("b")),
+            timeout=1,
+        )
+
+        assert results == ["a!", "b!"]
+        batch_function.assert_awaited_once()
+        assert all(b.timer is None for b in processor.buckets.values())
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_batches_run_concurrently(self):
+        """Test that a second full batch starts while the first is still running."""
+        release = asyncio.Event()
+        running = []
+
+        async def slow_batch(items):
+            running.append(items)
+            await release.wait()
+            return items
+
+        processor = BatchProcessor(
+            slow_batch, batch_size=2, max_wait=10, max_concurrent_batches=2
+        )
+        tasks = [asyncio.create_task(processor.add_item(i)) for i in range(4)]
+        await asyncio.sleep(0.01)
+
+        assert running == [[0, 1], [2, 3]]
+        assert processor.in_flight == 2
+        release.set()
+        assert await asyncio.gather(*tasks) == [0, 1, 2, 3]
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_batches_wait_for_a_free_slot(self):
+        """Test that batches beyond max_concurrent_batches wait, and keep batch_size."""
+        release = asyncio.Event()
+        running = []
+
+        async def slow_batch(items):
+            running.append(items)
+            await release.wait()
+            return items
+
+        processor = BatchProcessor(slow_batch, batch_size=2, max_wait=10)
+        tasks = [asyncio.create_task(processor.add_item(i)) for i in range(5)]
+        await asyncio.sleep(0.01)
+
+        assert running == [[0, 1]]
+        assert processor.get_queue_size() == 3
+        release.set()
+        await asyncio.sleep(0.01)
+        assert running == [[0, 1], [2, 3]]
+        await processor.shutdown()
+        assert await asyncio.gather(*tasks) == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_items_batched_by_kwargs(self):
+        """Test that items with different kwargs go to separate batches with their own kwargs."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(batch_function, batch_size=2, max_wait=0.02)
+
+        results = await asyncio.gather(
+            processor.add_item("a", suffix="!"),
+            processor.add_item("b", suffix="?"),
+            processor.add_item("c", suffix="!"),
+        )
+
+        assert results == ["a!", "b?", "c!"]
+        calls = sorted(
+            (c.args[0], c.kwargs["suffix"]) for c in batch_function.await_args_list
+        )
+        assert calls == [(["a", "c"], "!"), (["b"], "?")]
+        assert processor.buckets == {}
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_idle_buckets_pruned(self):
+        """Test that a bucket is dropped once it has no items queued or in flight."""
+        release = asyncio.Event()
+
+        async def blocked_batch(items, suffix="!"):
+            await release.wait()
+            return await echo_batch(items, suffix)
+
+        processor = BatchProcessor(blocked_batch, batch_size=2, max_wait=0.01)
+        tasks = [
+            asyncio.create_task(processor.add_item(str(i), suffix=str(i)))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0.05)
+        stats = processor.get_bucket_stats()
+        assert len(stats) == 5
+        assert all(b["queue_size"] + b["in_flight"] == 1 for b in stats)
+
+        release.set()
+        assert await asyncio.gather(*tasks) == [f"{i}{i}" for i in range(5)]
+        assert processor.buckets == {}
+
+        # A caller giving up also leaves no bucket behind
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.add_item("x", suffix="x", timeout=0.001)
+        await asyncio.sleep(0.02)
+        assert processor.buckets == {}
+
+        assert await processor.add_item("a", suffix="?") == "a?"
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_unhashable_kwargs_rejected(self):
+        """Test that unhashable kwargs fail fast instead of being batched wrongly."""
+        processor = BatchProcessor(echo_batch, batch_size=2, max_wait=0.02)
+        with pytest.raises(TypeError):
+            await processor.add_item("a", suffix=["!"])
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_add_item_after_shutdown_rejected(self):
+        """Test that items aren't accepted once shutdown has started, instead of waiting out their timeout."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(batch_function, batch_size=2, max_wait=0.02)
+        await processor.shutdown()
+
+        with pytest.raises(QueueShutdownError):
+            await asyncio.wait_for(processor.add_item("a"), timeout=1)
+        assert not any(len(bucket) for bucket in processor.buckets.values())
+        batch_function.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_dedup_shares_one_slot(self):
+        """Test that identical in-flight items take one batch slot and share the result."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(
+            batch_function, batch_size=3, max_wait=0.02, dedup=True
+        )
+
+        results = await asyncio.gather(
+            processor.add_item("a"),
+            processor.add_item("a"),
+            processor.add_item("a", suffix="?"),
+        )
+
+        assert results == ["a!", "a!", "a?"]
+        batched = sorted(c.args[0] for c in batch_function.await_args_list)
+        assert batched == [["a"], ["a"]]
+        assert processor.get_coalesced_count() == 1
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_tuner_does_not_hold_lone_items(self):
+        """Test that with a tuner a single item is sent after min_wait, not max_wait."""
+        tuner = BatchTuner(max_batch_size=5, min_wait=0.01, max_wait=5)
+        processor = BatchProcessor(echo_batch, batch_size=5, max_wait=5, tuner=tuner)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        assert await asyncio.wait_for(processor.add_item("a"), timeout=1) == "a!"
+        assert loop.time() - start < 0.5
+        assert processor.batch_size == 1
+        assert processor.get_tuner_stats()["latency_by_batch_size"].keys() == {1}
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_item_result_fails_only_its_item(self):
+        """Test that an ItemResult error fails its own item and not the rest of the batch."""
+
+        async def batch(items):
+            return [
+                ItemResult.fail(ValueError(item)) if item == "bad" else item
+                for item in items
+            ]
+
+        processor = BatchProcessor(batch, batch_size=3, max_wait=10)
+        results = await asyncio.gather(
+            processor.add_item("a"),
+            processor.add_item("bad"),
+            processor.add_item("b"),
+            return_exceptions=True,
+        )
+
+        assert results[0] == "a" and results[2] == "b"
+        assert isinstance(results[1], ValueError)
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_bisect_isolates_failing_item(self):
+        """Test that a raising batch is split until only the bad item fails."""
+        calls = []
+
+        async def batch(items):
+            calls.append(list(items))
+            if "bad" in items:
+                raise ValueError("malformed")
+            return [item.upper() for item in items]
+
+        processor = BatchProcessor(
+            batch, batch_size=4, max_wait=10, bisect_on_error=True
+        )
+        results = await asyncio.gather(
+            *(processor.add_item(i) for i in ["a", "b", "bad", "c"]),
+            return_exceptions=True,
+        )
+
+        assert results[:2] == ["A", "B"] and results[3] == "C"
+        assert isinstance(results[2], ValueError)
+        assert calls[0] == ["a", "b", "bad", "c"]
+        assert ["bad"] in calls
+        assert processor.bisected == 2
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_bisected_halves_hold_batch_slots(self):
+        """Test that the halves of a failed batch never exceed max_concurrent_batches."""
+        running = 0
+        peak = 0
+
+        async def batch(items):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if "bad" in items:
+                raise ValueError("malformed")
+            return list(items)
+
+        processor = BatchProcessor(
+            batch,
+            batch_size=4,
+            max_wait=10,
+            bisect_on_error=True,
+            max_concurrent_batches=1,
+        )
+        results = await asyncio.gather(
+            *(processor.add_item(i) for i in ["a", "b", "c", "bad"]),
+            return_exceptions=True,
+        )
+
+        assert results[:3] == ["a", "b", "c"]
+        assert isinstance(results[3], ValueError)
+        assert peak == 1
+        assert processor.in_flight == 0
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_outage_fails_batch_without_bisecting(self):
+        """Test that errors no single item causes fail the whole batch in one call."""
+        batch_function = AsyncMock(side_effect=asyncio.TimeoutError())
+        processor = BatchProcessor(
+            batch_function, batch_size=4, max_wait=10, bisect_on_error=True
+        )
+        results = await asyncio.gather(
+            *(processor.add_item(i) for i in "abcd"), return_exceptions=True
+        )
+
+        assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+        batch_function.assert_awaited_once()
+        assert processor.bisected == 0
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_results_for_other_keys_not_handed_out(self):
+        """Test that an item without its own result fails rather than taking another's."""
+
+        async def batch(items):
+            return [f"{item}!" if item != "b" else "variant!" for item in items]
+
+        processor = BatchProcessor(
+            batch,
+            batch_size=2,
+            max_wait=10,
+            max_retries=0,
+            result_key=lambda result: result.rstrip("!"),
+        )
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                processor.add_item("a"),
+                processor.add_item("b"),
+                return_exceptions=True,
+            ),
+            timeout=1,
+        )
+
+        assert results[0] == "a!"
+        assert isinstance(results[1], MissingResultError)
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_missing_results_are_requeued(self):
+        """Test that items the batch returned no result for are retried, matched by key."""
+        calls = []
+
+        async def batch(items):
+            calls.append(list(items))
+            # Drop the first item on the first call, answer out of order
+            if len(calls) == 1:
+                return [f"{item}!" for item in reversed(items[1:])]
+            return [f"{item}!" for item in items]
+
+        processor = BatchProcessor(
+            batch,
+            batch_size=3,
+            max_wait=10,
+            result_key=lambda result: result.rstrip("!"),
+        )
+        results = await asyncio.wait_for(
+            asyncio.gather(*(processor.add_item(i) for i in "abc")), timeout=1
+        )
+
+        assert results == ["a!", "b!", "c!"]
+        assert calls == [["a", "b", "c"], ["a"]]
+        assert processor.requeued == 1
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_missing_result_fails_after_retries(self):
+        """Test that an item that never gets a result fails instead of hanging."""
+
+        async def batch(items):
+            return [item for item in items if item != "lost"]
+
+        processor = BatchProcessor(batch, batch_size=2, max_wait=10, max_retries=1)
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                processor.add_item("a"),
+                processor.add_item("lost"),
+                return_exceptions=True,
+            ),
+            timeout=1,
+        )
+
+        assert results[0] == "a"
+        assert isinstance(results[1], MissingResultError)
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """Test that items beyond max_queue_size are rejected right away."""
+        processor = BatchProcessor(
+            echo_batch, batch_size=10, max_wait=0.05, max_queue_size=2
+        )
+        first = asyncio.create_task(processor.add_item("a"))
+        second = asyncio.create_task(processor.add_item("b"))
+        await asyncio.sleep(0)
+
+        assert processor.is_saturated()
+        with pytest.raises(QueueFullError):
+            await processor.add_item("c")
+        assert processor.rejected == 1
+        assert await asyncio.gather(first, second) == ["a!", "b!"]
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_low_lane_does_not_reject_high(self):
+        """Test that background items have their own cap and can't shed interactive ones."""
+        processor = BatchProcessor(
+            echo_batch,
+            batch_size=10,
+            max_wait=0.05,
+            max_queue_size=2,
+            max_low_queue_size=1,
+        )
+        low = asyncio.create_task(processor.add_item("low", priority=Priority.LOW))
+        await asyncio.sleep(0)
+
+        assert processor.is_saturated(Priority.LOW)
+        assert not processor.is_saturated()
+        with pytest.raises(QueueFullError):
+            await processor.add_item("low2", priority=Priority.LOW)
+        assert await asyncio.gather(processor.add_item("high"), low) == [
+            "high!",
+            "low!",
+        ]
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout_frees_queue_slot(self):
+        """Test that a timed out item is taken off the queue and counted."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(batch_function, batch_size=10, max_wait=10)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.add_item("a", timeout=0.01)
+
+        assert processor.get_queue_size() == 0
+        assert processor.timed_out == 1
+        await processor.shutdown()
+        batch_function.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_timeout_frees_deduplicated_slot(self):
+        """Test that a shared item leaves the queue only once all its callers timed out."""
+        batch_function = AsyncMock(side_effect=echo_batch)
+        processor = BatchProcessor(
+            batch_function, batch_size=10, max_wait=0.1, dedup=True
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.add_item("a", timeout=0.01)
+        await asyncio.sleep(0)
+        assert processor.get_queue_size() == 0
+
+        patient = asyncio.create_task(processor.add_item("b"))
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.add_item("b", timeout=0.01)
+        assert processor.get_queue_size() == 1
+        assert await patient == "b!"
+
+        await processor.shutdown()
+        batch_function.assert_awaited_once()
+        assert batch_function.await_args.args[0] == ["b"]
+
+    @pytest.mark.asyncio
+    async def test_high_priority_fills_batch_first(self):
+        """Test that high priority items go first and low ones fill the leftover slots."""
+        release = asyncio.Event()
+        calls = []
+
+        async def batch(items):
+            calls.append(list(items))
+            await release.wait()
+            return items
+
+        processor = BatchProcessor(batch, batch_size=3, max_wait=0.05)
+        blocker = asyncio.create_task(processor.add_item("x", timeout=1))
+        await asyncio.sleep(0.06)  # "x" holds the only batch slot
+        tasks = [
+            asyncio.create_task(processor.add_item(i, priority=Priority.LOW))
+            for i in ("low1", "low2")
+        ] + [asyncio.create_task(processor.add_item(i)) for i in ("hi1", "hi2")]
+        await asyncio.sleep(0)
+
+        assert processor.get_priority_queue_sizes() == {"high": 2, "low": 2}
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        assert calls == [["x"], ["hi1", "hi2", "low1"], ["low2"]]
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_low_priority_does_not_trigger_by_size(self):
+        """Test that a full lane of low priority items waits for its deadline."""
+        processor = BatchProcessor(echo_batch, batch_size=2, max_wait=0.05)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        results = await asyncio.gather(
+            processor.add_item("a", priority=Priority.LOW),
+            processor.add_item("b", priority=Priority.LOW),
+        )
+
+        assert results == ["a!", "b!"]
+        assert loop.time() - start >= 0.05
+        await processor.shutdown()
+
+
+class TestQueueManager:
+    """Test cases for QueueManager."""
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        """Test that stats report each processor's settings."""
+        manager = QueueManager()
+        manager.create_processor("echo", echo_batch, batch_size=4, max_wait=0.01)
+
+        assert await manager.add_to_queue("echo", "x", suffix="?") == "x?"
+        stats = manager.get_stats()["echo"]
+        assert stats["batch_size"] == 4
+        assert stats["queue_size"] == 0
+        assert stats["adaptive"] is None
+        assert stats["rejected"] == stats["timed_out"] == 0
+        await manager.shutdown()
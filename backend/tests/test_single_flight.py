@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import pytest
+from utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for single-flight call coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_run(self):
+        """Test that concurrent calls with the same key run the function once."""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key.upper()
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: fetch("a")),
+            flight.do("a", lambda: fetch("a")),
+            flight.do("b", lambda: fetch("b")),
+        )
+
+        assert results == ["A", "A", "B"]
+        assert calls == ["a", "b"]
+        assert flight.coalesced == 1
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_key_released_after_completion(self):
+        """Test that a finished call is not cached."""
+        flight = SingleFlight()
+        counter = iter(range(10))
+
+        async def next_value():
+            return next(counter)
+
+        assert await flight.do("k", next_value) == 0
+        assert await flight.do("k", next_value) == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test that the shared call's exception is raised for each waiter."""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("scrape failed")
+
+        results = await asyncio.gather(
+            flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling one waiter leaves the shared call running."""
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", slow))
+        second = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+
+    @pytest.mark.asyncio
+    async def test_abandoned_call_cancelled(self):
+        """Test that cancel_abandoned cancels the call once its last waiter is gone."""
+        flight = SingleFlight(cancel_abandoned=True)
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(flight.do("k", slow))
+        second = asyncio.create_task(flight.do("k", slow))
+        await started.wait()
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_call_does_not_inherit_caller_context(self):
+        """Test that the shared call doesn't see the first caller's context variables."""
+        flight = SingleFlight()
+        current = contextvars.ContextVar("current", default=None)
+
+        async def read_current():
+            return current.get()
+
+        current.set("caller's transaction")
+        assert await flight.do("k", read_current) is None
+        assert current.get() == "caller's transaction"
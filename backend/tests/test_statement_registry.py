@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from models.db.db import SupabaseTable
+from utils.database.statement_registry import StatementRegistry
+
+
+class TestStatementRegistry:
+    """Test cases for the prepared statement registry used by PgDatabaseService."""
+
+    @pytest.fixture
+    def registry(self):
+        return StatementRegistry()
+
+    @pytest.fixture
+    def mock_conn(self):
+        """A connection that can hold prepared statements, like PgConnection."""
+        conn = MagicMock()
+        conn.prepared_statements = {}
+        stmt = MagicMock()
+        stmt.fetch = AsyncMock(return_value=[{"word_id": 1}])
+        conn.prepare = AsyncMock(return_value=stmt)
+        return conn
+
+    def test_sql_shapes(self, registry):
+        """Test the SQL text built for each CRUD shape."""
+        assert (
+            registry.select_sql(SupabaseTable.SESSIONS, ["session_id", "is_active"])
+            == "SELECT * FROM sessions WHERE session_id = $1 AND is_active = $2"
+        )
+        assert (
+            registry.select_sql(
+                SupabaseTable.PAST_WRONG_WORDS, ["user_id"], ["word_id", "wrong_count"]
+            )
+            == "SELECT word_id, wrong_count FROM past_wrong_words WHERE user_id = $1"
+        )
+        assert (
+            registry.update_sql(SupabaseTable.SESSIONS, ["is_active"], ["session_id"])
+            == "UPDATE sessions SET is_active = $1 WHERE session_id = $2 RETURNING *"
+        )
+        assert (
+            registry.insert_sql(SupabaseTable.WORDS, ["word_id", "word"], row_count=2)
+            == "INSERT INTO words (word_id, word) VALUES ($1, $2), ($3, $4) RETURNING *"
+        )
+        assert (
+            registry.count_sql(SupabaseTable.WORDS, []) == "SELECT COUNT(*) FROM words"
+        )
+        assert (
+            registry.delete_sql(SupabaseTable.SESSIONS, ["session_id"])
+            == "DELETE FROM sessions WHERE session_id = $1 RETURNING *"
+        )
+
+    def test_upsert_and_bulk_update_sql(self, registry):
+        """Test the SQL text built for upserts and unnest based bulk updates."""
+        assert registry.upsert_sql(
+            SupabaseTable.PAST_WRONG_WORDS,
+            ["user_id", "word_id", "wrong_count"],
+            row_count=1,
+            conflict_cols=["user_id", "word_id"],
+            update_expr={"wrong_count": "past_wrong_words.wrong_count + 1"},
+        ) == (
+            "INSERT INTO past_wrong_words (user_id, word_id, wrong_count) "
+            "VALUES ($1, $2, $3) ON CONFLICT (user_id, word_id) "
+            "DO UPDATE SET wrong_count = past_wrong_words.wrong_count + 1 RETURNING *"
+        )
+        assert registry.upsert_sql(
+            SupabaseTable.WORDS, ["word_id"], 1, ["word_id"], {}
+        ).endswith("ON CONFLICT (word_id) DO NOTHING RETURNING *")
+        assert registry.bulk_update_sql(
+            SupabaseTable.PAST_WRONG_WORDS,
+            ["user_id", "word_id"],
+            ["wrong_count"],
+            ["uuid", "bigint", "bigint"],
+        ) == (
+            "UPDATE past_wrong_words AS t SET wrong_count = v.wrong_count "
+            "FROM unnest($1::uuid[], $2::bigint[], $3::bigint[]) "
+            "AS v(user_id, word_id, wrong_count) "
+            "WHERE t.user_id = v.user_id AND t.word_id = v.word_id RETURNING t.*"
+        )
+
+    def test_row_buckets(self, registry):
+        """Test that row counts split into descending powers of two."""
+        assert registry.row_buckets(1) == [1]
+        assert registry.row_buckets(13) == [8, 4, 1]
+        assert registry.row_buckets(32) == [32]
+        assert registry.row_buckets(0) == []
+
+    def test_sql_built_once_per_shape(self, registry):
+        """Test that the same shape returns the cached SQL string."""
+        first = registry.select_sql(SupabaseTable.SESSIONS, ["session_id"])
+        second = registry.select_sql(SupabaseTable.SESSIONS, ["session_id"])
+        assert first is second
+        assert registry.get_stats()["sql_shapes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_prepares_once_per_connection(self, registry, mock_conn):
+        """Test that a statement is prepared on first use and reused afterwards."""
+        sql = registry.select_sql(SupabaseTable.PAST_WRONG_WORDS, ["user_id"])
+
+        await registry.fetch(mock_conn, sql, "user-1")
+        await registry.fetch(mock_conn, sql, "user-2")
+
+        mock_conn.prepare.assert_awaited_once_with(sql)
+        stats = registry.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_plain_connection_falls_back(self, registry):
+        """Test that connections without a statement store run the plain query."""
+        conn = MagicMock(spec=["fetch"])
+        conn.fetch = AsyncMock(return_value=[])
+        sql = registry.delete_sql(SupabaseTable.SESSIONS, ["session_id"])
+
+        await registry.fetch(conn, sql, "abc")
+
+        conn.fetch.assert_awaited_once_with(sql, "abc")
+        assert registry.get_stats()["unprepared"] == 1
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from utils.task_graph import TaskGraph
+
+
+async def returns(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+class TestTaskGraph:
+    """Test cases for the async step dependency graph."""
+
+    @pytest.mark.asyncio
+    async def test_dependencies_receive_results(self):
+        """Test that a step runs after its dependencies and gets their results."""
+        graph = TaskGraph("test")
+        graph.add("a", lambda: returns(2))
+        graph.add("b", lambda: returns(3))
+        graph.add("sum", lambda a, b: returns(a + b), after=["a", "b"])
+
+        assert await graph.get("sum") == 5
+        assert "sum" in graph and "missing" not in graph
+        await graph.close()
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_overlap(self):
+        """Test that independent steps run concurrently, not one after another."""
+        graph = TaskGraph("test")
+        graph.add("slow1", lambda: returns(1, delay=0.1))
+        graph.add("slow2", lambda: returns(2, delay=0.1))
+        graph.add("both", lambda x, y: returns(x + y), after=["slow1", "slow2"])
+
+        assert await graph.get("both") == 3
+        timings = graph.timings()
+        assert timings["slow2"]["start_ms"] < timings["slow1"]["end_ms"]
+        assert timings["both"]["start_ms"] >= timings["slow2"]["end_ms"]
+        await graph.close()
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_dependents(self):
+        """Test that a failed step fails the steps waiting on it, which never start."""
+        graph = TaskGraph("test")
+
+        async def fail():
+            raise ValueError("boom")
+
+        graph.add("fail", fail)
+        graph.add("after", lambda value: returns(value), after=["fail"])
+
+        with pytest.raises(ValueError, match="boom"):
+            await graph.get("after")
+        await graph.close()
+        assert "after" not in graph.timings()
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_unneeded_steps(self):
+        """Test that close cancels speculative steps still running."""
+        graph = TaskGraph("test")
+        graph.add("needed", lambda: returns(1))
+        speculative = graph.add("speculative", lambda: returns(2, delay=10))
+
+        assert await graph.get("needed") == 1
+        await graph.close()
+
+        assert speculative.cancelled()
+        assert graph.timings()["speculative"]["end_ms"] is not None
+        assert "speculative" in graph.summary()
+
+    @pytest.mark.asyncio
+    async def test_duplicate_step_rejected(self):
+        """Test that a step name can only be added once."""
+        graph = TaskGraph("test")
+        graph.add("a", lambda: returns(1))
+        with pytest.raises(ValueError):
+            graph.add("a", lambda: returns(2))
+        await graph.close()
@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from features.user_service import UserService
+from models.db.db import PastWrongWord, SupabaseRPC, SupabaseTable
+from models.helpers import APIResponse
+from utils.database.pgdb import PgDatabaseService
+from utils.database.supabase_service import SupabaseService
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class TestIncrementWrongWords:
+    """Test cases for recording wrong words through the database backends."""
+
+    @pytest.mark.asyncio
+    async def test_postgres_bumps_in_one_upsert(self):
+        """Test that Postgres counts the mistake in the ON CONFLICT update."""
+        db = PgDatabaseService("postgresql://localhost/test")
+        db.upsert_data = AsyncMock(return_value=APIResponse(data=[], count=0))
+        rows = [PastWrongWord(user_id=USER_ID, word_id=1).model_dump()]
+
+        await db.increment_wrong_words(rows, overwrite_image=True)
+
+        call = db.upsert_data.await_args
+        assert call.args == (SupabaseTable.PAST_WRONG_WORDS, rows)
+        assert call.kwargs["conflict_cols"] == ["user_id", "word_id"]
+        assert call.kwargs["update_expr"] == {
+            "wrong_count": "COALESCE(past_wrong_words.wrong_count, 0) + 1",
+            "last_wrong_at": "EXCLUDED.last_wrong_at",
+            "wrong_image_url": "EXCLUDED.wrong_image_url",
+        }
+
+    @pytest.mark.asyncio
+    async def test_supabase_bumps_on_the_server(self):
+        """Test that Supabase sends the rows to the RPC, without reading them first."""
+        db = MagicMock(spec=SupabaseService)
+        db.rpc_query = AsyncMock(return_value=APIResponse(data=[], count=0))
+        rows = [PastWrongWord(user_id=USER_ID, word_id=1).model_dump()]
+
+        await SupabaseService.increment_wrong_words(db, rows)
+
+        db.rpc_query.assert_awaited_once_with(
+            SupabaseRPC.INCREMENT_WRONG_WORDS,
+            {"p_rows": rows, "p_overwrite_image": False},
+            return_type=dict,
+        )
+
+    @pytest.mark.asyncio
+    async def test_add_wrong_words_uses_the_backend(self, monkeypatch):
+        """Test that UserService leaves the increment to the database backend."""
+        db = MagicMock()
+        db.increment_wrong_words = AsyncMock(return_value=APIResponse(data=[], count=0))
+        word_service = MagicMock()
+        word_service.get_existing_words = AsyncMock(return_value=[])
+        service = UserService(db, word_service, MagicMock())
+        monkeypatch.setattr(
+            "features.user_service.get_game_prefetcher", lambda: MagicMock()
+        )
+
+        await service.add_wrong_words(USER_ID, ["草", "草"], create_words=False)
+
+        (rows,) = db.increment_wrong_words.await_args.args
+        assert [row["word_id"] for row in rows] == [ord("草")]
+
+
+class TestAddWrongWords:
+    """Test cases for where add_wrong_words creates missing words."""
+
+    @pytest.mark.asyncio
+    async def test_words_created_only_when_asked(self, monkeypatch):
+        """Test that create_words=False leaves word creation to ensure_words_exist."""
+        word_service = MagicMock()
+        word_service.get_existing_words = AsyncMock(return_value=[])
+        word_service.create_new_word_db_entry = AsyncMock()
+        service = UserService(MagicMock(), word_service, MagicMock())
+        service.db.increment_wrong_words = AsyncMock(
+            return_value=APIResponse(data=[], count=0)
+        )
+        monkeypatch.setattr(
+            "features.user_service.get_game_prefetcher", lambda: MagicMock()
+        )
+
+        await service.add_wrong_words(USER_ID, ["草"], create_words=False)
+        word_service.create_new_word_db_entry.assert_not_awaited()
+
+        await service.ensure_words_exist(["草", "草"])
+        word_service.create_new_word_db_entry.assert_awaited_once_with("草")
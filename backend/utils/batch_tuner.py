@@ -0,0 +1,132 @@
+"""
+Adaptive batch size and wait tuning for BatchProcessor.
+
+The tuner keeps an EWMA of the gap between arrivals and of the batch function's latency
+for each batch size it has seen. From those it picks:
+
+- batch_size: roughly the number of items that arrive while one batch is running,
+  spread over the concurrent batch slots (Little's law), so batches grow under load.
+- max_wait: the time it takes to fill that batch at the current arrival rate. When the
+  next item is not expected within the wait limit, waiting buys nothing and the
+  minimum wait is used, so a lone item is not held back.
+
+Both are clamped to the configured limits.
+"""
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+
+class BatchTuner:
+    """Picks batch size and max wait from observed arrival rate and batch latency."""
+
+    def __init__(
+        self,
+        min_batch_size: int = 1,
+        max_batch_size: int = 10,
+        min_wait: float = 0.1,
+        max_wait: float = 6.0,
+        alpha: float = 0.3,
+    ):
+        """
+        Args:
+            min_batch_size, max_batch_size: Limits for the chosen batch size
+            min_wait, max_wait: Limits (in seconds) for the chosen max wait
+            alpha: EWMA smoothing factor, higher reacts faster to new observations
+        """
+        if not 1 <= min_batch_size <= max_batch_size:
+            raise ValueError(
+                f"Invalid batch size limits: {min_batch_size}..{max_batch_size}"
+            )
+        if not 0 <= min_wait <= max_wait:
+            raise ValueError(f"Invalid wait limits: {min_wait}..{max_wait}")
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.alpha = alpha
+
+        self._last_arrival: Optional[float] = None
+        # EWMA of seconds between arrivals, None until two items have arrived
+        self._gap: Optional[float] = None
+        # EWMA of batch function latency in seconds, by batch size
+        self._latency: Dict[int, float] = {}
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self.alpha * sample + (1 - self.alpha) * current
+
+    def observe_arrival(self, now: float):
+        """Record an item arriving at loop time `now`."""
+        if self._last_arrival is not None:
+            self._gap = self._ewma(self._gap, max(now - self._last_arrival, 0.0))
+        self._last_arrival = now
+
+    def observe_batch(self, size: int, latency: float):
+        """Record that a batch of `size` items took `latency` seconds."""
+        self._latency[size] = self._ewma(self._latency.get(size), latency)
+
+    def expected_gap(self, now: float) -> Optional[float]:
+        """Expected seconds until the next arrival. A long silence counts as a long gap."""
+        if self._gap is None or self._last_arrival is None:
+            return None
+        return max(self._gap, now - self._last_arrival)
+
+    def expected_latency(self, size: int) -> Optional[float]:
+        """Latency of a batch of `size`, from the nearest batch size observed so far."""
+        if not self._latency:
+            return None
+        nearest = min(self._latency, key=lambda seen: (abs(seen - size), -seen))
+        return self._latency[nearest]
+
+    def tune(
+        self, now: float, batch_size: int, concurrency: int = 1
+    ) -> Tuple[int, float]:
+        """
+        Choose the batch size and max wait for the current traffic.
+
+        Args:
+            now: Current loop time
+            batch_size: The batch size currently in use, its latency is the cycle time
+            concurrency: Number of batches that may run at the same time
+
+        Returns:
+            (batch_size, max_wait)
+        """
+        gap = self.expected_gap(now)
+        if gap is None:
+            # No traffic seen yet, start small and don't hold the first items
+            return self.min_batch_size, self.min_wait
+        if gap > self.max_wait:
+            # Nothing else is expected within the wait limit, send items right away
+            return self.min_batch_size, self.min_wait
+
+        rate = 1 / gap if gap > 0 else math.inf
+        latency = self.expected_latency(batch_size)
+        if latency is None:
+            size = batch_size
+        elif math.isinf(rate):
+            size = self.max_batch_size
+        else:
+            size = math.ceil(rate * latency / max(concurrency, 1))
+        size = min(max(size, self.min_batch_size), self.max_batch_size)
+
+        wait = (size - 1) * gap
+        wait = min(max(wait, self.min_wait), self.max_wait)
+        return size, wait
+
+    def get_stats(self, now: float) -> Dict[str, Any]:
+        """Current estimates, for QueueManager.get_stats()."""
+        gap = self.expected_gap(now)
+        return {
+            "arrival_rate": (1 / gap if gap else None),
+            "latency_by_batch_size": dict(sorted(self._latency.items())),
+            "limits": {
+                "batch_size": [self.min_batch_size, self.max_batch_size],
+                "max_wait": [self.min_wait, self.max_wait],
+            },
+        }
@@ -1,5 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any, Union, Type, Literal
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any,
+    Union,
+    Type,
+    Literal,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+)
 from models.db.db import SupabaseTable, SupabaseRPC
 from models.helpers import APIResponse, _TableT
 
@@ -17,6 +28,43 @@ class DatabaseService(ABC):
         """Insert data into a specified table."""
         pass
 
+    @abstractmethod
+    async def upsert_data(
+        self,
+        table: SupabaseTable,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conflict_cols: List[str],
+        update_expr: Optional[Dict[str, str]] = None,
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """Insert rows, updating the existing row on a conflict over `conflict_cols`."""
+        pass
+
+    @abstractmethod
+    async def increment_wrong_words(
+        self,
+        rows: List[Dict[str, Any]],
+        overwrite_image: bool = False,
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """
+        Insert past_wrong_words rows, counting one more mistake (and taking the new
+        last_wrong_at) for the user's words that already have a row, in one round trip.
+        `overwrite_image` also replaces the existing rows' wrong_image_url.
+        """
+        pass
+
+    @abstractmethod
+    async def bulk_update(
+        self,
+        table: SupabaseTable,
+        rows: List[Dict[str, Any]],
+        key_cols: List[str],
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """Update many rows, each matched on `key_cols`, in a single statement where the backend allows it."""
+        pass
+
     @abstractmethod
     async def fetch_data(
         self, table: SupabaseTable, return_type: Type[_TableT]
@@ -100,3 +148,26 @@ class DatabaseService(ABC):
     ) -> Union[APIResponse[_TableT], Optional[_TableT], int]:
         """Execute a complex SQL query with positional parameter binding."""
         pass
+
+    @abstractmethod
+    def unit_of_work(self) -> AsyncContextManager[Any]:
+        """Run every call inside the `async with` block on one connection, in a single transaction."""
+        pass
+
+    @abstractmethod
+    def try_advisory_lock(self, key: int) -> AsyncContextManager[bool]:
+        """Hold a lock shared by every worker for the `async with` block, yields whether it was taken."""
+        pass
+
+    @abstractmethod
+    async def listen(
+        self,
+        channel: str,
+        callback: Callable[[str], None],
+        on_reconnect: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Callable[[], Awaitable[None]]:
+        """
+        Call `callback(payload)` for every NOTIFY on `channel`, and await `on_reconnect()`
+        after a lost connection is reopened. Returns an async function that stops listening.
+        """
+        pass
@@ -1,15 +1,91 @@
 import asyncpg
 import asyncio
 import json
-from typing import Optional, List, Dict, Any, Union, Type, Literal
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any,
+    Union,
+    Type,
+    Literal,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+)
 from models.db.db import SupabaseTable, SupabaseRPC
 from models.helpers import APIResponse, _TableT
+from utils.config import config
 from utils.logger import setup_logger
 from utils.database.base import DatabaseService
-import json
+from utils.database.statement_registry import StatementRegistry, PgConnection
 
 logger = setup_logger(__name__, level="DEBUG")
 
+# Use orjson for the json/jsonb codecs when available, it is several times faster
+try:
+    import orjson
+
+    _json_dumpb = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+
+    def _json_dumpb(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    _json_loads = json.loads
+
+# Binary jsonb values are prefixed with a format version byte
+_JSONB_VERSION = b"\x01"
+
+# Above this many rows, insert_data switches from multi-VALUES to COPY
+COPY_INSERT_THRESHOLD = config.get("Postgres.CopyInsertThreshold", 50)
+# Longest wait between attempts to reopen a lost LISTEN connection, in seconds
+LISTEN_RECONNECT_MAX_DELAY = config.get("Postgres.ListenReconnectMaxDelay", 30)
+# past_wrong_words has a unique index on (user_id, word_id), see past_wrong_words_upsert.sql
+WRONG_WORD_CONFLICT_COLS = ["user_id", "word_id"]
+# On conflict, count one more mistake instead of inserting a duplicate row
+WRONG_WORD_UPSERT_EXPR = {
+    "wrong_count": "COALESCE(past_wrong_words.wrong_count, 0) + 1",
+    "last_wrong_at": "EXCLUDED.last_wrong_at",
+}
+# Hard limit on bind parameters in a single PostgreSQL statement
+MAX_QUERY_PARAMS = 32767
+
+
+def _json_dumps(value: Any) -> str:
+    return _json_dumpb(value).decode("utf-8")
+
+
+def _json_encode(value: Any) -> bytes:
+    """Codec encoder. Strings are assumed to be JSON text already (see _prepare_value_for_insert)."""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return _json_dumpb(value)
+
+
+def _jsonb_encode(value: Any) -> bytes:
+    return _JSONB_VERSION + _json_encode(value)
+
+
+def _jsonb_decode(data: bytes) -> Any:
+    return _json_loads(data[1:])
+
+
+def _json_decode(value: Any) -> Any:
+    """Decode a value that may not have gone through the codecs (e.g. json cast to text)."""
+    if isinstance(value, (str, bytes)):
+        return _json_loads(value)
+    return value
+
+
+# Unit of work active in the current task, see PgDatabaseService.unit_of_work
+_current_uow: ContextVar[Optional["UnitOfWork"]] = ContextVar(
+    "pgdb_unit_of_work", default=None
+)
+
 # Singleton instance for guaranteed pool reuse
 _pgdb_singleton: Optional["PgDatabaseService"] = None
 
@@ -36,74 +112,44 @@ class PgDatabaseService(DatabaseService):
     A service class to interact with PostgreSQL for async CRUD operations.
     """
 
-    # Define columns that should be parsed as JSON/arrays based on the schema
-    json_columns = {
-        "given_material",
-        "mc_choices",
-        "mc_answers",
-        "pairs",  # questions table
-        "question_ids",  # game_session table
-        "answer",  # game_qa_history table
-        "content",  # tasks table
-        "settings",  # user_settings table
-    }
-
     def __init__(self, dsn: str):
         self.dsn = dsn
         self.pool: Optional[asyncpg.Pool] = None
+        # SQL shapes and per-connection prepared statements for the CRUD helpers
+        self.statements = StatementRegistry()
+        # Column name -> SQL type per table, for the unnest based bulk_update
+        self._column_types: Dict[str, Dict[str, str]] = {}
 
     def _prepare_value_for_insert(self, value: Any) -> Any:
         """Convert Python objects to database-compatible format. Dicts to JSON, lists of dicts to list of JSON strings."""
         if isinstance(value, dict):
-            return json.dumps(value)
+            return _json_dumps(value)
         if isinstance(value, list):
             # If all elements are dicts, convert each to JSON string
             if all(isinstance(v, dict) for v in value):
-                return [json.dumps(v) for v in value]
+                return [_json_dumps(v) for v in value]
         return value
 
-    def _convert_row_from_db(
-        self, row: Dict[str, Any], json_columns: Optional[set] = None
-    ) -> Dict[str, Any]:
-        """Convert database row values back to Python objects."""
-        if json_columns is None:
-            json_columns = self.json_columns
-        converted = {}
-        for key, value in row.items():
-            if key in json_columns:
-                # If value is a list of strings, parse each as JSON
-                if isinstance(value, list) and all(isinstance(v, str) for v in value):
-                    try:
-                        converted[key] = [json.loads(v) for v in value]
-                    except Exception:
-                        logger.warning(
-                            f"Failed to parse JSON list for column {key}: {value}"
-                        )
-                        converted[key] = value
-                # If value is a string, parse as JSON
-                elif isinstance(value, str) and value.strip():
-                    try:
-                        converted[key] = json.loads(value)
-                    except json.JSONDecodeError:
-                        logger.warning(
-                            f"Failed to parse JSON for column {key}: {value}"
-                        )
-                        converted[key] = value
-                else:
-                    converted[key] = value
-            elif (
-                isinstance(value, str)
-                and value.strip().startswith(("[", "{"))
-                and value.strip().endswith(("]", "}"))
-            ):
-                # Fallback: try to parse strings that look like JSON
-                try:
-                    converted[key] = json.loads(value)
-                except json.JSONDecodeError:
-                    converted[key] = value
-            else:
-                converted[key] = value
-        return converted
+    def _rows_to_records(
+        self, rows: List[Dict[str, Any]]
+    ) -> tuple[List[str], List[tuple]]:
+        """Column names (from the first row) and one prepared value tuple per row."""
+        # Get column names from the first row (assuming all rows have same structure)
+        columns = list(rows[0].keys())
+
+        records = []
+        for row_idx, row in enumerate(rows):
+            # Ensure row has the same structure as first row
+            if set(row.keys()) != set(columns):
+                raise ValueError(f"Row {row_idx} has different columns than first row")
+            records.append(
+                tuple(self._prepare_value_for_insert(row[col]) for col in columns)
+            )
+        return columns, records
+
+    def _convert_row_from_db(self, row: asyncpg.Record) -> Dict[str, Any]:
+        """Convert a database row to a dict. JSON values are already decoded by the connection codecs."""
+        return dict(row)
 
     async def connect(self):
         logger.info(f"Creating PostgreSQL connection pool")
@@ -117,6 +163,7 @@ class PgDatabaseService(DatabaseService):
                     command_timeout=30,  # Keep at 30 seconds
                     max_queries=10000,  # Reduced from 50000 to recycle connections more often
                     max_cached_statement_lifetime=60,  # Reduced from 300 to 60 seconds
+                    init=self._init_connection,
                     setup=self._setup_connection,
                     server_settings={
                         "application_name": "writeright_backend",
@@ -126,7 +173,8 @@ class PgDatabaseService(DatabaseService):
                     },
                     # Add connection retry and health check settings
                     # retry_on_failure=True,
-                    connection_class=asyncpg.Connection,
+                    # Holds the registry's prepared statements per connection
+                    connection_class=PgConnection,
                 )
                 logger.info("PostgreSQL connection pool created successfully")
             except Exception as e:
@@ -136,6 +184,27 @@ class PgDatabaseService(DatabaseService):
         else:
             logger.debug("Connection pool already exists")
 
+    async def _init_connection(self, connection):
+        """
+        Init function called once per new connection in the pool.
+        Registers json/jsonb codecs so values (and json[] elements) arrive decoded.
+        Binary format is required for copy_records_to_table.
+        """
+        await connection.set_type_codec(
+            "json",
+            encoder=_json_encode,
+            decoder=_json_loads,
+            schema="pg_catalog",
+            format="binary",
+        )
+        await connection.set_type_codec(
+            "jsonb",
+            encoder=_jsonb_encode,
+            decoder=_jsonb_decode,
+            schema="pg_catalog",
+            format="binary",
+        )
+
     async def _setup_connection(self, connection):
         """Setup function called for each new connection in the pool."""
         # Set connection-level settings that help with cleanup
@@ -169,31 +238,52 @@ class PgDatabaseService(DatabaseService):
             logger.error(f"Error getting database pool: {e}")
             raise RuntimeError(f"Database connection pool is not available: {e}")
 
-    async def insert_data(
+    @asynccontextmanager
+    async def _connection(
         self,
-        table: SupabaseTable,
-        data: Union[Dict[str, Any], List[Dict[str, Any]]],
         conn: Optional[asyncpg.Connection] = None,
-    ) -> Any:
-        return await asyncio.wait_for(
-            self._insert_data_impl(table, data, conn), timeout=30.0
-        )
+        acquire_timeout: Optional[float] = None,
+    ) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Resolve the connection a helper should run on, in order:
+        the caller's `conn`, the current unit of work's connection, or a pooled one.
 
-    async def _insert_data_impl(
-        self,
-        table: SupabaseTable,
-        data: Union[Dict[str, Any], List[Dict[str, Any]]],
-        conn: Optional[asyncpg.Connection] = None,
-    ) -> Any:
+        A unit of work that has ended is skipped: tasks started inside the block inherit
+        the contextvar but must not use its connection once it is back in the pool.
+        """
         if conn is not None:
             # Use provided connection - no acquire/release needed
-            return await self._execute_insert_with_conn(table, data, conn)
+            yield conn
+            return
+
+        uow = _current_uow.get()
+        if uow is not None and not uow.closed:
+            task = asyncio.current_task()
+            if uow.owner is task:
+                # A helper called while this task already holds the connection
+                yield uow.conn
+                return
+            # One connection runs one query at a time, so gathered calls take turns
+            async with uow.lock:
+                uow.owner = task
+                try:
+                    yield uow.conn
+                finally:
+                    uow.owner = None
+            return
 
         # Use pool connection (existing behavior)
         pool = await self._get_pool()
-        acquired_conn = await self._acquire_connection_with_timeout(pool)
+        if acquire_timeout is None:
+            async with pool.acquire() as acquired_conn:
+                yield acquired_conn
+            return
+
+        acquired_conn = await self._acquire_connection_with_timeout(
+            pool, timeout=acquire_timeout
+        )
         try:
-            return await self._execute_insert_with_conn(table, data, acquired_conn)
+            yield acquired_conn
         finally:
             try:
                 await pool.release(acquired_conn)
@@ -205,59 +295,276 @@ class PgDatabaseService(DatabaseService):
                 except:
                     pass
 
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator["UnitOfWork"]:
+        """
+        Pin one pooled connection and run everything inside the block in a single transaction.
+
+        Every helper called inside the block without an explicit `conn` (including from
+        other services, via a contextvar) runs on the pinned connection. The transaction
+        commits when the block exits and rolls back if it raises. Nested calls join the
+        outer unit of work. Tasks started inside the block that outlive it go back to
+        the pool.
+
+        async with db.unit_of_work():
+            await db.update_data(...)
+            await db.insert_data(...)
+        """
+        current = _current_uow.get()
+        if current is not None and not current.closed:
+            yield current
+            return
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                uow = UnitOfWork(conn)
+                token = _current_uow.set(uow)
+                try:
+                    yield uow
+                finally:
+                    uow.closed = True
+                    _current_uow.reset(token)
+
+    @asynccontextmanager
+    async def try_advisory_lock(self, key: int) -> AsyncIterator[bool]:
+        """
+        Take the session advisory lock `key` for the block, unless another session holds it.
+        Yields whether it was taken. The lock lives on a connection of its own, opened
+        for the block, so a long job holding it does not take one of the pool's from
+        request traffic. The block itself uses the pool as usual.
+
+        async with db.try_advisory_lock(KEY) as acquired:
+            if not acquired:
+                return  # Another worker is on it
+        """
+        conn = await asyncpg.connect(dsn=self.dsn)
+        try:
+            acquired = await conn.fetchval("SELECT pg_try_advisory_lock($1)", key)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute("SELECT pg_advisory_unlock($1)", key)
+        finally:
+            # Closing the session releases the lock too, if the unlock failed
+            await conn.close()
+
+    async def listen(
+        self,
+        channel: str,
+        callback: Callable[[str], None],
+        on_reconnect: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Callable[[], Awaitable[None]]:
+        """
+        Call `callback(payload)` for every NOTIFY on `channel`.
+
+        LISTEN lasts as long as the session, so it runs on its own connection rather
+        than holding one of the pool's. If that connection is lost it is reopened,
+        retrying with backoff, and `on_reconnect()` is awaited once listening again,
+        since anything sent in between was missed. Returns an async function that
+        stops listening and closes that connection.
+        """
+        conn: Optional[asyncpg.Connection] = None
+        reconnecting: Optional[asyncio.Task] = None
+        stopped = False
+
+        def on_notify(_conn, _pid, _channel, payload: str):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"Error handling notification on {channel}: {e}")
+
+        def on_terminate(_conn):
+            nonlocal reconnecting
+            if stopped:
+                return
+            logger.warning(f"Lost the connection listening on {channel}, reconnecting")
+            reconnecting = asyncio.get_running_loop().create_task(reconnect())
+
+        async def connect():
+            nonlocal conn
+            new_conn = await asyncpg.connect(dsn=self.dsn)
+            try:
+                await new_conn.add_listener(channel, on_notify)
+            except BaseException:
+                await new_conn.close()
+                raise
+            new_conn.add_termination_listener(on_terminate)
+            conn = new_conn
+
+        async def reconnect():
+            delay = 1.0
+            while True:
+                try:
+                    await connect()
+                    break
+                except Exception as e:
+                    logger.warning(
+                        f"Could not listen on {channel} again, retrying in {delay:.0f}s: {e}"
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, LISTEN_RECONNECT_MAX_DELAY)
+            logger.info(f"Listening for notifications on {channel} again")
+            if on_reconnect is not None:
+                try:
+                    await on_reconnect()
+                except Exception as e:
+                    logger.error(f"Error catching up after reconnecting {channel}: {e}")
+
+        await connect()
+        logger.info(f"Listening for notifications on {channel}")
+
+        async def stop():
+            nonlocal stopped
+            stopped = True
+            if reconnecting is not None and not reconnecting.done():
+                reconnecting.cancel()
+                try:
+                    await reconnecting
+                except asyncio.CancelledError:
+                    pass
+            assert conn is not None
+            try:
+                await conn.remove_listener(channel, on_notify)
+            finally:
+                await conn.close()
+
+        return stop
+
+    async def insert_data(
+        self,
+        table: SupabaseTable,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conn: Optional[asyncpg.Connection] = None,
+        bulk: Optional[bool] = None,
+    ) -> Any:
+        """
+        Insert one row or a list of rows, returning the inserted rows.
+
+        Args:
+            bulk: Force (True) or disable (False) the COPY path for lists of rows.
+                By default it is used once the row count reaches COPY_INSERT_THRESHOLD,
+                or when a multi-VALUES statement would exceed the bind parameter limit.
+        """
+        return await asyncio.wait_for(
+            self._insert_data_impl(table, data, conn, bulk), timeout=30.0
+        )
+
+    async def _insert_data_impl(
+        self,
+        table: SupabaseTable,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conn: Optional[asyncpg.Connection] = None,
+        bulk: Optional[bool] = None,
+    ) -> Any:
+        async with self._connection(conn, acquire_timeout=10.0) as active_conn:
+            return await self._execute_insert_with_conn(table, data, active_conn, bulk)
+
     async def _execute_insert_with_conn(
         self,
         table: SupabaseTable,
         data: Union[Dict[str, Any], List[Dict[str, Any]]],
         conn: asyncpg.Connection,
+        bulk: Optional[bool] = None,
     ) -> Any:
         """Execute insert operation with a specific connection."""
         if isinstance(data, dict):
-            columns = ", ".join(data.keys())
-            values = ", ".join(f"${i+1}" for i in range(len(data)))
+            columns = list(data.keys())
             # Convert complex types to JSON strings
             prepared_values = [self._prepare_value_for_insert(v) for v in data.values()]
 
-            query = (
-                f"INSERT INTO {table.value} ({columns}) VALUES ({values}) RETURNING *"
-            )
-            result = await conn.fetch(query, *prepared_values)
-            return [self._convert_row_from_db(dict(r)) for r in result]
+            query = self.statements.insert_sql(table, columns)
+            result = await self.statements.fetch(conn, query, *prepared_values)
+            return [self._convert_row_from_db(r) for r in result]
         elif isinstance(data, list):
             if not data:
                 return []
 
-            # Get column names from the first row (assuming all rows have same structure)
-            first_row = data[0]
-            columns = list(first_row.keys())
-            columns_str = ", ".join(columns)
+            columns, records = self._rows_to_records(data)
 
-            # Build VALUES clause with placeholders for all rows
-            values_clauses = []
-            all_values = []
+            if bulk is None:
+                bulk = (
+                    len(records) >= COPY_INSERT_THRESHOLD
+                    or len(records) * len(columns) > MAX_QUERY_PARAMS
+                )
+            if bulk:
+                return await self._copy_insert_with_conn(table, columns, records, conn)
 
-            for row_idx, row in enumerate(data):
-                # Ensure row has the same structure as first row
-                if set(row.keys()) != set(columns):
-                    raise ValueError(
-                        f"Row {row_idx} has different columns than first row"
-                    )
+            # Build and execute the bulk insert query
+            result = await self._fetch_in_buckets(
+                conn,
+                records,
+                lambda row_count: self.statements.insert_sql(
+                    table, columns, row_count=row_count
+                ),
+            )
+            return [self._convert_row_from_db(r) for r in result]
 
-                # Create placeholder string for this row
-                row_placeholders = []
-                for col in columns:
-                    placeholder_idx = len(all_values) + 1
-                    row_placeholders.append(f"${placeholder_idx}")
-                    all_values.append(self._prepare_value_for_insert(row[col]))
+    async def _fetch_in_buckets(
+        self,
+        conn: asyncpg.Connection,
+        records: List[tuple],
+        build_sql: Callable[[int], str],
+    ) -> List[asyncpg.Record]:
+        """
+        Run a multi-row statement over `records` in power-of-two chunks (see
+        StatementRegistry.row_buckets), so only a few statement shapes get prepared on
+        each connection. Several chunks run in one transaction.
+        """
+        buckets = self.statements.row_buckets(len(records))
+
+        async def run() -> List[asyncpg.Record]:
+            result: List[asyncpg.Record] = []
+            start = 0
+            for row_count in buckets:
+                chunk = records[start : start + row_count]
+                start += row_count
+                values = [value for record in chunk for value in record]
+                result.extend(
+                    await self.statements.fetch(conn, build_sql(row_count), *values)
+                )
+            return result
 
-                values_clauses.append(f"({', '.join(row_placeholders)})")
+        if len(buckets) == 1:
+            return await run()
+        async with conn.transaction():
+            return await run()
 
-            # Build and execute the bulk insert query
-            values_str = ", ".join(values_clauses)
-            query = f"INSERT INTO {table.value} ({columns_str}) VALUES {values_str} RETURNING *"
+    async def _copy_insert_with_conn(
+        self,
+        table: SupabaseTable,
+        columns: List[str],
+        records: List[tuple],
+        conn: asyncpg.Connection,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert many rows through COPY into a temporary staging table, then
+        INSERT ... SELECT ... RETURNING into the real table.
+
+        Avoids the bind parameter limit and a new statement shape per batch size.
+        Postgres does not guarantee the order of RETURNING rows, so callers must match
+        the returned rows to their input by key, not by position.
+        """
+        staging = f"_copy_{table.value}"
+        column_list = ", ".join(columns)
+        logger.debug(f"COPY inserting {len(records)} rows into {table.value}")
+
+        async with conn.transaction():
+            # CTAS copies column types only, so defaults and NOT NULLs still apply on the real insert
+            await conn.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table.value} WITH NO DATA"
+            )
+            await conn.copy_records_to_table(staging, records=records, columns=columns)
+            rows = await conn.fetch(
+                f"INSERT INTO {table.value} ({column_list}) "
+                f"SELECT {column_list} FROM {staging} RETURNING *"
+            )
+            # Drop now rather than at commit, in case we are inside a caller's transaction
+            await conn.execute(f"DROP TABLE {staging}")
 
-            result = await conn.fetch(query, *all_values)
-            return [self._convert_row_from_db(dict(r)) for r in result]
+        return [self._convert_row_from_db(r) for r in rows]
 
     async def fetch_data(
         self,
@@ -275,28 +582,15 @@ class PgDatabaseService(DatabaseService):
         return_type: Type[_TableT],
         conn: Optional[asyncpg.Connection] = None,
     ) -> APIResponse[_TableT]:
-        if conn is not None:
-            # Use provided connection
-            query = f"SELECT * FROM {table.value}"
-            rows = await conn.fetch(query)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
-            )
-
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
+        async with self._connection(conn) as active_conn:
             query = f"SELECT * FROM {table.value}"
-            rows = await acquired_conn.fetch(query)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
-            )
+            rows = await active_conn.fetch(query)
+        # Convert rows and apply JSON parsing
+        converted_rows = [self._convert_row_from_db(r) for r in rows]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
 
     async def count_data(
         self,
@@ -304,32 +598,13 @@ class PgDatabaseService(DatabaseService):
         condition: Optional[Dict[str, Any]] = None,
         conn: Optional[asyncpg.Connection] = None,
     ) -> int:
-        if conn is not None:
-            # Use provided connection
-            query = f"SELECT COUNT(*) FROM {table.value}"
-            values = []
-            if condition:
-                where_clause = " AND ".join(
-                    [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
-                )
-                query += f" WHERE {where_clause}"
-                values = list(condition.values())
-            row = await conn.fetchrow(query, *values)
-            return row[0] if row else 0
+        condition = condition or {}
+        query = self.statements.count_sql(table, list(condition.keys()))
+        values = list(condition.values())
 
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
-            query = f"SELECT COUNT(*) FROM {table.value}"
-            values = []
-            if condition:
-                where_clause = " AND ".join(
-                    [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
-                )
-                query += f" WHERE {where_clause}"
-                values = list(condition.values())
-            row = await acquired_conn.fetchrow(query, *values)
-            return row[0] if row else 0
+        async with self._connection(conn) as active_conn:
+            row = await self.statements.fetchrow(active_conn, query, *values)
+        return row[0] if row else 0
 
     async def update_data(
         self,
@@ -339,44 +614,22 @@ class PgDatabaseService(DatabaseService):
         return_type: Type[_TableT] = dict,
         conn: Optional[asyncpg.Connection] = None,
     ) -> APIResponse[_TableT]:
-        if conn is not None:
-            # Use provided connection
-            set_clause = ", ".join([f"{k} = ${i+1}" for i, k in enumerate(data.keys())])
-            cond_offset = len(data)
-            where_clause = " AND ".join(
-                [f"{k} = ${i+1+cond_offset}" for i, k in enumerate(condition.keys())]
-            )
-            query = f"UPDATE {table.value} SET {set_clause} WHERE {where_clause} RETURNING *"
-            # Convert complex types in update data
-            prepared_data = [self._prepare_value_for_insert(v) for v in data.values()]
-            values = prepared_data + list(condition.values())
-            rows = await conn.fetch(query, *values)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
-            )
-
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
-            set_clause = ", ".join([f"{k} = ${i+1}" for i, k in enumerate(data.keys())])
-            cond_offset = len(data)
-            where_clause = " AND ".join(
-                [f"{k} = ${i+1+cond_offset}" for i, k in enumerate(condition.keys())]
-            )
-            query = f"UPDATE {table.value} SET {set_clause} WHERE {where_clause} RETURNING *"
-            # Convert complex types in update data
-            prepared_data = [self._prepare_value_for_insert(v) for v in data.values()]
-            values = prepared_data + list(condition.values())
-            rows = await acquired_conn.fetch(query, *values)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
-            )
+        query = self.statements.update_sql(
+            table, list(data.keys()), list(condition.keys())
+        )
+        # Convert complex types in update data
+        prepared_data = [self._prepare_value_for_insert(v) for v in data.values()]
+        values = prepared_data + list(condition.values())
+
+        async with self._connection(conn) as active_conn:
+            rows = await self.statements.fetch(active_conn, query, *values)
+
+        # Convert rows and apply JSON parsing
+        converted_rows = [self._convert_row_from_db(r) for r in rows]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
 
     async def delete_data(
         self,
@@ -385,36 +638,153 @@ class PgDatabaseService(DatabaseService):
         return_type: Type[_TableT] = dict,
         conn: Optional[asyncpg.Connection] = None,
     ) -> APIResponse[_TableT]:
-        if conn is not None:
-            # Use provided connection
-            where_clause = " AND ".join(
-                [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
-            )
-            query = f"DELETE FROM {table.value} WHERE {where_clause} RETURNING *"
-            values = list(condition.values())
-            rows = await conn.fetch(query, *values)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
+        query = self.statements.delete_sql(table, list(condition.keys()))
+        values = list(condition.values())
+
+        async with self._connection(conn) as active_conn:
+            rows = await self.statements.fetch(active_conn, query, *values)
+
+        # Convert rows and apply JSON parsing
+        converted_rows = [self._convert_row_from_db(r) for r in rows]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
+
+    async def upsert_data(
+        self,
+        table: SupabaseTable,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conflict_cols: List[str],
+        update_expr: Optional[Dict[str, str]] = None,
+        return_type: Type[_TableT] = dict,
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> APIResponse[_TableT]:
+        """
+        INSERT ... ON CONFLICT (conflict_cols) DO UPDATE in one statement.
+
+        Args:
+            conflict_cols: Columns of a unique index or constraint on the table
+            update_expr: Column -> SQL expression to set on conflict. Expressions may use
+                EXCLUDED.<col> (the proposed row) and <table>.<col> (the existing row).
+                Defaults to overwriting every non-conflict column with EXCLUDED;
+                an empty dict means DO NOTHING (conflicting rows are not returned).
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return APIResponse(data=[], count=0)
+
+        columns, records = self._rows_to_records(rows)
+        if len(records) * len(columns) > MAX_QUERY_PARAMS:
+            raise ValueError(
+                f"Upsert of {len(records)} rows exceeds the bind parameter limit"
             )
+        if update_expr is None:
+            update_expr = {
+                col: f"EXCLUDED.{col}" for col in columns if col not in conflict_cols
+            }
 
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
-            where_clause = " AND ".join(
-                [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
+        async with self._connection(conn) as active_conn:
+            result = await self._fetch_in_buckets(
+                active_conn,
+                records,
+                lambda row_count: self.statements.upsert_sql(
+                    table, columns, row_count, conflict_cols, update_expr
+                ),
             )
-            query = f"DELETE FROM {table.value} WHERE {where_clause} RETURNING *"
-            values = list(condition.values())
-            rows = await acquired_conn.fetch(query, *values)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
+
+        converted_rows = [self._convert_row_from_db(r) for r in result]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
+
+    async def increment_wrong_words(
+        self,
+        rows: List[Dict[str, Any]],
+        overwrite_image: bool = False,
+        return_type: Type[_TableT] = dict,
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> APIResponse[_TableT]:
+        """
+        One upsert into past_wrong_words, bumping wrong_count of the existing rows.
+        Rows must be unique on (user_id, word_id), ON CONFLICT can't touch a row twice.
+        """
+        update_expr = dict(WRONG_WORD_UPSERT_EXPR)
+        if overwrite_image:
+            update_expr["wrong_image_url"] = "EXCLUDED.wrong_image_url"
+        return await self.upsert_data(
+            SupabaseTable.PAST_WRONG_WORDS,
+            rows,
+            conflict_cols=WRONG_WORD_CONFLICT_COLS,
+            update_expr=update_expr,
+            return_type=return_type,
+            conn=conn,
+        )
+
+    async def bulk_update(
+        self,
+        table: SupabaseTable,
+        rows: List[Dict[str, Any]],
+        key_cols: List[str],
+        return_type: Type[_TableT] = dict,
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> APIResponse[_TableT]:
+        """
+        Update many rows in one UPDATE ... FROM unnest(...) statement.
+        Each row holds the key columns to match on plus the columns to set.
+        Array-typed columns are not supported, since unnest would flatten them.
+        """
+        if not rows:
+            return APIResponse(data=[], count=0)
+
+        columns, records = self._rows_to_records(rows)
+        missing = [col for col in key_cols if col not in columns]
+        if missing:
+            raise ValueError(f"Rows are missing key columns: {missing}")
+        data_cols = [col for col in columns if col not in key_cols]
+        if not data_cols:
+            raise ValueError("Rows have no columns to update")
+        ordered_cols = list(key_cols) + data_cols
+
+        async def _bulk_update_with_conn(c) -> List[asyncpg.Record]:
+            column_types = await self._get_column_types(table, c)
+            types = [column_types[col] for col in ordered_cols]
+            array_cols = [col for col, t in zip(ordered_cols, types) if t.endswith("]")]
+            if array_cols:
+                raise ValueError(f"bulk_update cannot set array columns: {array_cols}")
+
+            query = self.statements.bulk_update_sql(table, key_cols, data_cols, types)
+            # One array parameter per column, in the same order as the unnest
+            positions = [columns.index(col) for col in ordered_cols]
+            arrays = [[record[i] for record in records] for i in positions]
+            return await self.statements.fetch(c, query, *arrays)
+
+        async with self._connection(conn) as active_conn:
+            result = await _bulk_update_with_conn(active_conn)
+
+        converted_rows = [self._convert_row_from_db(r) for r in result]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
+
+    async def _get_column_types(
+        self, table: SupabaseTable, conn: asyncpg.Connection
+    ) -> Dict[str, str]:
+        """Column name -> SQL type name for a table, looked up once per process."""
+        column_types = self._column_types.get(table.value)
+        if column_types is None:
+            rows = await conn.fetch(
+                "SELECT attname, format_type(atttypid, atttypmod) AS type "
+                "FROM pg_attribute WHERE attrelid = $1::regclass "
+                "AND attnum > 0 AND NOT attisdropped",
+                table.value,
             )
+            column_types = {r["attname"]: r["type"] for r in rows}
+            self._column_types[table.value] = column_types
+        return column_types
 
     async def filter_data(
         self,
@@ -424,54 +794,33 @@ class PgDatabaseService(DatabaseService):
         return_type: Type[_TableT] = dict,
         conn: Optional[asyncpg.Connection] = None,
     ) -> APIResponse[_TableT]:
+        query = self.statements.select_sql(table, list(condition.keys()), columns)
+        values = list(condition.values())
+
         async def _filter_operation():
-            if conn is not None:
-                # Use provided connection
-                select_cols = ", ".join(columns) if columns else "*"
-                where_clause = " AND ".join(
-                    [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
-                )
-                query = f"SELECT {select_cols} FROM {table.value} WHERE {where_clause}"
-                values = list(condition.values())
-                rows = await conn.fetch(query, *values)
-                # Convert rows and apply JSON parsing
-                converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-                return APIResponse(
-                    data=[return_type(**row) for row in converted_rows],
-                    count=len(converted_rows),
-                )
+            async with self._connection(conn) as active_conn:
+                rows = await self.statements.fetch(active_conn, query, *values)
 
-            # Use pool connection (existing behavior)
-            pool = await self._get_pool()
-            async with pool.acquire() as acquired_conn:
-                select_cols = ", ".join(columns) if columns else "*"
-                where_clause = " AND ".join(
-                    [f"{k} = ${i+1}" for i, k in enumerate(condition.keys())]
-                )
-                query = f"SELECT {select_cols} FROM {table.value} WHERE {where_clause}"
-                values = list(condition.values())
-                rows = await acquired_conn.fetch(query, *values)
-                # Convert rows and apply JSON parsing
-                converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-                return APIResponse(
-                    data=[return_type(**row) for row in converted_rows],
-                    count=len(converted_rows),
-                )
+            # Convert rows and apply JSON parsing
+            converted_rows = [self._convert_row_from_db(r) for r in rows]
+            return APIResponse(
+                data=[return_type(**row) for row in converted_rows],
+                count=len(converted_rows),
+            )
 
         return await self._execute_with_timeout(_filter_operation)
 
     async def raw_query(self, query: str, response_type: Type = dict) -> APIResponse:
-        pool = await self._get_pool()
-        async with pool.acquire() as conn:
-            if not query.lower().startswith("select"):
-                raise ValueError("Raw query must start with 'SELECT'.")
+        if not query.lower().startswith("select"):
+            raise ValueError("Raw query must start with 'SELECT'.")
+        async with self._connection() as conn:
             rows = await conn.fetch(query)
-            # Convert rows and apply JSON parsing
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
-            return APIResponse(
-                data=[response_type(**row) for row in converted_rows],
-                count=len(converted_rows),
-            )
+        # Convert rows and apply JSON parsing
+        converted_rows = [self._convert_row_from_db(r) for r in rows]
+        return APIResponse(
+            data=[response_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
 
     async def rpc_query(
         self,
@@ -480,27 +829,26 @@ class PgDatabaseService(DatabaseService):
         return_type: Type[_TableT] = dict,
         mode: Literal["json", "table"] = "table",
     ) -> APIResponse[_TableT]:
-        pool = await self._get_pool()
-        async with pool.acquire() as conn:
-            # For PostgreSQL, treat RPC as a function call
-            param_placeholders = ", ".join([f"${i+1}" for i in range(len(params))])
-            query = f"SELECT * FROM {rpc.value}({param_placeholders})"
-            values = list(params.values())
+        # For PostgreSQL, treat RPC as a function call
+        param_placeholders = ", ".join([f"${i+1}" for i in range(len(params))])
+        query = f"SELECT * FROM {rpc.value}({param_placeholders})"
+        values = list(params.values())
+        async with self._connection() as conn:
             rows = await conn.fetch(query, *values)
-            # Use custom json_columns if provided, else default
-            if mode == "json":
-                out = [json.loads(next(rows[0].values()))] if rows else []
-                return APIResponse(
-                    data=out,
-                    count=len(out),
-                )
-
-            converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
+        # jsonb-returning RPCs (e.g. add_new_user) come back decoded by the codec
+        if mode == "json":
+            out = [_json_decode(next(rows[0].values()))] if rows else []
             return APIResponse(
-                data=[return_type(**row) for row in converted_rows],
-                count=len(converted_rows),
+                data=out,
+                count=len(out),
             )
 
+        converted_rows = [self._convert_row_from_db(r) for r in rows]
+        return APIResponse(
+            data=[return_type(**row) for row in converted_rows],
+            count=len(converted_rows),
+        )
+
     async def kickstart(self):
         """
         Kickstart the database service by running a dummy query to ensure the connection pool is ready.
@@ -733,17 +1081,9 @@ class PgDatabaseService(DatabaseService):
         logger.debug(f"Executing complex query: {processed_query}")
         logger.debug(f"With parameters: {prepared_values}")
 
-        if conn is not None:
-            # Use provided connection
+        async with self._connection(conn) as active_conn:
             return await self._execute_query_with_conn(
-                conn, processed_query, prepared_values, return_type, fetch_mode
-            )
-
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
-            return await self._execute_query_with_conn(
-                acquired_conn, processed_query, prepared_values, return_type, fetch_mode
+                active_conn, processed_query, prepared_values, return_type, fetch_mode
             )
 
     async def _execute_query_with_conn(
@@ -758,7 +1098,7 @@ class PgDatabaseService(DatabaseService):
         try:
             if fetch_mode == "all":
                 rows = await conn.fetch(query, *params)
-                converted_rows = [self._convert_row_from_db(dict(r)) for r in rows]
+                converted_rows = [self._convert_row_from_db(r) for r in rows]
                 return APIResponse(
                     data=[return_type(**row) for row in converted_rows],
                     count=len(converted_rows),
@@ -767,7 +1107,7 @@ class PgDatabaseService(DatabaseService):
             elif fetch_mode == "one":
                 row = await conn.fetchrow(query, *params)
                 if row:
-                    converted_row = self._convert_row_from_db(dict(row))
+                    converted_row = self._convert_row_from_db(row)
                     return return_type(**converted_row)
                 return None
 
@@ -839,17 +1179,9 @@ class PgDatabaseService(DatabaseService):
         logger.debug(f"Executing raw complex query: {query}")
         logger.debug(f"With parameters: {prepared_values}")
 
-        if conn is not None:
-            # Use provided connection
+        async with self._connection(conn) as active_conn:
             return await self._execute_query_with_conn(
-                conn, query, prepared_values, return_type, fetch_mode
-            )
-
-        # Use pool connection (existing behavior)
-        pool = await self._get_pool()
-        async with pool.acquire() as acquired_conn:
-            return await self._execute_query_with_conn(
-                acquired_conn, query, prepared_values, return_type, fetch_mode
+                active_conn, query, prepared_values, return_type, fetch_mode
             )
 
     async def get_connection(self):
@@ -1008,6 +1340,7 @@ class PgDatabaseService(DatabaseService):
                 "idle_connections": idle_size,
                 "active_connections": active_size,
                 "is_closing": self.pool.is_closing(),
+                "prepared_statements": self.statements.get_stats(),
             }
         except Exception as e:
             return {"status": "error", "error": str(e)}
@@ -1030,6 +1363,18 @@ class PgDatabaseService(DatabaseService):
     # ...existing code...
 
 
+class UnitOfWork:
+    """A pinned connection with an open transaction, see PgDatabaseService.unit_of_work."""
+
+    def __init__(self, conn: asyncpg.Connection):
+        self.conn = conn
+        self.lock = asyncio.Lock()
+        # Task holding the lock, whose nested helper calls reuse the connection
+        self.owner: Optional[asyncio.Task] = None
+        # Set once the block exits, the connection is no longer ours
+        self.closed = False
+
+
 class DatabaseConnection:
     """Context manager for database connections that ensures proper cleanup."""
 
@@ -0,0 +1,263 @@
+"""
+Prepared statement registry for PgDatabaseService.
+
+The CRUD helpers in pgdb.py only ever produce a handful of SQL shapes, one per
+(operation, table, column set). The registry builds each shape's SQL text once,
+and keeps an explicitly prepared statement per pool connection so repeated calls
+skip the parse/plan round-trip entirely, independent of asyncpg's implicit
+statement cache (which `max_cached_statement_lifetime` keeps flushing).
+"""
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from models.db.db import SupabaseTable
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+StatementKey = Tuple[Any, ...]
+
+
+class PgConnection(asyncpg.Connection):
+    """
+    Pool connection class that owns its prepared statements.
+    Statements live exactly as long as the server-side session they were prepared on.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Dict[str, PreparedStatement] = {}
+
+
+class StatementRegistry:
+    """
+    Builds SQL for each CRUD shape once and hands out per-connection prepared statements.
+    """
+
+    def __init__(self):
+        self._sql: Dict[StatementKey, str] = {}
+        self.hits = 0  # Prepared statement reused on the connection
+        self.misses = 0  # Statement had to be prepared on the connection
+        self.unprepared = 0  # Connection cannot hold statements, plain query used
+
+    # ------ SQL builders ------------------------------
+    def _get_sql(self, key: StatementKey, builder) -> str:
+        sql = self._sql.get(key)
+        if sql is None:
+            sql = builder()
+            self._sql[key] = sql
+        return sql
+
+    @staticmethod
+    def _where(condition_cols: Sequence[str], offset: int = 0) -> str:
+        return " AND ".join(
+            f"{col} = ${i + 1 + offset}" for i, col in enumerate(condition_cols)
+        )
+
+    def select_sql(
+        self,
+        table: SupabaseTable,
+        condition_cols: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+    ) -> str:
+        condition_cols = tuple(condition_cols)
+        columns = tuple(columns) if columns else None
+        key = ("select", table.value, columns, condition_cols)
+        return self._get_sql(
+            key,
+            lambda: f"SELECT {', '.join(columns) if columns else '*'} "
+            f"FROM {table.value} WHERE {self._where(condition_cols)}",
+        )
+
+    def count_sql(self, table: SupabaseTable, condition_cols: Sequence[str]) -> str:
+        condition_cols = tuple(condition_cols)
+        key = ("count", table.value, condition_cols)
+
+        def build() -> str:
+            query = f"SELECT COUNT(*) FROM {table.value}"
+            if condition_cols:
+                query += f" WHERE {self._where(condition_cols)}"
+            return query
+
+        return self._get_sql(key, build)
+
+    @staticmethod
+    def row_buckets(row_count: int) -> List[int]:
+        """
+        Split `row_count` rows into power-of-two chunk sizes, largest first (13 -> 8, 4, 1).
+        Multi-row statements are only built for these sizes, so a table and column set has
+        at most log2(n) + 1 insert shapes instead of one per batch size.
+        """
+        return [
+            1 << bit
+            for bit in reversed(range(row_count.bit_length()))
+            if row_count >> bit & 1
+        ]
+
+    def insert_sql(
+        self, table: SupabaseTable, columns: Sequence[str], row_count: int = 1
+    ) -> str:
+        columns = tuple(columns)
+        key = ("insert", table.value, columns, row_count)
+
+        def build() -> str:
+            width = len(columns)
+            values = ", ".join(
+                "(" + ", ".join(f"${r * width + c + 1}" for c in range(width)) + ")"
+                for r in range(row_count)
+            )
+            return (
+                f"INSERT INTO {table.value} ({', '.join(columns)}) "
+                f"VALUES {values} RETURNING *"
+            )
+
+        return self._get_sql(key, build)
+
+    def update_sql(
+        self,
+        table: SupabaseTable,
+        data_cols: Sequence[str],
+        condition_cols: Sequence[str],
+    ) -> str:
+        data_cols, condition_cols = tuple(data_cols), tuple(condition_cols)
+        key = ("update", table.value, data_cols, condition_cols)
+
+        def build() -> str:
+            set_clause = ", ".join(
+                f"{col} = ${i + 1}" for i, col in enumerate(data_cols)
+            )
+            where_clause = self._where(condition_cols, offset=len(data_cols))
+            return (
+                f"UPDATE {table.value} SET {set_clause} "
+                f"WHERE {where_clause} RETURNING *"
+            )
+
+        return self._get_sql(key, build)
+
+    def delete_sql(self, table: SupabaseTable, condition_cols: Sequence[str]) -> str:
+        condition_cols = tuple(condition_cols)
+        key = ("delete", table.value, condition_cols)
+        return self._get_sql(
+            key,
+            lambda: f"DELETE FROM {table.value} "
+            f"WHERE {self._where(condition_cols)} RETURNING *",
+        )
+
+    def upsert_sql(
+        self,
+        table: SupabaseTable,
+        columns: Sequence[str],
+        row_count: int,
+        conflict_cols: Sequence[str],
+        update_expr: Dict[str, str],
+    ) -> str:
+        """
+        INSERT ... ON CONFLICT. `update_expr` maps column -> SQL expression, which may
+        reference EXCLUDED.<col> and the existing row as <table>.<col>. Empty means DO NOTHING.
+        """
+        conflict_cols = tuple(conflict_cols)
+        update_items = tuple(update_expr.items())
+        key = (
+            "upsert",
+            table.value,
+            tuple(columns),
+            row_count,
+            conflict_cols,
+            update_items,
+        )
+
+        def build() -> str:
+            insert = self.insert_sql(table, columns, row_count)
+            insert = insert[: -len(" RETURNING *")]
+            if update_items:
+                set_clause = ", ".join(f"{col} = {expr}" for col, expr in update_items)
+                action = f"DO UPDATE SET {set_clause}"
+            else:
+                action = "DO NOTHING"
+            return f"{insert} ON CONFLICT ({', '.join(conflict_cols)}) {action} RETURNING *"
+
+        return self._get_sql(key, build)
+
+    def bulk_update_sql(
+        self,
+        table: SupabaseTable,
+        key_cols: Sequence[str],
+        data_cols: Sequence[str],
+        column_types: Sequence[str],
+    ) -> str:
+        """
+        UPDATE ... FROM unnest($1::type[], ...) with one array parameter per column,
+        key columns first. The shape does not depend on the number of rows.
+        """
+        key_cols, data_cols = tuple(key_cols), tuple(data_cols)
+        key = ("bulk_update", table.value, key_cols, data_cols)
+
+        def build() -> str:
+            all_cols = key_cols + data_cols
+            arrays = ", ".join(
+                f"${i + 1}::{col_type}[]" for i, col_type in enumerate(column_types)
+            )
+            set_clause = ", ".join(f"{col} = v.{col}" for col in data_cols)
+            where_clause = " AND ".join(f"t.{col} = v.{col}" for col in key_cols)
+            return (
+                f"UPDATE {table.value} AS t SET {set_clause} "
+                f"FROM unnest({arrays}) AS v({', '.join(all_cols)}) "
+                f"WHERE {where_clause} RETURNING t.*"
+            )
+
+        return self._get_sql(key, build)
+
+    # ------ Execution ---------------------------------
+    async def _prepare(self, conn, sql: str) -> Optional[PreparedStatement]:
+        """
+        Return the statement prepared for `sql` on this connection, preparing it on first use.
+        Returns None for connections that are not PgConnection (e.g. a caller-supplied raw connection).
+        """
+        statements: Optional[Dict[str, PreparedStatement]] = getattr(
+            conn, "prepared_statements", None
+        )
+        if statements is None:
+            self.unprepared += 1
+            return None
+
+        stmt = statements.get(sql)
+        if stmt is not None:
+            self.hits += 1
+            return stmt
+
+        self.misses += 1
+        stmt = await conn.prepare(sql)
+        statements[sql] = stmt
+        return stmt
+
+    def _forget(self, conn, sql: str):
+        statements = getattr(conn, "prepared_statements", None)
+        if statements is not None:
+            statements.pop(sql, None)
+
+    async def fetch(self, conn, sql: str, *args) -> List[asyncpg.Record]:
+        stmt = await self._prepare(conn, sql)
+        if stmt is None:
+            return await conn.fetch(sql, *args)
+        try:
+            return await stmt.fetch(*args)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # Schema changed under the statement, prepare it again once
+            logger.warning(f"Prepared statement invalidated, re-preparing: {sql}")
+            self._forget(conn, sql)
+            stmt = await self._prepare(conn, sql)
+            return await stmt.fetch(*args)  # type: ignore[union-attr]
+
+    async def fetchrow(self, conn, sql: str, *args) -> Optional[asyncpg.Record]:
+        rows = await self.fetch(conn, sql, *args)
+        return rows[0] if rows else None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Registry counters, for debugging and the health endpoint."""
+        return {
+            "sql_shapes": len(self._sql),
+            "hits": self.hits,
+            "misses": self.misses,
+            "unprepared": self.unprepared,
+        }
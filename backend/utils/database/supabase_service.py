@@ -7,6 +7,7 @@ from models.helpers import APIResponse, _TableT
 from utils.logger import setup_logger
 from utils.database.base import DatabaseService
 import asyncio
+from contextlib import asynccontextmanager
 
 logger = setup_logger(__name__, level="INFO")
 
@@ -72,6 +73,132 @@ class SupabaseService(DatabaseService):
             "SupabaseService does not support raw complex queries. Use PgDatabaseService instead."
         )
 
+    async def upsert_data(
+        self,
+        table: SupabaseTable,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conflict_cols: List[str],
+        update_expr: Optional[Dict[str, str]] = None,
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """
+        Asynchronously upsert rows through PostgREST.
+
+        PostgREST can only overwrite a conflicting row with the row sent, or leave it
+        as is. So update_expr must be None (overwrite), {} (do nothing), or map each
+        column to EXCLUDED.<col>; every column in the rows is written on a conflict.
+
+        :param table: Table name
+        :param rows: Rows to insert or update
+        :param conflict_cols: Columns of a unique index or constraint on the table
+        :param update_expr: See DatabaseService.upsert_data
+        :return: The inserted or updated rows as an APIResponse
+        """
+        assert self.client, "Supabase client is not initialized."
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return APIResponse(data=[], count=0)
+        if update_expr and any(
+            expr != f"EXCLUDED.{col}" for col, expr in update_expr.items()
+        ):
+            raise NotImplementedError(
+                "SupabaseService upserts can only write EXCLUDED values. Use PgDatabaseService for update expressions."
+            )
+
+        try:
+            response = (
+                await self.client.table(table.value)
+                .upsert(
+                    rows,
+                    on_conflict=",".join(conflict_cols),
+                    ignore_duplicates=update_expr == {},
+                )
+                .execute()
+            )
+        except Exception as e:
+            logger.error(f"Failed to upsert data into table {table.value}: {e}")
+            raise RuntimeError(f"Supabase upsert error: {e}")
+
+        return APIResponse(
+            data=[return_type(**row) for row in response.data], count=len(response.data)
+        )
+
+    async def increment_wrong_words(
+        self,
+        rows: List[Dict[str, Any]],
+        overwrite_image: bool = False,
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """
+        Upsert past_wrong_words rows through the increment_wrong_words RPC
+        (past_wrong_words_upsert.sql), which runs the ON CONFLICT ... wrong_count + 1
+        on the server, since a PostgREST upsert can only overwrite.
+
+        :param rows: Rows to insert, unique on (user_id, word_id)
+        :param overwrite_image: Also replace the existing rows' wrong_image_url
+        :return: The inserted or updated rows as an APIResponse
+        """
+        if not rows:
+            return APIResponse(data=[], count=0)
+        return await self.rpc_query(
+            SupabaseRPC.INCREMENT_WRONG_WORDS,
+            {"p_rows": rows, "p_overwrite_image": overwrite_image},
+            return_type=return_type,
+        )
+
+    async def bulk_update(
+        self,
+        table: SupabaseTable,
+        rows: List[Dict[str, Any]],
+        key_cols: List[str],
+        return_type: Type[_TableT] = dict,
+    ) -> APIResponse[_TableT]:
+        """
+        Update many rows, each matched on `key_cols`.
+
+        PostgREST has no multi-row UPDATE, so this sends one update request per row
+        (concurrently). Use PgDatabaseService for the single statement version.
+
+        :param table: Table name
+        :param rows: Rows holding the key columns plus the columns to set
+        :param key_cols: Columns identifying each row
+        :return: The updated rows as an APIResponse
+        """
+        for row in rows:
+            missing = [col for col in key_cols if col not in row]
+            if missing:
+                raise ValueError(f"Rows are missing key columns: {missing}")
+
+        responses = await asyncio.gather(
+            *(
+                self.update_data(
+                    table,
+                    {col: value for col, value in row.items() if col not in key_cols},
+                    {col: row[col] for col in key_cols},
+                    return_type=return_type,
+                )
+                for row in rows
+            )
+        )
+        data = [row for response in responses for row in response.data]
+        return APIResponse(data=data, count=len(data))
+
+    async def listen(self, channel: str, callback, on_reconnect=None):
+        raise NotImplementedError(
+            "SupabaseService does not support LISTEN/NOTIFY. Use PgDatabaseService instead."
+        )
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        # The REST client has no transactions, calls inside the block run independently
+        yield None
+
+    @asynccontextmanager
+    async def try_advisory_lock(self, key: int):
+        # The REST client has no sessions to hold a lock on, every caller gets it
+        yield True
+
     def _get_client(self) -> AsyncClient:
         """
         Get the Supabase async client.
@@ -0,0 +1,252 @@
+"""
+Content-addressed cache for parsed LLM question items.
+
+Entries are keyed by (char, question type, model, prompt hash), so changing a prompt or
+model never serves items generated for the old one. Values are the structured items the
+LLM returned (e.g. FillInVocabFormat), not the built questions, so every cache hit still
+goes through Adaptor and gets freshly randomised choices.
+
+Two tiers:
+- An in-memory LRU per process for hot characters.
+- A local SQLite file shared by every worker on the host, so the cache survives restarts.
+
+Both tiers expire entries after the TTL; SQLite is additionally trimmed to max_entries,
+least recently used first.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from models.helpers import ChineseChar
+from models.LLM import AIQuestionType, LLMModels
+from utils.config import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+F = TypeVar("F", bound=BaseModel)
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def prompt_hash(prompt: str) -> str:
+    """Short stable hash of a system prompt, part of the cache key."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMResultCache:
+    """Two-tier (memory LRU + SQLite) cache of structured LLM items."""
+
+    def __init__(
+        self,
+        path: Optional[str] = config.get(
+            "QuestionGenerator.Cache.Path", "cache/llm_results.sqlite3"
+        ),
+        ttl: float = config.get("QuestionGenerator.Cache.TTLHours", 168) * 3600,
+        max_memory_entries: int = config.get(
+            "QuestionGenerator.Cache.MaxMemoryEntries", 1000
+        ),
+        max_entries: int = config.get("QuestionGenerator.Cache.MaxEntries", 50000),
+    ):
+        """
+        Args:
+            path: SQLite file, None to keep the cache in memory only
+            ttl: Seconds an entry stays valid
+            max_memory_entries: Size of the in-memory LRU
+            max_entries: Most entries kept in SQLite before the least recently used are evicted
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        # key -> (stored_at, json value), most recently used last
+        self._memory: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not safe to share across threads concurrently
+        self._store_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        char: ChineseChar,
+        question_type: AIQuestionType,
+        model: LLMModels,
+        prompt: str,
+    ) -> CacheKey:
+        return (str(char), question_type.value, model.value, prompt_hash(prompt))
+
+    # ------ Memory tier ------------------------------------------------------
+
+    def _memory_get(self, key: CacheKey, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if now - stored_at > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: CacheKey, stored_at: float, value: str):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # ------ SQLite tier ------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_results ("
+                "char TEXT, question_type TEXT, model TEXT, prompt_hash TEXT, "
+                "value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL, "
+                "PRIMARY KEY (char, question_type, model, prompt_hash))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_results_used_at ON llm_results (used_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _store_get_many(
+        self, keys: List[CacheKey], now: float
+    ) -> Dict[CacheKey, Tuple[float, str]]:
+        conn = self._connect()
+        found: Dict[CacheKey, Tuple[float, str]] = {}
+        for key in keys:
+            row = conn.execute(
+                "SELECT value, stored_at FROM llm_results "
+                "WHERE char = ? AND question_type = ? AND model = ? AND prompt_hash = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                continue
+            value, stored_at = row
+            if now - stored_at > self.ttl:
+                conn.execute(
+                    "DELETE FROM llm_results "
+                    "WHERE char = ? AND question_type = ? AND model = ? AND prompt_hash = ?",
+                    key,
+                )
+                continue
+            conn.execute(
+                "UPDATE llm_results SET used_at = ? "
+                "WHERE char = ? AND question_type = ? AND model = ? AND prompt_hash = ?",
+                (now, *key),
+            )
+            found[key] = (stored_at, value)
+        conn.commit()
+        return found
+
+    def _store_put_many(self, entries: List[Tuple[CacheKey, str]], now: float):
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO llm_results "
+            "(char, question_type, model, prompt_hash, value, stored_at, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*key, value, now, now) for key, value in entries],
+        )
+        conn.execute("DELETE FROM llm_results WHERE stored_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM llm_results WHERE rowid IN ("
+            "SELECT rowid FROM llm_results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        conn.commit()
+
+    async def _run_store(self, fn, *args):
+        """Run a SQLite call off the event loop. Store errors only cost a cache miss."""
+        if self.path is None:
+            return None
+        try:
+            async with self._store_lock:
+                return await asyncio.to_thread(fn, *args)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"LLM result cache store unavailable: {e}")
+            return None
+
+    # ------ Public API -------------------------------------------------------
+
+    async def get_many(
+        self,
+        chars: Iterable[ChineseChar],
+        question_type: AIQuestionType,
+        model: LLMModels,
+        prompt: str,
+        format_model: Type[F],
+    ) -> Dict[ChineseChar, F]:
+        """Look up cached items for the given characters, returns only the hits."""
+        now = time.time()
+        keys = {
+            char: self.make_key(char, question_type, model, prompt) for char in chars
+        }
+
+        raw: Dict[ChineseChar, str] = {}
+        missing: List[CacheKey] = []
+        for char, key in keys.items():
+            value = self._memory_get(key, now)
+            if value is None:
+                missing.append(key)
+            else:
+                raw[char] = value
+
+        if missing:
+            stored = await self._run_store(self._store_get_many, missing, now) or {}
+            for char, key in keys.items():
+                if key in stored:
+                    stored_at, value = stored[key]
+                    self._memory_put(key, stored_at, value)
+                    raw[char] = value
+
+        items: Dict[ChineseChar, F] = {}
+        for char, value in raw.items():
+            try:
+                items[char] = format_model.model_validate(json.loads(value))
+            except Exception as e:
+                logger.warning(f"Dropping unreadable cache entry for {char}: {e}")
+        self.hits += len(items)
+        self.misses += len(keys) - len(items)
+        return items
+
+    async def put_many(
+        self,
+        items: Dict[ChineseChar, BaseModel],
+        question_type: AIQuestionType,
+        model: LLMModels,
+        prompt: str,
+    ):
+        """Store freshly generated items, keyed by the character each one is for."""
+        if not items:
+            return
+        now = time.time()
+        entries = []
+        for char, item in items.items():
+            key = self.make_key(char, question_type, model, prompt)
+            value = item.model_dump_json()
+            self._memory_put(key, now, value)
+            entries.append((key, value))
+        await self._run_store(self._store_put_many, entries, now)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
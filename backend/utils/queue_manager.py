@@ -16,14 +16,19 @@ if __name__ == "__main__":
 
 import asyncio
 import time
+from enum import IntEnum
 from typing import (
     Any,
     Callable,
     Dict,
     List,
     Optional,
+    Set,
+    Tuple,
+    Type,
     TypeVar,
     Generic,
+    Hashable,
     Union,
     Awaitable,
 )
@@ -32,6 +37,8 @@ from pydantic import BaseModel
 import logging
 from concurrent.futures import Future
 from utils.logger import setup_logger
+from utils.single_flight import SingleFlight
+from utils.batch_tuner import BatchTuner
 
 logger = setup_logger(__name__, level="DEBUG")
 
@@ -39,6 +46,15 @@ T = TypeVar("T")  # Input type
 R = TypeVar("R")  # Result type
 
 
+class Priority(IntEnum):
+    """Queue lanes, lower value is served first."""
+
+    HIGH = 0  # Interactive requests, someone is waiting for the result
+    LOW = (
+        1  # Background work, only fills the slots high priority items leave in a batch
+    )
+
+
 @dataclass
 class QueueItem(Generic[T, R]):
     """Represents an item in the queue with its associated future for result retrieval."""
@@ -46,12 +62,127 @@ class QueueItem(Generic[T, R]):
     input_data: T
     future: asyncio.Future[R]
     timestamp: float
+    # Event loop time by which the item's batch must be dispatched
+    deadline: float = 0.0
     args: tuple = ()
     kwargs: dict = field(default_factory=dict)
+    # Times the item was re-queued because its batch returned no result for it
+    attempts: int = 0
+    priority: Priority = Priority.HIGH
+
+
+@dataclass
+class ItemResult(Generic[R]):
+    """
+    Per-item result envelope a batch function may return in place of a plain value,
+    so one bad item fails on its own instead of failing the whole batch.
+    """
+
+    value: Optional[R] = None
+    error: Optional[BaseException] = None
+    # Input item this result belongs to, for processors matching results by key
+    key: Optional[Hashable] = None
+
+    @classmethod
+    def ok(cls, value: R, key: Optional[Hashable] = None) -> "ItemResult[R]":
+        return cls(value=value, key=key)
+
+    @classmethod
+    def fail(
+        cls, error: BaseException, key: Optional[Hashable] = None
+    ) -> "ItemResult[R]":
+        return cls(error=error, key=key)
+
+
+class MissingResultError(RuntimeError):
+    """The batch function kept returning no result for an item."""
+
+
+class QueueFullError(RuntimeError):
+    """The processor's queue is at capacity, the item was not accepted."""
+
+
+class QueueShutdownError(RuntimeError):
+    """The processor is shutting down, the item was not accepted."""
+
+
+BucketKey = Tuple[tuple, Tuple[Tuple[str, Any], ...]]
+
+
+class _Bucket(Generic[T, R]):
+    """Sub-queue of a BatchProcessor for items sharing the same args/kwargs."""
+
+    def __init__(self, key: BucketKey, args: tuple, kwargs: dict):
+        self.key = key
+        self.args = args
+        self.kwargs = kwargs
+        # FIFO lane per priority, batches take from the highest priority lane first
+        self.lanes: Dict[Priority, List[QueueItem[T, R]]] = {p: [] for p in Priority}
+        # Single timer armed for the oldest queued item's deadline, None while idle
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # True while a dispatched task is waiting for a batch slot
+        self.dispatch_pending = False
+        self.in_flight = 0
+        self.batches = 0
+        self.items = 0
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def push(self, item: QueueItem[T, R]):
+        self.lanes[item.priority].append(item)
+
+    def push_front(self, items: List[QueueItem[T, R]]):
+        """Put items back at the head of their lanes, keeping their order."""
+        for item in reversed(items):
+            self.lanes[item.priority].insert(0, item)
+
+    def take(self, n: int) -> List[QueueItem[T, R]]:
+        """Take up to n items, high priority first, lower lanes fill what is left."""
+        taken: List[QueueItem[T, R]] = []
+        for lane in self.lanes.values():
+            count = min(n - len(taken), len(lane))
+            taken.extend(lane[:count])
+            del lane[:count]
+        return taken
+
+    def drain(self) -> List[QueueItem[T, R]]:
+        return self.take(len(self))
+
+    def remove(self, item: QueueItem[T, R]) -> bool:
+        lane = self.lanes[item.priority]
+        if item in lane:
+            lane.remove(item)
+            return True
+        return False
+
+    def oldest_deadline(self) -> Optional[float]:
+        """Earliest deadline among the lane heads, None when empty."""
+        deadlines = [lane[0].deadline for lane in self.lanes.values() if lane]
+        return min(deadlines) if deadlines else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "args": repr(self.args),
+            "kwargs": repr(self.kwargs),
+            "queue_size": len(self),
+            "queued_by_priority": {
+                p.name.lower(): len(lane) for p, lane in self.lanes.items()
+            },
+            "in_flight": self.in_flight,
+            "batches": self.batches,
+            "items": self.items,
+        }
 
 
 class BatchProcessor(Generic[T, R]):
-    """Generic batch processor that can handle any function with batching."""
+    """
+    Generic batch processor that can handle any function with batching.
+
+    Items are bucketed by their args/kwargs, and each bucket batches on its own
+    (size and deadline triggers), so a batch is always called with the args/kwargs
+    its items were enqueued with. All buckets share the max_concurrent_batches slots.
+    """
 
     def __init__(
         self,
@@ -59,6 +190,15 @@ class BatchProcessor(Generic[T, R]):
         batch_size: int = 10,
         max_wait: float = 2.0,
         queue_name: str = "default",
+        max_concurrent_batches: int = 1,
+        dedup: bool = False,
+        tuner: Optional[BatchTuner] = None,
+        result_key: Optional[Callable[[R], Hashable]] = None,
+        bisect_on_error: bool = False,
+        bisect_errors: Tuple[Type[BaseException], ...] = (ValueError,),
+        max_retries: int = 1,
+        max_queue_size: Optional[int] = None,
+        max_low_queue_size: Optional[int] = None,
     ):
         """
         Initialize the batch processor.
@@ -68,244 +208,612 @@ class BatchProcessor(Generic[T, R]):
             batch_size: Maximum number of items to batch together before processing
             max_wait: Maximum time (in seconds) an item can wait in the queue
             queue_name: Name for this queue (for logging purposes)
+            max_concurrent_batches: How many batches may run the batch function at the same time
+            dedup: Coalesce identical in-flight items (same item and args/kwargs) into one
+                queue slot, every caller gets the same result object
+            tuner: Adjusts batch_size and max_wait to the observed arrival rate and batch
+                latency, within its limits. batch_size and max_wait are only the starting values.
+            result_key: Maps a result to the input item it answers, so results returned
+                out of order or with gaps reach the right caller. Without it results are
+                matched by position.
+            bisect_on_error: When the batch function raises, split the batch in halves and
+                retry each, so only the items that really fail get the exception
+            bisect_errors: Exceptions an item can cause (malformed input or output, e.g.
+                parse and validation errors) and so worth bisecting for. Anything else,
+                such as a timeout or an outage, fails the whole batch at once.
+            max_retries: How many times an item the batch function returned no result for
+                is re-queued before it fails with MissingResultError
+            max_queue_size: Most high priority items that may wait in the queue (all
+                buckets), further items are rejected with QueueFullError. None for unbounded.
+            max_low_queue_size: The same for low priority items, which have their own cap
+                so background work never takes capacity from interactive requests.
+                Defaults to max_queue_size.
         """
         logger.debug(f"Initializing BatchProcessor with queue_name: {queue_name}")
         self.batch_function = batch_function
         self.batch_size = batch_size
         self.max_wait = max_wait
         self.queue_name = queue_name
+        self.max_concurrent_batches = max_concurrent_batches
+        self.dedup = dedup
+        self.tuner = tuner
+        self.result_key = result_key
+        self.bisect_on_error = bisect_on_error
+        self.bisect_errors = bisect_errors
+        self.max_retries = max_retries
+        # Items re-queued for a missing result, and batches split after an error
+        self.requeued = 0
+        self.bisected = 0
+        self.max_queue_size = max_queue_size
+        self.max_low_queue_size = (
+            max_queue_size if max_low_queue_size is None else max_low_queue_size
+        )
+        # Items turned away at capacity, and callers that gave up waiting
+        self.rejected = 0
+        self.timed_out = 0
+        # A queued item is dropped once every caller sharing it gave up
+        self._single_flight: SingleFlight[R] = SingleFlight(cancel_abandoned=True)
 
-        self.queue: List[QueueItem[T, R]] = []
+        self.buckets: Dict[BucketKey, _Bucket[T, R]] = {}
         self.lock = asyncio.Lock()
-        self.is_processing = False
-        self._background_task: Optional[asyncio.Task] = None
+        # Number of batches currently running the batch function
+        self.in_flight = 0
+        self._batch_slots = asyncio.Semaphore(max_concurrent_batches)
         self._shutdown = False
         # Putting the loop as attribute to avoid garbage collected
         self.loop = asyncio.get_running_loop()
+        # Strong references to dispatched batch tasks, so they are not garbage collected
+        self._batch_tasks: Set[asyncio.Task] = set()
 
-        # Start the background monitoring task
-        self._start_monitor()
+    @property
+    def is_processing(self) -> bool:
+        return self.in_flight > 0
 
-    def _start_monitor(self):
-        """Start the background task that monitors for timeouts."""
-        if not self._background_task or self._background_task.done():
-            try:
-                self._background_task = self.loop.create_task(self._monitor_timeouts())
-            except RuntimeError:
-                # No event loop running, will start when needed
-                logger.debug(
-                    f"No event loop running for queue {self.queue_name}, monitor will start when needed"
-                )
+    @staticmethod
+    def _bucket_key(args: tuple, kwargs: dict) -> BucketKey:
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            raise TypeError(
+                f"Batch args/kwargs must be hashable to be bucketed, got {args} {kwargs}"
+            )
+        return key
 
-    async def _monitor_timeouts(self):
-        """Background task that processes queue based on timeout."""
-        # logger.debug(f"shutdown: {self._shutdown}")
-        while not self._shutdown:
-            try:
-                # logger.debug(
-                #     f"Queue {self.queue_name}: Monitoring for timeouts"
-                # )
-                await asyncio.sleep(0.2)  # Check every 100ms
-                # logger.debug("wake")
-                if self.queue and not self.is_processing:
-                    current_time = time.time()
-                    oldest_item_time = self.queue[0].timestamp
-                    # logger.debug(
-                    #     f"Queue {self.queue_name}: Oldest item timestamp: {oldest_item_time}, current time: {current_time}"
-                    # )
-                    # Check if the oldest item has exceeded max_wait
-                    if current_time - oldest_item_time >= self.max_wait:
-                        # logger.debug(
-                        #     f"Queue {self.queue_name}: Processing due to timeout"
-                        # )
-                        await self._process_queue()
-
-            except asyncio.CancelledError:
-                logger.debug(
-                    f"Queue {self.queue_name}: Monitor task cancelled. Active tasks: {asyncio.all_tasks()}"
-                )
-                logger.debug(
-                    f"Event loop running: {asyncio.get_running_loop().is_running()}"
-                )
-                raise
-            except Exception as e:
-                logger.error(f"Error in queue monitor for {self.queue_name}: {e}")
-                await asyncio.sleep(1)  # Back off on error
+    def _get_bucket(self, args: tuple, kwargs: dict) -> _Bucket[T, R]:
+        key = self._bucket_key(args, kwargs)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(key, args, kwargs)
+            self.buckets[key] = bucket
+        return bucket
+
+    def _prune(self, bucket: _Bucket[T, R]):
+        """
+        Drop the bucket once it is idle, so each distinct args/kwargs doesn't keep one
+        for the life of the process. A later item with the same args gets a new one.
+        """
+        if (
+            not len(bucket)
+            and not bucket.in_flight
+            and not bucket.dispatch_pending
+            and bucket.timer is None
+            and self.buckets.get(bucket.key) is bucket
+        ):
+            del self.buckets[bucket.key]
+
+    def _retune(self):
+        """Apply the tuner's current choice of batch_size and max_wait. Call with the lock held."""
+        if self.tuner is None:
+            return
+        batch_size, max_wait = self.tuner.tune(
+            self.loop.time(), self.batch_size, self.max_concurrent_batches
+        )
+        if (batch_size, max_wait) != (self.batch_size, self.max_wait):
+            logger.debug(
+                f"Queue {self.queue_name}: batch_size {self.batch_size} -> {batch_size}, "
+                f"max_wait {self.max_wait:.2f} -> {max_wait:.2f}"
+            )
+            self.batch_size, self.max_wait = batch_size, max_wait
+
+    def _arm_timer(self, bucket: _Bucket[T, R]):
+        """Arm the bucket's deadline timer for its oldest item, if not armed yet. Call with the lock held."""
+        if bucket.timer is None and len(bucket) and not self._shutdown:
+            bucket.timer = self.loop.call_at(
+                bucket.oldest_deadline(), self._on_deadline, bucket
+            )
 
-    async def add_item(self, item: T, *args, **kwargs) -> R:
+    def _cancel_timer(self, bucket: _Bucket[T, R]):
+        if bucket.timer is not None:
+            bucket.timer.cancel()
+            bucket.timer = None
+
+    def _on_deadline(self, bucket: _Bucket[T, R]):
+        """Timer callback: the bucket's oldest item has waited max_wait, dispatch it."""
+        bucket.timer = None
+        self._dispatch(bucket)
+
+    def _dispatch(self, bucket: _Bucket[T, R]):
+        """Schedule _process_queue without waiting for it. At most one task per bucket waits for a slot."""
+        if bucket.dispatch_pending:
+            return
+        bucket.dispatch_pending = True
+        task = self.loop.create_task(self._process_queue(bucket))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    def _is_batch_ready(self, bucket: _Bucket[T, R]) -> bool:
+        """
+        A batch is due when high priority items fill it or the oldest item has reached
+        its deadline. Low priority items never trigger a batch by size, they ride along.
+        """
+        return bool(len(bucket)) and (
+            len(bucket.lanes[Priority.HIGH]) >= self.batch_size
+            or bucket.oldest_deadline() <= self.loop.time()
+        )
+
+    def _schedule_next(self, bucket: _Bucket[T, R]):
+        """Dispatch the bucket's next batch if it is due, otherwise wait for its deadline. Call with the lock held."""
+        if self._is_batch_ready(bucket):
+            self._cancel_timer(bucket)
+            self._dispatch(bucket)
+        else:
+            self._arm_timer(bucket)
+            self._prune(bucket)
+
+    async def add_item(
+        self,
+        item: T,
+        *args,
+        timeout: Optional[float] = None,
+        priority: Priority = Priority.HIGH,
+        **kwargs,
+    ) -> R:
         """
         Add an item to the queue and return the result when processing is complete.
 
         Args:
             item: The input item to be processed
+            *args, **kwargs: Passed to the batch function. Must be hashable, items with
+                different args/kwargs are never batched together.
+            timeout: Seconds to wait for the result before raising TimeoutError. An item
+                still queued by then is taken off the queue.
+            priority: Lane to queue in. Low priority items only fill the slots high
+                priority items leave in a batch, and don't dispatch a batch by size.
 
         Returns:
             The processed result for this specific item
+
+        Raises:
+            QueueFullError: The item's lane is at its capacity
+            QueueShutdownError: shutdown() has been called
+            TimeoutError: No result within timeout
         """
+        if timeout is None:
+            return await self._submit(item, args, kwargs, priority)
+        try:
+            return await asyncio.wait_for(
+                self._submit(item, args, kwargs, priority), timeout
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(
+                f"Queue {self.queue_name}: gave up on {item!r} after {timeout}s"
+            )
+            raise
+
+    async def _submit(
+        self, item: T, args: tuple, kwargs: dict, priority: Priority
+    ) -> R:
+        """
+        Queue the item, or join an identical in-flight one when dedup is on.
+        Only items in the same lane are coalesced, so an interactive request never waits
+        behind a background one.
+        """
+        if self.dedup:
+            key = (self._bucket_key(args, kwargs), priority, item)
+            try:
+                hash(key)
+            except TypeError:
+                # Unhashable items can't be matched, queue them individually
+                return await self._enqueue(item, args, kwargs, priority)
+            return await self._single_flight.do(
+                key, lambda: self._enqueue(item, args, kwargs, priority)
+            )
+        return await self._enqueue(item, args, kwargs, priority)
+
+    def _lane_capacity(self, priority: Priority) -> Optional[int]:
+        if priority == Priority.LOW:
+            return self.max_low_queue_size
+        return self.max_queue_size
+
+    def free_capacity(self, priority: Priority = Priority.HIGH) -> Optional[int]:
+        """How many more items the priority's lane accepts, None when unbounded."""
+        capacity = self._lane_capacity(priority)
+        if capacity is None:
+            return None
+        queued = sum(len(bucket.lanes[priority]) for bucket in self.buckets.values())
+        return max(0, capacity - queued)
+
+    def is_saturated(self, priority: Priority = Priority.HIGH) -> bool:
+        """True when the priority's lane is at capacity and new items in it would be rejected."""
+        return self.free_capacity(priority) == 0
+
+    async def _enqueue(
+        self, item: T, args: tuple, kwargs: dict, priority: Priority = Priority.HIGH
+    ) -> R:
+        """Queue one item in its bucket and wait for its result."""
         # Create a future for this item's result
-        future: asyncio.Future[R] = asyncio.get_event_loop().create_future()
+        future: asyncio.Future[R] = self.loop.create_future()
         queue_item = QueueItem(
             input_data=item,
             future=future,
             timestamp=time.time(),
             args=args,
             kwargs=kwargs or {},
+            priority=priority,
         )
 
         async with self.lock:
-            # logger.debug(
-            #     f"Queue {self.queue_name}: Adding item to queue: {item}, locked"
-            # )
-            self.queue.append(queue_item)
-
-            # If we've reached the batch size, process immediately
-            if len(self.queue) >= self.batch_size:
-                # logger.debug(
-                #     f"Queue {self.queue_name}: Processing due to batch size ({len(self.queue)} items)"
-                # )
-                # Schedule processing without waiting for it
-                asyncio.create_task(self._process_queue())
+            if self._shutdown:
+                # No timer would be armed for it, it would wait out its timeout
+                raise QueueShutdownError(f"Queue {self.queue_name} is shutting down")
+            if self.is_saturated(priority):
+                self.rejected += 1
+                raise QueueFullError(
+                    f"Queue {self.queue_name} is full "
+                    f"({self._lane_capacity(priority)} {priority.name.lower()} priority items)"
+                )
+            if self.tuner is not None:
+                self.tuner.observe_arrival(self.loop.time())
+                self._retune()
+            queue_item.deadline = self.loop.time() + self.max_wait
+            bucket = self._get_bucket(queue_item.args, queue_item.kwargs)
+            bucket.push(queue_item)
+
+            # If we've reached the batch size, process immediately,
+            # otherwise the first item of a new batch starts the max_wait countdown
+            self._schedule_next(bucket)
 
         # Wait for the result
-        # logger.debug(
-        #     f"Queue {self.queue_name}: Item added to queue: {item}, awaiting result"
-        # )
-        result = await future
-        # logger.debug(
-        #     f"Queue {self.queue_name}: Item processed: {item}, result: {result}"
-        # )
-        return result
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. timeout), free the slot if the item hasn't been taken yet
+            bucket.remove(queue_item)
+            future.cancel()
+            if not len(bucket):
+                self._cancel_timer(bucket)
+                self._prune(bucket)
+            raise
 
-    async def _process_queue(self):
-        """Process the current queue in a batch."""
-        # logger.debug(f"Queue {self.queue_name}: Starting batch processing")
-        async with self.lock:
-            if not self.queue or self.is_processing:
-                # logger.debug(
-                #     f"Queue {self.queue_name}: No items to process or already processing"
-                # )
-                return
-
-            # Mark as processing and take a snapshot of the queue
-            self.is_processing = True
-            items_to_process = self.queue.copy()
-            self.queue.clear()
+    async def _process_queue(self, bucket: _Bucket[T, R], force: bool = False):
+        """
+        Take one batch (up to batch_size items) off the bucket and process it.
+        Waits for a free batch slot first, so a full batch can still grow while all slots are busy.
+        """
+        async with self._batch_slots:
+            async with self.lock:
+                if not force:
+                    bucket.dispatch_pending = False
+                if not len(bucket) or not (force or self._is_batch_ready(bucket)):
+                    # Another batch took these items while we waited for a slot
+                    self._arm_timer(bucket)
+                    self._prune(bucket)
+                    return
+
+                self._cancel_timer(bucket)
+                items_to_process = bucket.take(self.batch_size)
+                self.in_flight += 1
+                bucket.in_flight += 1
+                bucket.batches += 1
+                bucket.items += len(items_to_process)
+                # The rest may already fill another batch, which can use a free slot
+                self._schedule_next(bucket)
+
+            halves = await self._run_in_slot(bucket, items_to_process)
+        # Split outside this batch's slot, each half waits for a slot of its own
+        if halves:
+            await self._run_bisected(bucket, halves)
+
+    async def _run_in_slot(
+        self, bucket: _Bucket[T, R], items: List[QueueItem[T, R]]
+    ) -> Optional[List[List[QueueItem[T, R]]]]:
+        """
+        Run a batch already counted in flight, with a batch slot held by the caller.
+        Returns the halves to retry when the batch has to be bisected.
+        """
+        started = self.loop.time()
         try:
-            logger.debug(
-                f"Queue {self.queue_name}: processing items: {[item.input_data for item in items_to_process]}"
+            return await self._run_batch(bucket, items)
+        finally:
+            async with self.lock:
+                self.in_flight -= 1
+                bucket.in_flight -= 1
+                if self.tuner is not None:
+                    self.tuner.observe_batch(len(items), self.loop.time() - started)
+                    self._retune()
+                # Items that arrived during the batch: go now if due, else at their deadline
+                self._schedule_next(bucket)
+
+    async def _run_bisected(
+        self, bucket: _Bucket[T, R], halves: List[List[QueueItem[T, R]]]
+    ):
+        """Run the halves of a failed batch, each as a batch of its own."""
+
+        async def run_half(items: List[QueueItem[T, R]]):
+            async with self._batch_slots:
+                async with self.lock:
+                    # The bucket may have been pruned while this half waited for a slot
+                    live = self._get_bucket(bucket.args, bucket.kwargs)
+                    self.in_flight += 1
+                    live.in_flight += 1
+                    live.batches += 1
+                halves = await self._run_in_slot(live, items)
+            if halves:
+                await self._run_bisected(live, halves)
+
+        await asyncio.gather(*(run_half(half) for half in halves))
+
+    async def _call_batch_function(
+        self, bucket: _Bucket[T, R], items: List[QueueItem[T, R]]
+    ) -> List[R]:
+        """Call the batch function for these items and validate its return value."""
+        logger.debug(
+            f"Queue {self.queue_name}: processing items: {[item.input_data for item in items]}"
+        )
+
+        # Extract input data
+        input_data = [item.input_data for item in items]
+
+        # Call the batch function with the args/kwargs shared by the bucket
+        if asyncio.iscoroutinefunction(self.batch_function):
+            results = await self.batch_function(
+                input_data, *bucket.args, **bucket.kwargs
             )
+        else:
+            results = self.batch_function(input_data, *bucket.args, **bucket.kwargs)
+
+        # Ensure results is a list
+        if not isinstance(results, list):
+            raise ValueError(f"Batch function must return a list, got {type(results)}")
+        return results
+
+    def _key_of(self, result: Any) -> Optional[Hashable]:
+        """The input item a result answers, None if it can't be told."""
+        if isinstance(result, ItemResult):
+            if result.key is not None:
+                return result.key
+            if result.error is not None:
+                return None
+            result = result.value
+        try:
+            return self.result_key(result)
+        except Exception as e:
+            logger.warning(f"Queue {self.queue_name}: can't key result {result!r}: {e}")
+            return None
 
-            # Extract input data
-            input_data = [item.input_data for item in items_to_process]
+    def _match_results(
+        self, items: List[QueueItem[T, R]], results: List[Any]
+    ) -> Tuple[List[Tuple[QueueItem[T, R], Any]], List[QueueItem[T, R]]]:
+        """
+        Pair results with their items. Returns the pairs and the items left without a result.
+        With result_key, results whose key matches no item are dropped, an item never gets
+        a result meant for another.
+        """
+        if len(results) != len(items):
+            logger.warning(
+                f"Queue {self.queue_name}: got {len(results)} results for {len(items)} items"
+            )
+        if self.result_key is None:
+            pairs = list(zip(items, results))
+            return pairs, items[len(pairs) :]
+
+        by_key: Dict[Hashable, List[Any]] = {}
+        unkeyed: List[Any] = []
+        for result in results:
+            key = self._key_of(result)
+            try:
+                by_key.setdefault(key, []).append(result)
+            except TypeError:
+                unkeyed.append(result)
 
-            # Collect all args/kwargs from the batch (use the first item's for now)
-            if items_to_process:
-                args = items_to_process[0].args
-                kwargs = items_to_process[0].kwargs or {}
+        pairs = []
+        unmatched_items = []
+        for item in items:
+            try:
+                candidates = by_key.get(item.input_data)
+            except TypeError:
+                candidates = None
+            if candidates:
+                pairs.append((item, candidates.pop(0)))
             else:
-                args = ()
-                kwargs = {}
-
-            # Call the batch function
-            # logger.debug(self.batch_function)
-            if asyncio.iscoroutinefunction(self.batch_function):
-                results = await self.batch_function(input_data, *args, **kwargs)
+                unmatched_items.append(item)
+
+        # Extra results for an item that already has one, and results keyed to no item
+        # in the batch (e.g. a variant form of the character) are dropped
+        dropped = len(unkeyed) + sum(len(rest) for rest in by_key.values())
+        if dropped:
+            logger.warning(
+                f"Queue {self.queue_name}: dropped {dropped} results matching no item"
+            )
+        return pairs, unmatched_items
+
+    @staticmethod
+    def _resolve(item: QueueItem[T, R], result: Any):
+        """Set an item's future from a plain result or an ItemResult envelope."""
+        if item.future.done():
+            return
+        if isinstance(result, ItemResult):
+            if result.error is not None:
+                item.future.set_exception(result.error)
             else:
-                results = self.batch_function(input_data, *args, **kwargs)
-
-            # Ensure results is a list
-            if not isinstance(results, list):
-                raise ValueError(
-                    f"Batch function must return a list, got {type(results)}"
-                )
-
-            # Distribute results back to futures
-            if len(results) != len(items_to_process):
-                # logger.error(results)
-                # error_msg = f"Batch function returned {len(results)} results for {len(items_to_process)} inputs"
-                # logger.error(f"Queue {self.queue_name}: {error_msg}")
-
-                # # Set exception for all futures
-                # for item in items_to_process:
-                #     if not item.future.done():
-                #         item.future.set_exception(ValueError(error_msg))
-
-                # TODO: Sometimes will get different length of results, now just extract the first n results
-                results = results[: len(items_to_process)]
-
-            # Set results for each future
-            for item, result in zip(items_to_process, results):
+                item.future.set_result(result.value)
+        else:
+            item.future.set_result(result)
+
+    async def _requeue(self, bucket: _Bucket[T, R], items: List[QueueItem[T, R]]):
+        """Put items the batch returned no result for back at the front of their bucket."""
+        retry = []
+        for item in items:
+            item.attempts += 1
+            if item.attempts > self.max_retries:
                 if not item.future.done():
-                    item.future.set_result(result)
-            # logger.debug(
-            #     f"Queue {self.queue_name}: Batch processed successfully, results: {results}"
-            # )
+                    item.future.set_exception(
+                        MissingResultError(
+                            f"Queue {self.queue_name}: no result for {item.input_data!r} "
+                            f"after {item.attempts} attempts"
+                        )
+                    )
+            else:
+                retry.append(item)
+        if not retry:
+            return
 
+        logger.info(
+            f"Queue {self.queue_name}: re-queueing {len(retry)} items without a result"
+        )
+        async with self.lock:
+            self.requeued += len(retry)
+            # They already waited their turn, send them out with the next batch
+            now = self.loop.time()
+            for item in retry:
+                item.deadline = min(item.deadline, now)
+            # The batch's bucket may have been pruned meanwhile
+            bucket = self._get_bucket(bucket.args, bucket.kwargs)
+            bucket.push_front(retry)
+            self._schedule_next(bucket)
+
+    async def _run_batch(
+        self, bucket: _Bucket[T, R], items_to_process: List[QueueItem[T, R]]
+    ) -> Optional[List[List[QueueItem[T, R]]]]:
+        """
+        Process a batch and resolve each item's future.
+        Returns the halves to retry when the batch failed in a way one item can cause.
+        """
+        try:
+            results = await self._call_batch_function(bucket, items_to_process)
         except Exception as e:
-            # logger.error(f"Queue {self.queue_name}: Error processing batch: {e}")
+            if (
+                self.bisect_on_error
+                and isinstance(e, self.bisect_errors)
+                and len(items_to_process) > 1
+            ):
+                # Find the items that make the batch fail instead of failing them all
+                logger.warning(
+                    f"Queue {self.queue_name}: batch of {len(items_to_process)} failed ({e}), bisecting"
+                )
+                self.bisected += 1
+                mid = len(items_to_process) // 2
+                return [items_to_process[:mid], items_to_process[mid:]]
             # Set exception for all futures
             for item in items_to_process:
                 if not item.future.done():
                     item.future.set_exception(e)
-        finally:
-            async with self.lock:
-                self.is_processing = False
+            return None
+
+        pairs, missing = self._match_results(items_to_process, results)
+        for item, result in pairs:
+            self._resolve(item, result)
+        if missing:
+            await self._requeue(bucket, missing)
+        return None
 
     async def flush(self) -> List[R]:
         """
         Immediately process all items currently in the queue and return their results.
-        Returns a list of results in the same order as the items in the queue.
+        Returns a list of results in the same order as the items were queued.
+        Each bucket is processed as one batch.
         """
         async with self.lock:
-            if not self.queue:
-                return []
-            items_to_process = self.queue.copy()
-            self.queue.clear()
-        try:
-            input_data = [item.input_data for item in items_to_process]
-            if items_to_process:
-                args = items_to_process[0].args
-                kwargs = items_to_process[0].kwargs or {}
-            else:
-                args = ()
-                kwargs = {}
-            if asyncio.iscoroutinefunction(self.batch_function):
-                results = await self.batch_function(input_data, *args, **kwargs)
-            else:
-                results = self.batch_function(input_data, *args, **kwargs)
-            if not isinstance(results, list):
-                raise ValueError(
-                    f"Batch function must return a list, got {type(results)}"
-                )
-            for item, result in zip(items_to_process, results):
-                if not item.future.done():
-                    item.future.set_result(result)
-            return results
-        except Exception as e:
-            for item in items_to_process:
-                if not item.future.done():
-                    item.future.set_exception(e)
-            raise
+            drained = []
+            for bucket in self.buckets.values():
+                if len(bucket):
+                    self._cancel_timer(bucket)
+                    drained.append((bucket, bucket.drain()))
+        if not drained:
+            return []
+
+        results_by_item: Dict[int, R] = {}
+        error: Optional[Exception] = None
+        for bucket, items_to_process in drained:
+            try:
+                results = await self._call_batch_function(bucket, items_to_process)
+                pairs, missing = self._match_results(items_to_process, results)
+                for item, result in pairs:
+                    self._resolve(item, result)
+                    if not isinstance(result, ItemResult):
+                        results_by_item[id(item)] = result
+                    elif result.error is None:
+                        results_by_item[id(item)] = result.value
+                # Flushing drains the queue, so nothing is re-queued
+                for item in missing:
+                    if not item.future.done():
+                        item.future.set_exception(
+                            MissingResultError(
+                                f"Queue {self.queue_name}: no result for {item.input_data!r}"
+                            )
+                        )
+            except Exception as e:
+                error = e
+                for item in items_to_process:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+        async with self.lock:
+            for bucket, _ in drained:
+                self._prune(bucket)
+        if error is not None:
+            raise error
+
+        all_items = sorted(
+            (item for _, items in drained for item in items),
+            key=lambda item: item.deadline,
+        )
+        return [
+            results_by_item[id(item)]
+            for item in all_items
+            if id(item) in results_by_item
+        ]
 
     async def shutdown(self):
         """Gracefully shutdown the queue manager."""
         self._shutdown = True
+        for bucket in self.buckets.values():
+            self._cancel_timer(bucket)
 
-        # Cancel background task
-        if self._background_task and not self._background_task.done():
-            self._background_task.cancel()
-            try:
-                await self._background_task
-            except asyncio.CancelledError:
-                pass
+        # Let dispatched batches finish
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
 
         # Process any remaining items
-        if self.queue:
-            await self._process_queue()
+        for bucket in list(self.buckets.values()):
+            while len(bucket):
+                await self._process_queue(bucket, force=True)
 
     def get_queue_size(self) -> int:
-        """Get the current size of the queue."""
-        return len(self.queue)
+        """Get the current size of the queue, across all buckets."""
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def get_priority_queue_sizes(self) -> Dict[str, int]:
+        """Queued items per priority lane, across all buckets."""
+        return {
+            p.name.lower(): sum(len(b.lanes[p]) for b in self.buckets.values())
+            for p in Priority
+        }
+
+    def get_coalesced_count(self) -> int:
+        """Number of add_item calls that shared an identical in-flight item's result."""
+        return self._single_flight.coalesced
+
+    def get_bucket_stats(self) -> List[Dict[str, Any]]:
+        """Per args/kwargs statistics of the buckets with items queued or in flight."""
+        return [bucket.get_stats() for bucket in self.buckets.values()]
+
+    def get_tuner_stats(self) -> Optional[Dict[str, Any]]:
+        """The tuner's arrival rate and latency estimates, None when not adaptive."""
+        if self.tuner is None:
+            return None
+        return self.tuner.get_stats(self.loop.time())
 
 
 _global_queue_manager = None
@@ -339,6 +847,15 @@ class QueueManager:
         batch_function: Callable[[List[T]], Union[List[R], Awaitable[List[R]]]],
         batch_size: int = 10,
         max_wait: float = 2.0,
+        max_concurrent_batches: int = 1,
+        dedup: bool = False,
+        tuner: Optional[BatchTuner] = None,
+        result_key: Optional[Callable[[R], Hashable]] = None,
+        bisect_on_error: bool = False,
+        bisect_errors: Tuple[Type[BaseException], ...] = (ValueError,),
+        max_retries: int = 1,
+        max_queue_size: Optional[int] = None,
+        max_low_queue_size: Optional[int] = None,
     ) -> BatchProcessor[T, R]:
         """
         Create a new batch processor.
@@ -348,6 +865,15 @@ class QueueManager:
             batch_function: Function that processes batches
             batch_size: Maximum batch size
             max_wait: Maximum wait time in seconds
+            max_concurrent_batches: Maximum number of batches processed at the same time
+            dedup: Share one queue slot and result between identical in-flight items
+            tuner: Adapt batch size and max wait to the traffic, within the tuner's limits
+            result_key: Match results to items by key instead of position
+            bisect_on_error: Split and retry failing batches to isolate bad items
+            bisect_errors: Exceptions a single item can cause, the only ones bisected for
+            max_retries: Re-queue attempts for items that got no result
+            max_queue_size: Queue capacity for high priority items, None for unbounded
+            max_low_queue_size: Queue capacity for low priority items, defaults to max_queue_size
 
         Returns:
             The created batch processor
@@ -361,6 +887,15 @@ class QueueManager:
             batch_size=batch_size,
             max_wait=max_wait,
             queue_name=name,
+            max_concurrent_batches=max_concurrent_batches,
+            dedup=dedup,
+            tuner=tuner,
+            result_key=result_key,
+            bisect_on_error=bisect_on_error,
+            bisect_errors=bisect_errors,
+            max_retries=max_retries,
+            max_queue_size=max_queue_size,
+            max_low_queue_size=max_low_queue_size,
         )
 
         self.processors[name] = processor
@@ -394,6 +929,8 @@ class QueueManager:
         Args:
             processor_name: Name of the processor
             item: Item to process
+            timeout: (keyword) Seconds to wait for the result, see BatchProcessor.add_item
+            priority: (keyword) Priority lane, see BatchProcessor.add_item
 
         Returns:
             The processed result (Return value of processor's batch function)
@@ -438,8 +975,21 @@ class QueueManager:
             name: {
                 "queue_size": processor.get_queue_size(),
                 "is_processing": processor.is_processing,
+                "in_flight": processor.in_flight,
                 "batch_size": processor.batch_size,
                 "max_wait": processor.max_wait,
+                "max_concurrent_batches": processor.max_concurrent_batches,
+                "dedup": processor.dedup,
+                "coalesced": processor.get_coalesced_count(),
+                "max_queue_size": processor.max_queue_size,
+                "max_low_queue_size": processor.max_low_queue_size,
+                "rejected": processor.rejected,
+                "timed_out": processor.timed_out,
+                "queued_by_priority": processor.get_priority_queue_sizes(),
+                "requeued": processor.requeued,
+                "bisected": processor.bisected,
+                "buckets": processor.get_bucket_stats(),
+                "adaptive": processor.get_tuner_stats(),
             }
             for name, processor in self.processors.items()
         }
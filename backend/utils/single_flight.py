@@ -0,0 +1,68 @@
+"""
+Single-flight call coalescing.
+
+Concurrent calls that share a key are collapsed into one in-flight call, and every
+caller receives that call's result (or exception). Once the call finishes the key is
+released, so later calls run again; nothing is cached.
+
+The shared call runs in an empty contextvars context rather than the first caller's,
+since its result is handed to callers that never saw that context (e.g. an open
+unit_of_work connection must not leak into it).
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Callable, Coroutine, Dict, Generic, Hashable, TypeVar
+
+R = TypeVar("R")
+
+
+class SingleFlight(Generic[R]):
+    """Coalesces concurrent calls with the same key into a single in-flight call."""
+
+    def __init__(self, cancel_abandoned: bool = False):
+        """
+        Args:
+            cancel_abandoned: Cancel the shared call once every caller waiting for it has
+                been cancelled, e.g. so a queued item nobody waits for is dropped
+        """
+        self._calls: Dict[Hashable, asyncio.Future[R]] = {}
+        # Callers still waiting, per in-flight call
+        self._waiters: Dict[asyncio.Future[R], int] = {}
+        self.cancel_abandoned = cancel_abandoned
+        self.coalesced = 0  # Calls that joined an in-flight call instead of running
+
+    async def do(self, key: Hashable, fn: Callable[[], Coroutine[Any, Any, R]]) -> R:
+        """
+        Run `fn()` unless a call for `key` is already in flight, in which case wait for that one.
+        A caller being cancelled does not cancel the shared call for the others.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.get_running_loop().create_task(
+                fn(), context=contextvars.Context()
+            )
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+        self._waiters[call] = self._waiters.get(call, 0) + 1
+        try:
+            return await asyncio.shield(call)
+        finally:
+            self._waiters[call] -= 1
+            if not self._waiters[call]:
+                del self._waiters[call]
+                if self.cancel_abandoned and not call.done():
+                    call.cancel()
+
+    def _release(self, key: Hashable, call: asyncio.Future[R]):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved, in case every waiter was cancelled
+        if not call.cancelled():
+            call.exception()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently in flight."""
+        return len(self._calls)
@@ -0,0 +1,100 @@
+"""
+Dependency graph of async steps, with per-step timing.
+
+Each step is started as a task as soon as it is added and waits only for the steps it
+depends on, whose results it receives as arguments. Independent steps (and speculative
+ones whose result may turn out unused) therefore overlap, and the whole graph takes
+about as long as its critical path.
+
+    graph = TaskGraph("start game")
+    graph.add("wrong_words", fetch_wrong_words)
+    graph.add("random_words", fetch_random_words)  # speculative, runs alongside
+    graph.add("questions", fetch_questions, after=["wrong_words"])
+    questions = await graph.get("questions")
+    await graph.close()  # cancels steps nobody needed, e.g. random_words
+    logger.info(graph.summary())
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+
+class TaskGraph:
+    """Runs named async steps once their dependencies finish, and times each step."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[str, "asyncio.Future[Any]"] = {}
+        self._created = time.perf_counter()
+        # step -> (start, end) in seconds since the graph was created
+        self._spans: Dict[str, Tuple[float, Optional[float]]] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        after: Sequence[str] = (),
+    ) -> "asyncio.Future[Any]":
+        """
+        Start step `name`. It runs `fn(*results of after)` once those steps are done.
+        A failed dependency fails this step with the same exception.
+        """
+        if name in self._tasks:
+            raise ValueError(f"Step {name} already added to {self.name}")
+        dependencies = [self._tasks[dependency] for dependency in after]
+
+        async def run():
+            results = [await dependency for dependency in dependencies]
+            self._spans[name] = (self._elapsed(), None)
+            try:
+                return await fn(*results)
+            finally:
+                self._spans[name] = (self._spans[name][0], self._elapsed())
+
+        task = asyncio.ensure_future(run())
+        self._tasks[name] = task
+        return task
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._created
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tasks
+
+    def task(self, name: str) -> "asyncio.Future[Any]":
+        return self._tasks[name]
+
+    async def get(self, name: str) -> Any:
+        """Result of step `name`, waiting for it if needed."""
+        return await self._tasks[name]
+
+    async def close(self):
+        """Cancel the steps still running and collect every outcome."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def timings(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Start, end and duration of each step that ran, in ms since the graph started."""
+        timings = {}
+        for name, (start, end) in self._spans.items():
+            timings[name] = {
+                "start_ms": round(start * 1000, 1),
+                "end_ms": None if end is None else round(end * 1000, 1),
+                "duration_ms": None if end is None else round((end - start) * 1000, 1),
+            }
+        return timings
+
+    def summary(self) -> str:
+        """One line with every step's timing, for the logs."""
+        steps = ", ".join(
+            (
+                f"{name} {t['start_ms']:.0f}+{t['duration_ms']:.0f}ms"
+                if t["duration_ms"] is not None
+                else f"{name} {t['start_ms']:.0f}+(unfinished)"
+            )
+            for name, t in self.timings().items()
+        )
+        return f"{self.name} took {self._elapsed() * 1000:.0f}ms: {steps}"